@@ -0,0 +1 @@
+# Empty __init__.py to mark as Python package
\ No newline at end of file
@@ -0,0 +1,74 @@
+''' Сохранение результатов бенчмарков и сравнение с базовой линией '''
+import json
+import platform
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# Отклонение от базовой линии, которое считается регрессией, доля
+REGRESSION_THRESHOLD = 0.10
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def machine_info() -> Dict[str, Any]:
+    """Где снимались результаты: сравнивать имеет смысл только на той же машине"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "system": platform.system()
+    }
+
+
+def save_results(section: str, results: Dict[str, Any], path: Path = BASELINE_PATH) -> None:
+    """Записывает результаты раздела (micro, load) в файл базовой линии"""
+    baseline = load_baseline(path)
+    baseline[section] = {"machine": machine_info(), "results": results}
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=4, sort_keys=True)
+        f.write("\n")
+
+
+def compare(section: str, results: Dict[str, Dict[str, float]],
+            lower_is_better: Dict[str, bool], path: Path = BASELINE_PATH,
+            threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Сравнивает результаты с базовой линией
+
+    Args:
+        section: Раздел базовой линии
+        results: {сценарий: {метрика: значение}}
+        lower_is_better: Направление метрик, которые участвуют в сравнении
+
+    Returns:
+        Описания регрессий хуже порога
+    """
+    baseline = load_baseline(path).get(section, {}).get("results", {})
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name}: no baseline")
+            continue
+        for metric, lower in lower_is_better.items():
+            value: Optional[float] = metrics.get(metric)
+            base: Optional[float] = reference.get(metric)
+            if not value or not base:
+                continue
+            change = (value - base) / base
+            worse = change > threshold if lower else change < -threshold
+            marker = "  REGRESSION" if worse else ""
+            print(f"{name} {metric}: {value:.4g} (baseline {base:.4g}, {change:+.1%}){marker}")
+            if worse:
+                regressions.append(f"{name} {metric} {change:+.1%}")
+    return regressions
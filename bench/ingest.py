@@ -0,0 +1,112 @@
+''' Имитатор шлюзов цепочек датчиков: пакеты отсчетов на /ingest/{provider}
+
+Запуск из корня проекта (сервер уже запущен):
+    python -m bench.ingest --plates 16 --rate 200 --batch 4
+    python -m bench.ingest --gateways 4 --plates 4 --kind imu --udp 9100
+
+Каждый шлюз отправляет отсчеты своих --plates датчиков (шлюзы делят цепочку
+на участки) с частотой --rate, по --batch моментов времени в пакете.
+По окончании выводится статистика источника из /ingest/status.
+'''
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import websockets
+
+from common.ingest import (IMU_SAMPLE_DTYPE, KIND_IMU, KIND_POSE, POSE_SAMPLE_DTYPE,
+                           encode_ingest_packet)
+
+GRAVITY = 9.81
+
+
+def make_samples(kind: int, plates: int, first_plate: int, seq: int, batch: int,
+                 rate: float, start: float) -> np.ndarray:
+    """batch моментов времени по пластинам шлюза; цепочка плавно изгибается"""
+    steps = np.repeat(np.arange(seq, seq + batch), plates)
+    plate_ids = np.tile(np.arange(first_plate, first_plate + plates), batch)
+    t = start + steps / rate
+    phase = 2 * np.pi * 0.5 * t + plate_ids * 0.3
+
+    dtype = POSE_SAMPLE_DTYPE if kind == KIND_POSE else IMU_SAMPLE_DTYPE
+    samples = np.zeros(len(steps), dtype=dtype)
+    samples['plate_id'] = plate_ids
+    samples['seq'] = steps
+    samples['timestamp'] = t
+    if kind == KIND_POSE:
+        samples['position'][:, 1] = 20.0 + plate_ids * 200.0
+        samples['position'][:, 0] = 30.0 * np.sin(phase)
+        samples['orientation'][:, 2] = 0.2 * np.sin(phase)
+    else:
+        samples['accel'][:, 1] = GRAVITY
+        samples['gyro'][:, 2] = 0.2 * np.pi * np.cos(phase)
+        samples['mag'][:, 0] = 1.0
+    return samples
+
+
+async def run_gateway(args, gateway_id: int, kind: int) -> int:
+    """Отправляет пакеты до конца замера; возвращает число отсчетов"""
+    period = args.batch / args.rate
+    start = time.time()
+    sent = 0
+    if args.udp:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send = lambda packet: sock.sendto(packet, (args.host, args.udp))  # noqa: E731
+        websocket = None
+    else:
+        websocket = await websockets.connect(
+            f"ws://{args.host}:{args.port}/ingest/{args.provider}", max_size=None
+        )
+        send = websocket.send
+    try:
+        for packet_seq in range(int(args.duration / period)):
+            seq = packet_seq * args.batch
+            samples = make_samples(kind, args.plates, gateway_id * args.plates, seq,
+                                   args.batch, args.rate, start)
+            result = send(encode_ingest_packet(kind, samples, gateway_id, packet_seq))
+            if asyncio.iscoroutine(result):
+                await result
+            sent += len(samples)
+            await asyncio.sleep(max(0.0, start + (packet_seq + 1) * period - time.time()))
+    finally:
+        if websocket is not None:
+            await websocket.close()
+    return sent
+
+
+async def run(args) -> int:
+    kind = KIND_POSE if args.kind == "pose" else KIND_IMU
+    counts = await asyncio.gather(*(run_gateway(args, gateway_id, kind)
+                                    for gateway_id in range(args.gateways)))
+    return sum(counts)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--provider", default="ingest_provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--udp", type=int, default=None, help="порт UDP вместо WebSocket")
+    parser.add_argument("--gateways", type=int, default=1)
+    parser.add_argument("--plates", type=int, default=16, help="пластин на шлюз")
+    parser.add_argument("--rate", type=float, default=200, help="отсчетов датчика в секунду")
+    parser.add_argument("--batch", type=int, default=4, help="моментов времени в пакете")
+    parser.add_argument("--kind", choices=("pose", "imu"), default="pose")
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд")
+    args = parser.parse_args()
+
+    sent = asyncio.run(run(args))
+    print(f"Sent {sent} samples ({sent / args.duration:.0f}/s)")
+    with urllib.request.urlopen(f"http://{args.host}:{args.port}/ingest/status") as response:
+        status = json.load(response).get(args.provider, {})
+    print(json.dumps(status, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+''' Нагрузочный бенчмарк /ws: сотни клиентов, пропускная способность и задержка
+
+Запуск из корня проекта:
+    python -m bench.load --clients 200 --plates 100 --rate 100 --encoding binary
+    python -m bench.load --encoding json binary delta --save   # новая базовая линия
+    python -m bench.load --in-process                         # сервер в потоке харнесса
+    python -m bench.load --url ws://host:8000/ws --server-pid 1234
+
+По умолчанию сервер (bench.serve) запускается отдельным процессом на localhost,
+клиенты работают в --workers процессах. Задержка - разница между временем
+получения кадра клиентом и меткой времени сервера в кадре (часы общие, т.к.
+все на одной машине).
+'''
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import websockets
+
+from bench.baseline import compare, save_results
+from common.frame_codec import FRAME_HEADER
+
+SECTION = "load"
+# Секунды на запуск процессов клиентов и подключение до начала замера
+STARTUP_TIME = 3.0
+SERVER_START_TIMEOUT = 15.0
+JSON_TIMESTAMP = re.compile(rb'"timestamp":\s*([-+0-9.eE]+)')
+
+
+class ClientStats:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+
+
+def _frame_timestamp(message: Any) -> Optional[float]:
+    """Метка времени сервера в кадре; управляющие сообщения ее не содержат"""
+    if isinstance(message, bytes):
+        if len(message) < FRAME_HEADER.size:
+            return None
+        return FRAME_HEADER.unpack_from(message, 0)[4]
+    # Полный разбор JSON в сотнях клиентов стал бы узким местом самого бенчмарка
+    match = JSON_TIMESTAMP.search(message.encode())
+    return float(match.group(1)) if match else None
+
+
+async def _client(url: str, stats: ClientStats, begin: float, end: float) -> bool:
+    try:
+        async with websockets.connect(url, max_size=None, ping_interval=None,
+                                      open_timeout=STARTUP_TIME) as websocket:
+            while True:
+                timeout = end - time.time()
+                if timeout <= 0:
+                    return True
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), timeout)
+                except asyncio.TimeoutError:
+                    return True
+                received = time.time()
+                if received < begin:
+                    continue
+                timestamp = _frame_timestamp(message)
+                if timestamp is None:
+                    continue
+                stats.frames += 1
+                stats.bytes += len(message)
+                stats.latencies.append(received - timestamp)
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+        return False
+
+
+async def _run_clients(url: str, count: int, begin: float, end: float) -> Dict[str, Any]:
+    stats = ClientStats()
+    connected = await asyncio.gather(*(_client(url, stats, begin, end) for _ in range(count)))
+    return {
+        "connected": sum(connected),
+        "frames": stats.frames,
+        "bytes": stats.bytes,
+        "latencies": np.array(stats.latencies, dtype=np.float64)
+    }
+
+
+def client_worker(url: str, count: int, begin: float, end: float) -> Dict[str, Any]:
+    """Точка входа процесса клиентов"""
+    return asyncio.run(_run_clients(url, count, begin, end))
+
+
+def _process_usage(pid: int) -> Optional[Dict[str, float]]:
+    """Процессорное время (с) и резидентная память (МБ) процесса из /proc"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Имя процесса в скобках может содержать пробелы
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "cpu": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_mb": rss_kb / 1024
+    }
+
+
+class ServerUsage:
+    """Загрузка процессора и пиковая память сервера за окно замера"""
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.start: Optional[Dict[str, float]] = None
+        self.started_at = 0.0
+        self.peak_rss_mb = 0.0
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        usage = _process_usage(self.pid) if self.pid else None
+        if usage:
+            self.peak_rss_mb = max(self.peak_rss_mb, usage["rss_mb"])
+        return usage
+
+    def begin(self) -> None:
+        self.start = self.sample()
+        self.started_at = time.time()
+
+    def result(self) -> Dict[str, Optional[float]]:
+        usage = self.sample()
+        if not usage or not self.start:
+            return {"server_cpu_percent": None, "server_rss_mb": None}
+        wall = time.time() - self.started_at
+        return {
+            "server_cpu_percent": round(100 * (usage["cpu"] - self.start["cpu"]) / wall, 1),
+            "server_rss_mb": round(self.peak_rss_mb, 1)
+        }
+
+
+def wait_for_server(url: str, timeout: float = SERVER_START_TIMEOUT) -> None:
+    status_url = url.replace("ws://", "http://", 1).rsplit("/ws", 1)[0] + "/status"
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(status_url, timeout=1):
+                return
+        except OSError:
+            if time.time() > deadline:
+                raise RuntimeError(f"Server did not start: {status_url}")
+            time.sleep(0.1)
+
+
+def start_server(args) -> subprocess.Popen:
+    """Сервер на localhost отдельным процессом"""
+    command = [
+        sys.executable, "-m", "bench.serve", "--host", "127.0.0.1", "--port", str(args.port),
+        "--plates", str(args.plates), "--rate", str(args.rate)
+    ]
+    if args.execution:
+        command += ["--execution", args.execution]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_in_process(args) -> threading.Thread:
+    """Сервер в потоке харнесса; его нагрузка учитывается вместе с харнессом"""
+    import logging
+    from bench.serve import DEFAULT_PROVIDER, build_server, configure_provider
+
+    # Клиенты обрывают соединения в конце замера - ошибки отправки здесь ожидаемы
+    logging.getLogger("server").setLevel(logging.CRITICAL)
+    configure_provider(DEFAULT_PROVIDER, args.plates, args.rate, args.execution)
+    server = build_server("127.0.0.1", args.port)
+    thread = threading.Thread(target=server.run, name="bench-server", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_scenario(url: str, encoding: str, args, pool,
+                 usage: ServerUsage) -> Dict[str, Any]:
+    separator = "&" if "?" in url else "?"
+    client_url = f"{url}{separator}encoding={encoding}"
+    begin = time.time() + STARTUP_TIME + args.warmup
+    end = begin + args.duration
+
+    counts = [args.clients // args.workers + (i < args.clients % args.workers)
+              for i in range(args.workers)]
+    pending = pool.starmap_async(
+        client_worker, [(client_url, count, begin, end) for count in counts if count]
+    )
+    time.sleep(max(0.0, begin - time.time()))
+    usage.begin()
+    while not pending.ready():
+        usage.sample()
+        pending.wait(0.5)
+    server = usage.result()
+
+    parts = pending.get()
+    latencies = np.concatenate([part["latencies"] for part in parts]) * 1000
+    frames = sum(part["frames"] for part in parts)
+    connected = sum(part["connected"] for part in parts)
+    return {
+        "clients_connected": connected,
+        "frames_per_s": round(frames / args.duration, 1),
+        "frames_per_client_per_s": round(frames / args.duration / max(connected, 1), 2),
+        "bytes_per_s": round(sum(part["bytes"] for part in parts) / args.duration),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 3)
+        if len(latencies) else None,
+        "latency_p99_ms": round(float(np.percentile(latencies, 99)), 3)
+        if len(latencies) else None,
+        **server
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--plates", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=100, help="кадров в секунду")
+    parser.add_argument("--encoding", nargs="+", default=["binary"],
+                        choices=("json", "binary", "delta"))
+    parser.add_argument("--duration", type=float, default=10.0, help="окно замера, с")
+    parser.add_argument("--warmup", type=float, default=1.0, help="прогрев, с")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help="процессов с клиентами")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--execution", choices=("inline", "process"), default=None,
+                        help="режим выполнения провайдера")
+    parser.add_argument("--in-process", action="store_true",
+                        help="запустить сервер в потоке харнесса")
+    parser.add_argument("--url", help="адрес /ws уже запущенного сервера")
+    parser.add_argument("--server-pid", type=int, help="pid сервера для --url")
+    parser.add_argument("--save", action="store_true", help="записать базовую линию")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="допустимое ухудшение относительно базовой линии")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url, pid = args.url, args.server_pid
+    elif args.in_process:
+        start_in_process(args)
+        url, pid = f"ws://127.0.0.1:{args.port}/ws", os.getpid()
+    else:
+        process = start_server(args)
+        url, pid = f"ws://127.0.0.1:{args.port}/ws", process.pid
+
+    results = {}
+    # spawn: процессы клиентов не наследуют сервер, запущенный в потоке
+    context = multiprocessing.get_context("spawn")
+    try:
+        wait_for_server(url)
+        with context.Pool(args.workers) as pool:
+            for encoding in args.encoding:
+                name = (f"{encoding} clients={args.clients} plates={args.plates} "
+                        f"rate={args.rate:g}")
+                results[name] = run_scenario(url, encoding, args, pool, ServerUsage(pid))
+                print(name)
+                for metric, value in results[name].items():
+                    print(f"    {metric:<24} {value}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.save:
+        save_results(SECTION, results)
+        print("Baseline saved")
+        return 0
+    print()
+    regressions = compare(SECTION, results, {
+        "frames_per_s": False,
+        "latency_p50_ms": True,
+        "latency_p99_ms": True,
+        "server_cpu_percent": True
+    }, threshold=args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
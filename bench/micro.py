@@ -0,0 +1,132 @@
+''' Микробенчмарки горячих участков: симуляция, кодирование кадров, ядра поворотов
+
+Запуск из корня проекта:
+    python -m bench.micro                  # замер и сравнение с bench/baseline.json
+    python -m bench.micro --save           # замер и запись новой базовой линии
+    python -m bench.micro --filter encode  # только бенчмарки с подстрокой в имени
+'''
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from bench.baseline import compare, save_results
+from common import kinematics as kernels
+from common.frame_codec import DeltaEncoder, Encoding, PoseFrame, encode_frame
+from providers.spacedata_provider.simulation.simulator import PlatesSimulation
+
+SECTION = "micro"
+PLATE_COUNTS = (3, 100, 1000)
+DT = 0.01
+
+
+def measure(func: Callable[[], object], repeat: int = 5,
+            min_time: float = 0.1) -> Tuple[float, float]:
+    """
+    Время одного вызова func, микросекунды
+
+    Returns:
+        (лучшее, медиана) по repeat сериям длительностью не меньше min_time
+    """
+    # Подбираем число вызовов в серии
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return min(samples) * 1e6, float(np.median(samples)) * 1e6
+
+
+def _frame(simulation: PlatesSimulation) -> PoseFrame:
+    plates = simulation.plates
+    return PoseFrame(plates['plate_id'], plates['position'], plates['angles'],
+                     plates['dimensions'])
+
+
+def benchmarks(plates: int) -> List[Tuple[str, Callable[[], object]]]:
+    """Набор бенчмарков для цепочки из plates пластин"""
+    simulation = PlatesSimulation(plates)
+    simulation.step(DT)
+    frame = _frame(simulation)
+
+    delta = DeltaEncoder()
+    delta.encode(frame, 0, 0.0)
+
+    def delta_encode():
+        # Каждый раз новая поза, чтобы кодировалось приращение, а не повтор
+        simulation.step(DT)
+        delta.encode(frame, 1, 0.0)
+
+    rng = np.random.default_rng(0)
+    angles = rng.uniform(-np.pi, np.pi, (plates, 3))
+    points = rng.normal(size=(plates, 3))
+    heights = np.full(plates, 200.0)
+    work = kernels.rotation_workspace(plates)
+    rotations = kernels.euler_to_matrix(angles)
+    rotated = np.empty((plates, 3))
+    quaternions = kernels.euler_to_quaternion(angles)
+    product = np.empty((plates, 4))
+    centers, ends = np.empty((plates, 3)), np.empty((plates, 3))
+
+    return [
+        (f"simulation.step[{plates}]", lambda: simulation.step(DT)),
+        (f"simulation.update[{plates}]", lambda: simulation.update(DT)),
+        (f"encode.json[{plates}]", lambda: encode_frame(frame, Encoding.JSON, 1, 0.0)),
+        (f"encode.binary[{plates}]", lambda: encode_frame(frame, Encoding.BINARY, 1, 0.0)),
+        (f"encode.delta[{plates}]", delta_encode),
+        (f"math.euler_to_matrix[{plates}]",
+         lambda: kernels.euler_to_matrix(angles, rotations, work)),
+        (f"math.quaternion_multiply[{plates}]",
+         lambda: kernels.quaternion_multiply(quaternions, quaternions, product, work)),
+        (f"math.rotate_points[{plates}]",
+         lambda: kernels.rotate_points(rotations, points, rotated)),
+        (f"math.chain_forward_kinematics[{plates}]",
+         lambda: kernels.chain_forward_kinematics(rotations, heights, (0.0, 0.0, 0.0),
+                                                  centers, ends, work)),
+    ]
+
+
+def run(name_filter: str = "", repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for plates in PLATE_COUNTS:
+        for name, func in benchmarks(plates):
+            if name_filter not in name:
+                continue
+            best, median = measure(func, repeat)
+            results[name] = {"best_us": round(best, 3), "median_us": round(median, 3)}
+            print(f"{name:<40} best {best:10.2f} us   median {median:10.2f} us")
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="подстрока имени бенчмарка")
+    parser.add_argument("--repeat", type=int, default=5, help="число серий замера")
+    parser.add_argument("--save", action="store_true", help="записать базовую линию")
+    args = parser.parse_args()
+
+    results = run(args.filter, args.repeat)
+    if args.save:
+        save_results(SECTION, results)
+        print("Baseline saved")
+        return 0
+    print()
+    regressions = compare(SECTION, results, {"best_us": True})
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
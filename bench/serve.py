@@ -0,0 +1,57 @@
+''' Сервер для нагрузочного бенчмарка: приложение с настроенным провайдером
+
+Запуск из корня проекта (обычно его запускает bench.load):
+    python -m bench.serve --port 8765 --plates 100 --rate 100
+'''
+import argparse
+import copy
+from typing import Optional
+
+import uvicorn
+
+from common.provider_manager import get_provider_manager
+
+DEFAULT_PROVIDER = "spacedata_provider"
+
+
+def configure_provider(name: str, plates: int, rate: float,
+                       execution: Optional[str] = None) -> None:
+    """
+    Подменяет в памяти манифест провайдера: число пластин и частоту кадров.
+    Файл манифеста не меняется
+    """
+    manager = get_provider_manager()
+    manifest = manager.get_manifest(name)
+    if manifest is None:
+        raise ValueError(f"Unknown provider: {name}")
+    manifest = copy.deepcopy(manifest)
+    manifest.setdefault("simulation", {})["plate_count"] = plates
+    manifest.setdefault("data_rate", {})["rate"] = rate
+    if execution:
+        manifest.setdefault("execution", {})["mode"] = execution
+    manager.providers[name] = manifest
+
+
+def build_server(host: str, port: int) -> uvicorn.Server:
+    """Сервер uvicorn без перезагрузки и без журнала запросов"""
+    config = uvicorn.Config("server.server:app", host=host, port=port,
+                            log_level="warning", access_log=False)
+    return uvicorn.Server(config)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--provider", default=DEFAULT_PROVIDER)
+    parser.add_argument("--plates", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=100)
+    parser.add_argument("--execution", choices=("inline", "process"), default=None)
+    args = parser.parse_args()
+
+    configure_provider(args.provider, args.plates, args.rate, args.execution)
+    build_server(args.host, args.port).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+''' Время холодного запуска сервера: от старта процесса до ответа /status
+
+Запуск из корня проекта:
+    python -m bench.startup --runs 5
+    python -m bench.startup --save     # новая базовая линия
+
+Сервер запускается командой python main.py --production на отдельном порту
+--runs раз подряд. Выводятся медиана времени до первого ответа /status
+(с точки зрения оркестратора) и фазы запуска, которые сервер отмечает сам
+(секция startup в /status).
+'''
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict
+
+from bench.baseline import compare, save_results
+
+SECTION = "startup"
+TIMEOUT = 30.0
+
+
+def measure_once(port: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "--production", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://localhost:{port}/status", timeout=1) as r:
+                    status = json.load(r)
+                break
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {process.returncode}")
+                if time.perf_counter() - started > TIMEOUT:
+                    raise RuntimeError("Server did not start")
+                time.sleep(0.01)
+        return {"wall_ms": (time.perf_counter() - started) * 1000.0, **status["startup"]}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--save", action="store_true", help="записать базовую линию")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="допустимое ухудшение относительно базовой линии")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.port) for _ in range(args.runs)]
+    phases = {
+        phase: round(statistics.median(run["phases"].get(phase, 0.0) for run in runs), 1)
+        for phase in runs[-1]["phases"]
+    }
+    result = {
+        "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 1),
+        "ready_ms": round(statistics.median(run["ready_ms"] for run in runs), 1),
+        **{f"{phase}_ms": value for phase, value in phases.items()}
+    }
+    budget = runs[-1]["budget_ms"]
+    name = "main.py --production"
+    print(name)
+    for metric, value in result.items():
+        print(f"    {metric:<24} {value}")
+    over_budget = bool(budget) and result["ready_ms"] > budget
+    if over_budget:
+        print(f"Over startup budget: {result['ready_ms']} ms > {budget:g} ms")
+
+    if args.save:
+        save_results(SECTION, {name: result})
+        print("Baseline saved")
+        return 0
+    print()
+    regressions = compare(SECTION, {name: result}, {"wall_ms": True, "ready_ms": True},
+                          threshold=args.threshold)
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,32 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, Callable
-import asyncio
+import time
+from common.metrics import get_metrics
+from common.scheduler import FixedRateScheduler
+from server.logger import server_logger
+
+_metrics = get_metrics()
+TICK_DURATION_MS = _metrics.histogram(
+    "scv_tick_duration_ms", "Provider tick: generation, fusion and broadcast, ms", ("provider",)
+)
+GENERATE_MS = _metrics.histogram(
+    "scv_generate_ms", "Provider generate_data and fusion stage, ms", ("provider",)
+)
+SCHEDULER_LAG_MS = _metrics.histogram(
+    "scv_scheduler_lag_ms", "Tick lateness relative to the scheduler deadline, ms", ("provider",)
+)
+PROVIDER_FRAMES = _metrics.counter(
+    "scv_provider_frames_total", "Frames produced by the provider", ("provider",)
+)
 
 
 class DataProviderBase(ABC):
     def __init__(self, manifest: dict):
         self.manifest = manifest
         self.data_rate = self._get_data_rate()
+        self.scheduler = self._create_scheduler()
+        # Необязательная стадия слияния данных датчиков: (кадр, dt) -> кадр
+        self.fusion = None
         self._running = False
         self.latest_data = None
         self._send_callback: Optional[Callable[[Any], None]] = None
@@ -18,13 +38,31 @@ class DataProviderBase(ABC):
             return rate_config.get('rate', 100)  # Hz
         return None  # Для режима source частота определяется источником
 
+    def _create_scheduler(self) -> Optional[FixedRateScheduler]:
+        """Создаем планировщик для режима fixed"""
+        if not self.data_rate:
+            return None
+        rate_config = self.manifest.get('data_rate', {})
+        return FixedRateScheduler(
+            self.data_rate,
+            policy=rate_config.get('missed_tick_policy', 'catch_up'),
+            max_catch_up=rate_config.get('max_catch_up', 10)
+        )
+
     @abstractmethod
-    async def generate_data(self) -> Optional[Dict[str, Any]]:
+    async def generate_data(self, dt: float) -> Optional[Dict[str, Any]]:
         """
-        Генерация данных в стандартном формате
+        Генерация данных в стандартном формате (словарь или PoseFrame)
+
+        Args:
+            dt: Шаг времени с предыдущего тика в секундах
         """
         pass
 
+    async def wait_source(self) -> None:
+        """Режим source: ожидание новых данных источника перед тиком"""
+        pass
+
     async def start(self, send_callback: Callable[[Any], None]) -> None:
         """
         Запуск провайдера
@@ -34,17 +72,43 @@ class DataProviderBase(ABC):
         """
         self._send_callback = send_callback
         self._running = True
-        
+        if self.scheduler:
+            self.scheduler.reset()
+        last_tick = time.monotonic()
+
+        # Экземпляры метрик берутся один раз, в цикле - только наблюдения
+        name = self.manifest.get('name', type(self).__name__)
+        tick_ms = TICK_DURATION_MS.labels(provider=name)
+        generate_ms = GENERATE_MS.labels(provider=name)
+        frames = PROVIDER_FRAMES.labels(provider=name)
+        if self.scheduler:
+            # Опоздания тиков уже считает планировщик - публикуем его гистограмму
+            SCHEDULER_LAG_MS.attach(self.scheduler.jitter_ms, provider=name)
+
         try:
             while self._running:
+                # Ждем дедлайн следующего тика согласно частоте
+                if self.scheduler:
+                    dt = await self.scheduler.wait_next_tick()
+                else:
+                    await self.wait_source()
+                    now = time.monotonic()
+                    dt, last_tick = now - last_tick, now
+                started = time.perf_counter()
                 # Генерируем новые данные
-                data = await self.generate_data()
-                # Если есть данные - отправляем
-                if data:
-                    await self._send_callback(data)
-                # Ждем следующий цикл согласно частоте
-                if self.data_rate:
-                    await asyncio.sleep(1.0 / self.data_rate)
+                data = await self.generate_data(dt)
+                # Сырые показания датчиков превращаем в позы общей стадией
+                if self.fusion is not None and data is not None:
+                    data = self.fusion.apply(data, dt)
+                generate_ms.observe((time.perf_counter() - started) * 1000.0)
+                # Если есть данные - отправляем; ошибка отправки не останавливает генерацию
+                if data is not None:
+                    frames.inc()
+                    try:
+                        await send_callback(data)
+                    except Exception as e:
+                        server_logger.error("Error in provider send callback: %s", e)
+                tick_ms.observe((time.perf_counter() - started) * 1000.0)
         except Exception as e:
             self._running = False
             raise
@@ -53,3 +117,7 @@ class DataProviderBase(ABC):
         """Остановка провайдера"""
         self._running = False
         self._send_callback = None
+
+    def timing_stats(self) -> Optional[Dict[str, Any]]:
+        """Статистика планировщика (джиттер и превышения периода)"""
+        return self.scheduler.stats() if self.scheduler else None
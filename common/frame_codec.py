@@ -0,0 +1,354 @@
+import json
+import struct
+from enum import Enum
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Версия бинарного протокола кадров
+FRAME_VERSION = 1
+
+# Тип бинарного сообщения
+FRAME_TYPE_POSES = 0
+FRAME_TYPE_KEYFRAME = 1  # квантованные абсолютные позы, int32
+FRAME_TYPE_DELTA = 2     # квантованные приращения к предыдущему кадру, int16
+FRAME_TYPE_IMU = 3       # сырые показания IMU, float32
+
+# Заголовок: версия (u8), тип (u8), id потока (u16), номер кадра (u32),
+# метка времени сервера в секундах (f64), количество пластин (u32).
+# Размер кратен 4, поэтому записи читаются прямо в Float32Array.
+FRAME_HEADER = struct.Struct('<BBHIdI')
+
+# Запись пластины (float32): plate_id, x, y, z, roll, pitch, yaw, thickness, height, width
+RECORD_FIELDS = 10
+RECORD_SIZE = RECORD_FIELDS * 4
+
+# Запись IMU (float32): plate_id, accel xyz, gyro xyz, mag xyz
+IMU_RECORD_FIELDS = 10
+
+# Квантованная запись для режима delta: x, y, z, roll, pitch, yaw
+QUANTIZED_FIELDS = 6
+DELTA_LIMIT = np.iinfo(np.int16).max
+
+
+class Encoding(str, Enum):
+    """Кодирование кадров потока /ws"""
+    JSON = "json"
+    BINARY = "binary"
+    DELTA = "delta"
+
+
+class PoseFrame:
+    """
+    Кадр поз пластин в виде массивов (N,).
+    Провайдеры могут возвращать его вместо словаря, чтобы бинарное
+    кодирование не проходило через промежуточные списки Python.
+    """
+    __slots__ = ('plate_ids', 'positions', 'orientations', 'dimensions', 'imu')
+
+    def __init__(self, plate_ids: np.ndarray, positions: np.ndarray,
+                 orientations: np.ndarray, dimensions: Optional[np.ndarray] = None,
+                 imu: Optional[np.ndarray] = None):
+        self.plate_ids = plate_ids
+        self.positions = positions
+        self.orientations = orientations
+        self.dimensions = dimensions
+        # Необязательный канал сырых показаний IMU: структурированный массив
+        # с полями plate_id, accel, gyro, mag
+        self.imu = imu
+
+    def __len__(self) -> int:
+        return len(self.plate_ids)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PoseFrame':
+        """Создает кадр из словаря в стандартном формате провайдера"""
+        plates = data.get("plates", [])
+        dimensions = None
+        if plates and all(plate.get("dimensions") is not None for plate in plates):
+            dimensions = np.array([plate["dimensions"] for plate in plates], dtype=np.float64)
+        return cls(
+            np.array([plate["plate_id"] for plate in plates], dtype=np.int64),
+            np.array([plate["position"] for plate in plates], dtype=np.float64).reshape(-1, 3),
+            np.array([plate["orientation"] for plate in plates], dtype=np.float64).reshape(-1, 3),
+            dimensions
+        )
+
+    def to_dict(self, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Стандартный формат провайдера (для JSON)
+
+        Args:
+            fields: Подмножество полей position, orientation, dimensions, imu;
+                None - все поля
+        """
+        columns = {}
+        if fields is None or "position" in fields:
+            columns["position"] = self.positions.tolist()
+        if fields is None or "orientation" in fields:
+            columns["orientation"] = self.orientations.tolist()
+        if fields is None or "dimensions" in fields:
+            columns["dimensions"] = self.dimensions.tolist() if self.dimensions is not None \
+                else [None] * len(self)
+        message = {
+            "version": "1.0",
+            "plates": [
+                {"plate_id": plate_id, **dict(zip(columns, values))}
+                for plate_id, *values in zip(self.plate_ids.tolist(), *columns.values())
+            ]
+        }
+        if self.imu is not None and (fields is None or "imu" in fields):
+            message["imu"] = [
+                {"plate_id": plate_id, "accel": accel, "gyro": gyro, "mag": mag}
+                for plate_id, accel, gyro, mag in zip(
+                    self.imu['plate_id'].tolist(),
+                    self.imu['accel'].tolist(),
+                    self.imu['gyro'].tolist(),
+                    self.imu['mag'].tolist()
+                )
+            ]
+        return message
+
+
+FrameData = Union[PoseFrame, Dict[str, Any]]
+
+
+def encode_json(data: FrameData, seq: int, timestamp: float, stream_id: int = 0,
+                fields: Optional[Sequence[str]] = None) -> str:
+    """Кодирует кадр в JSON (резервный формат)"""
+    if not isinstance(data, PoseFrame) and fields is not None:
+        data = PoseFrame.from_dict(data)
+    message = data.to_dict(fields) if isinstance(data, PoseFrame) else dict(data)
+    message["stream_id"] = stream_id
+    message["seq"] = seq
+    message["timestamp"] = timestamp
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_binary(data: FrameData, seq: int, timestamp: float, stream_id: int = 0,
+                  fields: Optional[Sequence[str]] = None) -> bytes:
+    """
+    Кодирует кадр в бинарный формат: заголовок FRAME_HEADER и N записей
+    по RECORD_FIELDS значений float32 (little-endian). Раскладка записи
+    фиксирована, поля вне fields передаются нулями.
+    """
+    frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+    count = len(frame)
+
+    buffer = bytearray(FRAME_HEADER.size + count * RECORD_SIZE)
+    FRAME_HEADER.pack_into(
+        buffer, 0, FRAME_VERSION, FRAME_TYPE_POSES, stream_id,
+        seq & 0xFFFFFFFF, timestamp, count
+    )
+    records = np.frombuffer(buffer, dtype='<f4', offset=FRAME_HEADER.size)
+    records = records.reshape(count, RECORD_FIELDS)
+    records[:, 0] = frame.plate_ids
+    if fields is None or "position" in fields:
+        records[:, 1:4] = frame.positions
+    if fields is None or "orientation" in fields:
+        records[:, 4:7] = frame.orientations
+    if frame.dimensions is not None and (fields is None or "dimensions" in fields):
+        records[:, 7:10] = frame.dimensions
+    return bytes(buffer)
+
+
+def encode_imu_binary(data: FrameData, seq: int, timestamp: float,
+                      stream_id: int = 0) -> Optional[bytes]:
+    """
+    Кодирует канал IMU кадра отдельным бинарным сообщением FRAME_TYPE_IMU
+    (тот же заголовок, N записей по IMU_RECORD_FIELDS значений float32)
+
+    Returns:
+        Сообщение или None, если в кадре нет показаний IMU
+    """
+    imu = data.imu if isinstance(data, PoseFrame) else None
+    if imu is None:
+        return None
+    count = len(imu)
+
+    buffer = bytearray(FRAME_HEADER.size + count * IMU_RECORD_FIELDS * 4)
+    FRAME_HEADER.pack_into(
+        buffer, 0, FRAME_VERSION, FRAME_TYPE_IMU, stream_id,
+        seq & 0xFFFFFFFF, timestamp, count
+    )
+    records = np.frombuffer(buffer, dtype='<f4', offset=FRAME_HEADER.size)
+    records = records.reshape(count, IMU_RECORD_FIELDS)
+    records[:, 0] = imu['plate_id']
+    records[:, 1:4] = imu['accel']
+    records[:, 4:7] = imu['gyro']
+    records[:, 7:10] = imu['mag']
+    return bytes(buffer)
+
+
+def decode_binary(payload: bytes) -> Dict[str, Any]:
+    """Разбирает бинарный кадр (для python-клиентов и проверок)"""
+    version, frame_type, stream_id, seq, timestamp, count = FRAME_HEADER.unpack_from(payload, 0)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version: {version}")
+    records = np.frombuffer(payload, dtype='<f4', offset=FRAME_HEADER.size,
+                            count=count * RECORD_FIELDS).reshape(count, RECORD_FIELDS)
+    return {
+        "version": version,
+        "type": frame_type,
+        "stream_id": stream_id,
+        "seq": seq,
+        "timestamp": timestamp,
+        "records": records
+    }
+
+
+class DeltaEncoder:
+    """
+    Кодировщик режима delta. Статические данные пластин (id, размеры)
+    отправляются отдельным JSON-сообщением metadata, затем идут квантованные
+    ключевые кадры (int32) и приращения между ними (int16).
+    Приращения считаются между квантованными значениями, поэтому ошибка
+    на клиенте не накапливается.
+    """
+    def __init__(self, keyframe_interval: int = 100,
+                 position_quantum: float = 0.1, angle_quantum: float = 1e-4,
+                 stream_id: int = 0):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.stream_id = stream_id
+        self.position_quantum = position_quantum  # мм
+        self.angle_quantum = angle_quantum        # рад
+        self.metadata: Optional[str] = None
+
+        self._plate_ids: Optional[np.ndarray] = None
+        self._dimensions: Optional[np.ndarray] = None
+        self._previous: Optional[np.ndarray] = None
+        self._current: Optional[np.ndarray] = None
+        self._since_keyframe = 0
+        self._force_keyframe = True
+
+    def request_keyframe(self) -> None:
+        """Следующий кадр будет ключевым (новый подписчик или запрос клиента)"""
+        self._force_keyframe = True
+
+    def _update_metadata(self, frame: PoseFrame) -> bool:
+        """Обновляет metadata, если изменился состав или размеры пластин"""
+        if (self._plate_ids is not None
+                and np.array_equal(self._plate_ids, frame.plate_ids)
+                and (frame.dimensions is None
+                     or np.array_equal(self._dimensions, frame.dimensions))):
+            return False
+
+        self._plate_ids = np.array(frame.plate_ids, copy=True)
+        self._dimensions = None if frame.dimensions is None \
+            else np.array(frame.dimensions, copy=True)
+        dimensions = self._dimensions.tolist() if self._dimensions is not None \
+            else [None] * len(frame)
+        self.metadata = json.dumps({
+            "type": "metadata",
+            "stream_id": self.stream_id,
+            "position_quantum": self.position_quantum,
+            "angle_quantum": self.angle_quantum,
+            "keyframe_interval": self.keyframe_interval,
+            "plates": [
+                {"plate_id": plate_id, "dimensions": dims}
+                for plate_id, dims in zip(self._plate_ids.tolist(), dimensions)
+            ]
+        }, separators=(",", ":"))
+        self._previous = None
+        self._current = np.empty((len(frame), QUANTIZED_FIELDS), dtype=np.int64)
+        return True
+
+    def encode(self, data: FrameData, seq: int, timestamp: float) -> Tuple[Optional[str], bytes]:
+        """
+        Кодирует кадр
+
+        Returns:
+            (новое metadata или None, бинарный ключевой кадр или приращение)
+        """
+        frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+        metadata = self.metadata if self._update_metadata(frame) else None
+
+        current = self._current
+        np.rint(np.divide(frame.positions, self.position_quantum), out=current[:, 0:3],
+                casting='unsafe')
+        np.rint(np.divide(frame.orientations, self.angle_quantum), out=current[:, 3:6],
+                casting='unsafe')
+
+        keyframe = (self._force_keyframe or self._previous is None
+                    or self._since_keyframe >= self.keyframe_interval)
+        if not keyframe:
+            delta = current - self._previous
+            if np.abs(delta).max(initial=0) > DELTA_LIMIT:
+                keyframe = True
+
+        if keyframe:
+            frame_type, values, dtype = FRAME_TYPE_KEYFRAME, current, '<i4'
+            self._since_keyframe = 0
+            self._force_keyframe = False
+        else:
+            frame_type, values, dtype = FRAME_TYPE_DELTA, delta, '<i2'
+            self._since_keyframe += 1
+
+        header = FRAME_HEADER.pack(
+            FRAME_VERSION, frame_type, self.stream_id, seq & 0xFFFFFFFF, timestamp, len(frame)
+        )
+        payload = header + values.astype(dtype).tobytes()
+
+        if self._previous is None:
+            self._previous = np.empty_like(current)
+        self._previous[...] = current
+        return metadata, payload
+
+
+class DeltaDecoder:
+    """
+    Декодер режима delta (для python-клиентов и проверок), повторяет
+    DeltaStateDecoder из public/js/frame-codec.js
+    """
+    def __init__(self):
+        self.metadata: Optional[Dict[str, Any]] = None
+        self.last_seq: Optional[int] = None
+        self._quantized: Optional[np.ndarray] = None
+
+    def set_metadata(self, metadata: Union[str, Dict[str, Any]]) -> None:
+        """Принимает сообщение metadata; до следующего ключевого кадра приращения не применяются"""
+        self.metadata = json.loads(metadata) if isinstance(metadata, str) else metadata
+        self._quantized = np.zeros((len(self.metadata["plates"]), QUANTIZED_FIELDS),
+                                   dtype=np.int64)
+        self.last_seq = None
+
+    def decode(self, payload: bytes) -> Optional[PoseFrame]:
+        """
+        Returns:
+            Полный кадр или None, если нужен ключевой кадр
+        """
+        _, frame_type, _, seq, _, count = FRAME_HEADER.unpack_from(payload, 0)
+        if self.metadata is None or count != len(self._quantized):
+            return None
+
+        length = count * QUANTIZED_FIELDS
+        if frame_type == FRAME_TYPE_KEYFRAME:
+            self._quantized.flat[:] = np.frombuffer(payload, '<i4', length, FRAME_HEADER.size)
+        elif frame_type == FRAME_TYPE_DELTA:
+            # Приращение применимо только к непосредственно предыдущему кадру
+            if self.last_seq is None or seq != (self.last_seq + 1) & 0xFFFFFFFF:
+                self.last_seq = None
+                return None
+            self._quantized.flat[:] += np.frombuffer(payload, '<i2', length, FRAME_HEADER.size)
+        else:
+            return None
+        self.last_seq = seq
+
+        plates = self.metadata["plates"]
+        dimensions = None
+        if plates and all(plate["dimensions"] is not None for plate in plates):
+            dimensions = np.array([plate["dimensions"] for plate in plates], dtype=np.float64)
+        return PoseFrame(
+            np.array([plate["plate_id"] for plate in plates], dtype=np.int64),
+            self._quantized[:, 0:3] * self.metadata["position_quantum"],
+            self._quantized[:, 3:6] * self.metadata["angle_quantum"],
+            dimensions
+        )
+
+
+def encode_frame(data: FrameData, encoding: Encoding, seq: int, timestamp: float,
+                 stream_id: int = 0, fields: Optional[Sequence[str]] = None) -> Union[str, bytes]:
+    """Кодирует кадр в указанном формате"""
+    if encoding == Encoding.BINARY:
+        return encode_binary(data, seq, timestamp, stream_id, fields)
+    return encode_json(data, seq, timestamp, stream_id, fields)
@@ -0,0 +1,206 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from common.frame_codec import PoseFrame
+
+# Формат файла записи (.scvlog), little-endian:
+#   заголовок FILE_HEADER, затем plate_count записей PLATE_ENTRY
+#   (id пластины и размеры), выровнено до 8 байт;
+#   далее записи фиксированного размера: timestamp (f64) и позы
+#   plate_count x (x, y, z, roll, pitch, yaw) во float32.
+# Рядом лежит разреженный индекс времени (.idx): timestamp каждой
+# INDEX_STRIDE-й записи (f64), чтобы поиск по времени не читал весь файл.
+LOG_MAGIC = b'SCVLOG01'
+LOG_VERSION = 1
+FILE_HEADER = struct.Struct('<8sIII')  # magic, version, plate_count, record_size
+PLATE_ENTRY = struct.Struct('<i3f')    # plate_id, thickness, height, width
+POSE_FIELDS = 6
+INDEX_STRIDE = 1024
+INDEX_SUFFIX = '.idx'
+
+PathLike = Union[str, Path]
+
+
+def record_dtype(plate_count: int) -> np.dtype:
+    """Тип записи кадра для заданного количества пластин"""
+    return np.dtype([
+        ('timestamp', '<f8'),
+        ('poses', '<f4', (plate_count, POSE_FIELDS))
+    ])
+
+
+def _header_size(plate_count: int) -> int:
+    size = FILE_HEADER.size + plate_count * PLATE_ENTRY.size
+    return (size + 7) & ~7
+
+
+class FrameLogWriter:
+    """Дописывает кадры в файл записи и разреженный индекс времени"""
+    def __init__(self, path: PathLike, plate_ids: np.ndarray,
+                 dimensions: Optional[np.ndarray] = None, buffer_size: int = 1 << 20):
+        self.path = Path(path)
+        self.plate_count = len(plate_ids)
+        self.plate_ids = np.array(plate_ids, dtype=np.int64, copy=True)
+        self.dtype = record_dtype(self.plate_count)
+        self.records_written = 0
+        self.last_timestamp = float('-inf')
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'wb', buffering=buffer_size)
+        self._index = open(str(self.path) + INDEX_SUFFIX, 'wb')
+        self._record = np.zeros(1, dtype=self.dtype)
+
+        header = bytearray(_header_size(self.plate_count))
+        FILE_HEADER.pack_into(header, 0, LOG_MAGIC, LOG_VERSION, self.plate_count,
+                              self.dtype.itemsize)
+        if dimensions is None:
+            dimensions = np.zeros((self.plate_count, 3))
+        entries = zip(self.plate_ids.tolist(), dimensions.tolist())
+        for i, (plate_id, dims) in enumerate(entries):
+            PLATE_ENTRY.pack_into(header, FILE_HEADER.size + i * PLATE_ENTRY.size,
+                                  plate_id, *dims)
+        self._file.write(header)
+
+    def matches(self, frame: PoseFrame) -> bool:
+        """Подходит ли кадр к структуре файла (тот же набор пластин)"""
+        return np.array_equal(self.plate_ids, frame.plate_ids)
+
+    def append(self, frame: PoseFrame, timestamp: float) -> None:
+        """Дописывает кадр; метки времени должны не убывать"""
+        if timestamp < self.last_timestamp:
+            raise ValueError(f"Non-monotonic timestamp {timestamp} < {self.last_timestamp}")
+
+        record = self._record[0]
+        record['timestamp'] = timestamp
+        poses = record['poses']
+        poses[:, 0:3] = frame.positions
+        poses[:, 3:6] = frame.orientations
+        self._file.write(self._record.tobytes())
+
+        if self.records_written % INDEX_STRIDE == 0:
+            self._index.write(struct.pack('<d', timestamp))
+        self.records_written += 1
+        self.last_timestamp = timestamp
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._index.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            self._index.close()
+
+
+class FrameLogReader:
+    """
+    Чтение записи через mmap: файл не загружается в память целиком,
+    записи доступны как numpy-представление без копирования
+    """
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap: Optional[mmap.mmap] = None
+        self._index_mmap: Optional[mmap.mmap] = None
+
+        header = self._file.read(FILE_HEADER.size)
+        magic, version, plate_count, record_size = FILE_HEADER.unpack(header)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"Not a frame log: {self.path}")
+
+        self.plate_count = plate_count
+        self.dtype = record_dtype(plate_count)
+        if self.dtype.itemsize != record_size:
+            raise ValueError(f"Unexpected record size {record_size} in {self.path}")
+        self.header_size = _header_size(plate_count)
+
+        entries = self._file.read(plate_count * PLATE_ENTRY.size)
+        plates = [PLATE_ENTRY.unpack_from(entries, i * PLATE_ENTRY.size)
+                  for i in range(plate_count)]
+        self.plate_ids = np.array([plate[0] for plate in plates], dtype=np.int64)
+        self.dimensions = np.array([plate[1:] for plate in plates], dtype=np.float64)
+
+        self.records = np.zeros(0, dtype=self.dtype)
+        self.sparse_index = np.zeros(0, dtype='<f8')
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Переотображает файл (для записей, которые еще дописываются)"""
+        size = os.fstat(self._file.fileno()).st_size
+        count = max(0, size - self.header_size) // self.dtype.itemsize
+        if count == 0 or count == len(self.records):
+            return
+        # Старые отображения закрываются сборщиком мусора, когда на них
+        # не останется ссылок из выданных ранее кадров
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.records = np.ndarray((count,), dtype=self.dtype, buffer=self._mmap,
+                                  offset=self.header_size)
+
+        index_path = str(self.path) + INDEX_SUFFIX
+        if os.path.exists(index_path) and os.path.getsize(index_path) >= 8:
+            with open(index_path, 'rb') as f:
+                self._index_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.sparse_index = np.frombuffer(self._index_mmap, dtype='<f8',
+                                              count=len(self._index_mmap) // 8)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Представление меток времени всех записей (без копирования)"""
+        return self.records['timestamp']
+
+    def time_range(self) -> Tuple[float, float]:
+        if not len(self.records):
+            return (0.0, 0.0)
+        return (float(self.records[0]['timestamp']), float(self.records[-1]['timestamp']))
+
+    def index_at(self, timestamp: float) -> int:
+        """
+        Индекс последней записи с меткой времени <= timestamp.
+        Сначала ищем блок по разреженному индексу, затем внутри блока.
+        """
+        count = len(self.records)
+        if count == 0:
+            raise IndexError("Frame log is empty")
+
+        if not len(self.sparse_index):
+            position = int(np.searchsorted(self.timestamps, timestamp, side='right'))
+            return min(max(position - 1, 0), count - 1)
+
+        block = int(np.searchsorted(self.sparse_index, timestamp, side='right')) - 1
+        if block < 0:
+            return 0
+        lo = min(block * INDEX_STRIDE, count - 1)
+        # Последний блок индекса продолжается до конца файла
+        hi = count if block == len(self.sparse_index) - 1 else min(count, lo + INDEX_STRIDE)
+        position = lo + int(np.searchsorted(self.timestamps[lo:hi], timestamp, side='right'))
+        return min(max(position - 1, 0), count - 1)
+
+    def frame(self, index: int) -> Tuple[float, PoseFrame]:
+        """Метка времени и кадр записи с указанным индексом"""
+        record = self.records[index]
+        poses = record['poses']
+        return float(record['timestamp']), PoseFrame(
+            self.plate_ids, poses[:, 0:3], poses[:, 3:6], self.dimensions
+        )
+
+    def close(self) -> None:
+        self.records = np.zeros(0, dtype=self.dtype)
+        self.sparse_index = np.zeros(0, dtype='<f8')
+        for mapping in (self._mmap, self._index_mmap):
+            if mapping is not None:
+                try:
+                    mapping.close()
+                except BufferError:
+                    # На отображение еще ссылаются выданные кадры
+                    pass
+        self._mmap = None
+        self._index_mmap = None
+        self._file.close()
@@ -0,0 +1,227 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from common.frame_codec import FrameData, PoseFrame
+from common.kinematics import (chain_forward_kinematics, quaternion_multiply,
+                               quaternion_normalize, rotation_workspace)
+
+def _quat_to_matrix(q: np.ndarray, m: Optional[np.ndarray] = None) -> np.ndarray:
+    """Матрицы поворота (N,3,3) из единичных кватернионов (N,4)"""
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    if m is None:
+        m = np.empty((len(q), 3, 3))
+    m[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    m[:, 0, 1] = 2 * (x * y - w * z)
+    m[:, 0, 2] = 2 * (x * z + w * y)
+    m[:, 1, 0] = 2 * (x * y + w * z)
+    m[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    m[:, 1, 2] = 2 * (y * z - w * x)
+    m[:, 2, 0] = 2 * (x * z - w * y)
+    m[:, 2, 1] = 2 * (y * z + w * x)
+    m[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    return m
+
+
+def _matrix_to_quat(m: np.ndarray) -> np.ndarray:
+    """Единичные кватернионы (N,4) из матриц поворота (N,3,3)"""
+    q = np.empty((len(m), 4))
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    q[:, 0] = np.sqrt(np.maximum(0.0, 1 + trace)) / 2
+    q[:, 1] = np.sqrt(np.maximum(0.0, 1 + m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2])) / 2
+    q[:, 2] = np.sqrt(np.maximum(0.0, 1 - m[:, 0, 0] + m[:, 1, 1] - m[:, 2, 2])) / 2
+    q[:, 3] = np.sqrt(np.maximum(0.0, 1 - m[:, 0, 0] - m[:, 1, 1] + m[:, 2, 2])) / 2
+    q[:, 1] = np.copysign(q[:, 1], m[:, 2, 1] - m[:, 1, 2])
+    q[:, 2] = np.copysign(q[:, 2], m[:, 0, 2] - m[:, 2, 0])
+    q[:, 3] = np.copysign(q[:, 3], m[:, 1, 0] - m[:, 0, 1])
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def _matrix_to_euler(m: np.ndarray) -> np.ndarray:
+    """Углы (roll, pitch, yaw) в соглашении create_rotation_matrix: R = Rx·Ry·Rz"""
+    return np.stack((
+        np.arctan2(-m[:, 1, 2], m[:, 2, 2]),
+        np.arcsin(np.clip(m[:, 0, 2], -1.0, 1.0)),
+        np.arctan2(-m[:, 0, 1], m[:, 0, 0])
+    ), axis=1)
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(norm > 0, norm, 1.0)
+
+
+class ComplementaryFusion:
+    """
+    Пакетный комплементарный фильтр (схема Махони) для всех пластин цепочки.
+    Гироскоп интегрируется в кватернион, а накопленный дрейф корректируется
+    по направлению вертикали (акселерометр) и магнитного севера (магнитометр).
+
+    Положения пластин восстанавливаются кинематикой цепочки: каждая пластина
+    начинается в конце предыдущей, конец = начало + R · (0, height, 0)
+    (chain_forward_kinematics).
+    """
+    def __init__(
+        self,
+        plate_count: int,
+        gain: float = 1.0,
+        heights: Optional[np.ndarray] = None,
+        base_position: Sequence[float] = (0.0, 0.0, 0.0),
+        chain_kinematics: bool = True
+    ):
+        self.plate_count = plate_count
+        self.gain = gain
+        self.heights = np.zeros(plate_count) if heights is None else np.asarray(heights, float)
+        self.base_position = np.asarray(base_position, dtype=np.float64)
+        self.chain_kinematics = chain_kinematics
+
+        self.quaternions: Optional[np.ndarray] = None
+        self._pending_dt = 0.0
+        self.orientations = np.zeros((plate_count, 3))
+        self.positions = np.zeros((plate_count, 3))
+
+        # Буферы шага фильтра: отсчеты обрабатываются без выделения памяти под кватернионы
+        self._work = rotation_workspace(plate_count)
+        self._rotation = np.empty((plate_count, 3, 3))
+        self._product = np.empty((plate_count, 4))
+        self._dq = np.ones((plate_count, 4))
+        self._ends = np.empty((plate_count, 3))
+
+    def reset(self) -> None:
+        self.quaternions = None
+        self._pending_dt = 0.0
+
+    def initialize(self, accel: np.ndarray, mag: np.ndarray) -> None:
+        """Начальная ориентация по вертикали и северу (TRIAD), показания (plates, 3)"""
+        up = _normalize(accel)
+        north = _normalize(mag - np.sum(mag * up, axis=1, keepdims=True) * up)
+        east = np.cross(north, up)
+        # Строки R - оси мира, выраженные в связанной системе
+        self.quaternions = _matrix_to_quat(np.stack((north, up, east), axis=1))
+        self._finish()
+
+    def update(self, accel: np.ndarray, gyro: np.ndarray, mag: np.ndarray,
+               dt: float) -> np.ndarray:
+        """
+        Обрабатывает пакет отсчетов
+
+        Args:
+            accel, gyro, mag: массивы (plates, samples, 3) или (plates, 3)
+            dt: шаг между отсчетами, секунды
+
+        Returns:
+            Углы (plates, 3) после последнего отсчета
+        """
+        if accel.ndim == 2:
+            accel, gyro, mag = accel[:, None], gyro[:, None], mag[:, None]
+
+        if self.quaternions is None:
+            self.initialize(accel[:, 0], mag[:, 0])
+
+        for s in range(accel.shape[1]):
+            self._step(self.quaternions, accel[:, s], gyro[:, s], mag[:, s], dt,
+                       self._rotation, self._dq, self._product, self._work)
+        return self._finish()
+
+    def update_samples(self, plates: np.ndarray, accel: np.ndarray, gyro: np.ndarray,
+                       mag: np.ndarray, dt: np.ndarray) -> np.ndarray:
+        """
+        Обрабатывает отсчеты отдельных пластин, каждый со своим шагом времени
+        (отсчеты шлюзов приходят с разной частотой и со своими метками времени).
+        Ориентация должна быть задана (initialize)
+
+        Args:
+            plates: номера пластин отсчетов (samples,), отсчеты пластины - по времени
+            accel, gyro, mag: показания (samples, 3)
+            dt: шаг от предыдущего отсчета той же пластины (samples,), секунды
+
+        Returns:
+            Углы (plates, 3) после последних отсчетов
+        """
+        # Раунд r - r-й отсчет каждой пластины: в раунде пластины не повторяются
+        order = np.argsort(plates, kind='stable')
+        sorted_plates = plates[order]
+        starts = np.flatnonzero(np.r_[True, sorted_plates[1:] != sorted_plates[:-1]])
+        counts = np.diff(np.r_[starts, len(plates)])
+        rounds = np.empty(len(plates), dtype=np.int64)
+        rounds[order] = np.arange(len(plates)) - np.repeat(starts, counts)
+
+        for r in range(int(rounds.max(initial=-1)) + 1):
+            index = np.flatnonzero(rounds == r)
+            rows = plates[index]
+            count = len(rows)
+            q = self.quaternions[rows]
+            self._step(q, accel[index], gyro[index], mag[index], dt[index, None],
+                       np.empty((count, 3, 3)), np.ones((count, 4)), np.empty((count, 4)),
+                       rotation_workspace(count))
+            self.quaternions[rows] = q
+        return self._finish()
+
+    def _step(self, q: np.ndarray, accel: np.ndarray, gyro: np.ndarray, mag: np.ndarray,
+              dt, rotation: np.ndarray, dq: np.ndarray, product: np.ndarray,
+              work: np.ndarray) -> None:
+        """Один отсчет для кватернионов q (k, 4); dt - число или (k, 1); q обновляется"""
+        _quat_to_matrix(q, rotation)
+        a = _normalize(accel)
+        m = _normalize(mag)
+
+        # Ожидаемая вертикаль в связанной системе: Rᵀ · up
+        v = rotation[:, 1, :]
+        error = np.cross(a, v)
+
+        # Магнитное поле в мире, приведенное к горизонтальному северу
+        h = np.einsum('nij,nj->ni', rotation, m)
+        b = np.stack((np.hypot(h[:, 0], h[:, 2]), h[:, 1], np.zeros(len(h))), axis=1)
+        w = np.einsum('nji,nj->ni', rotation, b)
+        error += np.cross(m, w)
+
+        omega = gyro + self.gain * error
+        # Приращение поворота за шаг: (1, ω·dt/2)
+        np.multiply(omega, 0.5 * dt, out=dq[:, 1:])
+        quaternion_multiply(q, dq, product, work)
+        quaternion_normalize(product, q, work)
+
+    def _finish(self) -> np.ndarray:
+        """Углы и положения пластин по текущим кватернионам"""
+        rotation = _quat_to_matrix(self.quaternions, self._rotation)
+        self.orientations = _matrix_to_euler(rotation)
+        if self.chain_kinematics:
+            self._update_positions(rotation)
+        return self.orientations
+
+    def _update_positions(self, rotation: np.ndarray) -> None:
+        """Позиции центров пластин по кинематике цепочки"""
+        # Центры - новый массив: прежние кадры могут еще хранить ссылку на positions
+        self.positions, _ = chain_forward_kinematics(
+            rotation, self.heights, self.base_position, ends=self._ends, work=self._work
+        )
+
+    def apply(self, data: FrameData, dt: float) -> FrameData:
+        """
+        Стадия конвейера провайдера: заменяет позы кадра оценкой по каналу IMU.
+        Без показаний IMU на этом шаге используется последняя оценка.
+        """
+        frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+        imu = frame.imu
+        # Отсчеты IMU могут приходить реже тиков провайдера
+        self._pending_dt += dt
+        if imu is not None and len(imu) == self.plate_count:
+            self.update(imu['accel'], imu['gyro'], imu['mag'], self._pending_dt)
+            self._pending_dt = 0.0
+        if self.quaternions is None:
+            return data
+
+        positions = self.positions if self.chain_kinematics else frame.positions
+        return PoseFrame(frame.plate_ids, positions, self.orientations, frame.dimensions, imu)
+
+    @classmethod
+    def from_config(cls, config: dict, plate_count: int,
+                    heights: Optional[np.ndarray] = None) -> 'ComplementaryFusion':
+        """Создает стадию по секции "fusion" манифеста"""
+        return cls(
+            plate_count,
+            gain=config.get('gain', 1.0),
+            heights=heights,
+            base_position=config.get('base_position', (0.0, 0.0, 0.0)),
+            chain_kinematics=config.get('kinematics', 'chain') == 'chain'
+        )
@@ -0,0 +1,332 @@
+import asyncio
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Пакет шлюза цепочки датчиков (little-endian): заголовок INGEST_HEADER, затем count
+# записей одного вида. Записи - отсчеты отдельных датчиков (по одному на пластину
+# и момент времени), в одном пакете могут быть отсчеты многих пластин и моментов.
+INGEST_MAGIC = b'SCVI'
+INGEST_VERSION = 1
+INGEST_HEADER = struct.Struct('<4sBBHII')  # magic, version, kind, gateway_id, packet_seq, count
+
+KIND_POSE = 1
+KIND_IMU = 2
+
+# Отсчет позы: номер отсчета датчика, время шлюза (с), положение (мм), углы (рад)
+POSE_SAMPLE_DTYPE = np.dtype([
+    ('plate_id', '<u4'),
+    ('seq', '<u4'),
+    ('timestamp', '<f8'),
+    ('position', '<f4', (3,)),
+    ('orientation', '<f4', (3,))
+])
+
+# Отсчет IMU: те же поля, что у канала IMU провайдеров
+IMU_SAMPLE_DTYPE = np.dtype([
+    ('plate_id', '<u4'),
+    ('seq', '<u4'),
+    ('timestamp', '<f8'),
+    ('accel', '<f4', (3,)),
+    ('gyro', '<f4', (3,)),
+    ('mag', '<f4', (3,))
+])
+
+SAMPLE_DTYPES = {KIND_POSE: POSE_SAMPLE_DTYPE, KIND_IMU: IMU_SAMPLE_DTYPE}
+
+# Номера отсчетов - u32 с переполнением; разница больше половины диапазона - отсчет из прошлого
+SEQ_MODULO = 1 << 32
+SEQ_HALF = 1 << 31
+
+# Окно оценки смещения часов шлюза, секунды
+CLOCK_WINDOW = 10.0
+DEFAULT_RING_CAPACITY = 65536
+# Пластин в источнике: номера plate_id от 0 до plate_count - 1, остальные отсчеты
+# отбрасываются до учета номеров (иначе plate_id задавал бы размер массивов трекера)
+DEFAULT_PLATE_COUNT = 16
+
+
+def encode_ingest_packet(kind: int, samples: np.ndarray, gateway_id: int = 0,
+                         packet_seq: int = 0) -> bytes:
+    """Собирает пакет шлюза из массива отсчетов (POSE_SAMPLE_DTYPE или IMU_SAMPLE_DTYPE)"""
+    samples = np.asarray(samples, dtype=SAMPLE_DTYPES[kind])
+    header = INGEST_HEADER.pack(INGEST_MAGIC, INGEST_VERSION, kind, gateway_id,
+                                packet_seq & 0xFFFFFFFF, len(samples))
+    return header + samples.tobytes()
+
+
+def decode_ingest_packet(packet: bytes) -> Tuple[int, int, int, np.ndarray]:
+    """
+    Разбирает пакет без копирования записей
+
+    Returns:
+        (вид отсчетов, id шлюза, номер пакета, массив отсчетов)
+
+    Raises:
+        ValueError: если пакет поврежден
+    """
+    if len(packet) < INGEST_HEADER.size:
+        raise ValueError(f"Ingest packet too short: {len(packet)} bytes")
+    magic, version, kind, gateway_id, packet_seq, count = INGEST_HEADER.unpack_from(packet, 0)
+    if magic != INGEST_MAGIC or version != INGEST_VERSION:
+        raise ValueError(f"Unsupported ingest packet: {magic!r} v{version}")
+    dtype = SAMPLE_DTYPES.get(kind)
+    if dtype is None:
+        raise ValueError(f"Unknown sample kind: {kind}")
+    if len(packet) != INGEST_HEADER.size + count * dtype.itemsize:
+        raise ValueError(f"Ingest packet size mismatch: {len(packet)} bytes for {count} samples")
+    samples = np.frombuffer(packet, dtype=dtype, count=count, offset=INGEST_HEADER.size)
+    return kind, gateway_id, packet_seq, samples
+
+
+class SampleRing:
+    """
+    Кольцевой буфер отсчетов с одним писателем. Писатель никогда не ждет
+    читателей: при переполнении затираются самые старые отсчеты, а читатель
+    узнает о потере по своему курсору. Курсор - число записанных отсчетов
+    за все время, поэтому читателей может быть несколько, и блокировки не нужны:
+    write_index увеличивается только после копирования данных.
+    """
+    def __init__(self, dtype: np.dtype, capacity: int = DEFAULT_RING_CAPACITY):
+        if capacity < 1:
+            raise ValueError(f"Invalid ring capacity: {capacity}")
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.write_index = 0
+
+    def push(self, samples: np.ndarray) -> None:
+        count = len(samples)
+        if count > self.capacity:
+            # Больше емкости - в буфере остаются только последние отсчеты
+            self.write_index += count - self.capacity
+            samples = samples[-self.capacity:]
+            count = self.capacity
+        start = self.write_index % self.capacity
+        first = min(count, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:count - first] = samples[first:]
+        self.write_index += count
+
+    def read(self, cursor: int) -> Tuple[np.ndarray, int, int]:
+        """
+        Отсчеты, записанные после cursor
+
+        Returns:
+            (копия отсчетов, новый курсор, сколько отсчетов читатель потерял)
+        """
+        end = self.write_index
+        lost = max(0, end - self.capacity - cursor)
+        cursor += lost
+        count = end - cursor
+        start = cursor % self.capacity
+        if start + count <= self.capacity:
+            samples = self.buffer[start:start + count].copy()
+        else:
+            tail = start + count - self.capacity
+            samples = np.concatenate((self.buffer[start:], self.buffer[:tail]))
+        return samples, end, lost
+
+
+class SequenceTracker:
+    """
+    Номера отсчетов каждого датчика (пластины): пропуски считаются потерянными
+    отсчетами, повторы и отсчеты из прошлого отбрасываются. Пакет обрабатывается
+    целиком векторно, отсчеты одной пластины внутри пакета идут в порядке прихода.
+    """
+    def __init__(self):
+        self.last_seq = np.full(0, -1, dtype=np.int64)
+        self.gaps = np.zeros(0, dtype=np.int64)
+        self.lost = 0
+        self.stale = 0
+
+    def _grow(self, size: int) -> None:
+        if size <= len(self.last_seq):
+            return
+        extra = size - len(self.last_seq)
+        self.last_seq = np.concatenate((self.last_seq, np.full(extra, -1, dtype=np.int64)))
+        self.gaps = np.concatenate((self.gaps, np.zeros(extra, dtype=np.int64)))
+
+    def update(self, plate_ids: np.ndarray, seqs: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            Маска принятых отсчетов
+        """
+        count = len(plate_ids)
+        accepted = np.ones(count, dtype=bool)
+        if not count:
+            return accepted
+        self._grow(int(plate_ids.max()) + 1)
+
+        # Устойчивая сортировка по пластине сохраняет порядок прихода внутри пластины
+        order = np.argsort(plate_ids, kind='stable')
+        plates = plate_ids[order].astype(np.int64)
+        current = seqs[order].astype(np.int64)
+        first = np.ones(count, dtype=bool)
+        first[1:] = plates[1:] != plates[:-1]
+        last = np.ones(count, dtype=bool)
+        last[:-1] = first[1:]
+
+        # Внутри пакета отсчет сравнивается с наибольшим номером до него
+        # (переход номера через 2^32 внутри одного пакета не учитывается);
+        # сдвиг на номер группы не дает максимуму перейти к следующей пластине
+        group = np.cumsum(first) * SEQ_MODULO
+        running = np.maximum.accumulate(current + group) - group
+        previous = np.empty(count, dtype=np.int64)
+        previous[1:] = running[:-1]
+        previous[first] = self.last_seq[plates[first]]
+        known = previous >= 0
+        delta = (current - previous) % SEQ_MODULO
+
+        stale = known & ((delta == 0) | (delta >= SEQ_HALF))
+        missing = np.where(known & ~stale, delta - 1, 0)
+        if missing.any():
+            np.add.at(self.gaps, plates, missing)
+            self.lost += int(missing.sum())
+        self.stale += int(stale.sum())
+        accepted[order[stale]] = False
+
+        # Последний номер пластины не уходит назад, если весь пакет устарел
+        newest = running[last]
+        old = self.last_seq[plates[last]]
+        behind = (old >= 0) & (((newest - old) % SEQ_MODULO == 0)
+                               | ((newest - old) % SEQ_MODULO >= SEQ_HALF))
+        self.last_seq[plates[last]] = np.where(behind, old, newest)
+        return accepted
+
+
+class ClockAligner:
+    """
+    Перевод времени шлюза в часы сервера. Смещение - минимум
+    (время приема - время шлюза) за окно: минимальная задержка сети
+    ближе всего к нулю. Окно перезапускается, чтобы следовать дрейфу часов.
+    """
+    def __init__(self, window: float = CLOCK_WINDOW):
+        self.window = window
+        self.offset: Optional[float] = None
+        self._window_min = np.inf
+        self._window_start: Optional[float] = None
+
+    def align(self, timestamps: np.ndarray, received: float) -> np.ndarray:
+        if not len(timestamps):
+            return timestamps.astype(np.float64)
+        offset = received - float(timestamps.max())
+        self._window_min = min(self._window_min, offset)
+        if self._window_start is None:
+            self._window_start = received
+        if self.offset is None or offset < self.offset:
+            self.offset = offset
+        elif received - self._window_start >= self.window:
+            self.offset = self._window_min
+            self._window_min = offset
+            self._window_start = received
+        return timestamps + self.offset
+
+
+class IngestSource:
+    """Отсчеты одного источника (провайдера в режиме source) от всех его шлюзов"""
+    def __init__(self, name: str, capacity: int = DEFAULT_RING_CAPACITY,
+                 plate_count: int = DEFAULT_PLATE_COUNT):
+        if plate_count < 1:
+            raise ValueError(f"Invalid plate count: {plate_count}")
+        self.name = name
+        self.plate_count = plate_count
+        self.rings = {kind: SampleRing(dtype, capacity) for kind, dtype in SAMPLE_DTYPES.items()}
+        self.sequences = {kind: SequenceTracker() for kind in SAMPLE_DTYPES}
+        self.clocks: Dict[int, ClockAligner] = {}
+        self.data_ready = asyncio.Event()
+        self.packets = 0
+        self.samples = 0
+        self.malformed = 0
+        # Отсчеты пластин вне 0..plate_count - 1
+        self.rejected = 0
+        self.last_packet_at: Optional[float] = None
+
+    def ingest(self, packet: bytes, received: float) -> int:
+        """
+        Принимает пакет шлюза; никогда не ждет читателей
+
+        Returns:
+            Число принятых отсчетов
+
+        Raises:
+            ValueError: если пакет поврежден
+        """
+        try:
+            kind, gateway_id, _, samples = decode_ingest_packet(packet)
+        except ValueError:
+            self.malformed += 1
+            raise
+        self.packets += 1
+        self.last_packet_at = received
+        known = samples['plate_id'] < self.plate_count
+        if not known.all():
+            self.rejected += int((~known).sum())
+            samples = samples[known]
+        accepted = self.sequences[kind].update(samples['plate_id'], samples['seq'])
+        if not accepted.all():
+            samples = samples[accepted]
+        if not len(samples):
+            return 0
+
+        clock = self.clocks.get(gateway_id)
+        if clock is None:
+            clock = self.clocks[gateway_id] = ClockAligner()
+        # Записи пакета только для чтения - время выравнивается в копии
+        samples = np.array(samples, copy=True)
+        samples['timestamp'] = clock.align(samples['timestamp'], received)
+        self.rings[kind].push(samples)
+        self.samples += len(samples)
+        self.data_ready.set()
+        return len(samples)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "packets": self.packets,
+            "samples": self.samples,
+            "malformed": self.malformed,
+            "rejected": self.rejected,
+            "last_packet_at": self.last_packet_at,
+            "gateways": {
+                str(gateway_id): {"clock_offset": clock.offset}
+                for gateway_id, clock in self.clocks.items()
+            },
+            "kinds": {
+                name: {
+                    "written": self.rings[kind].write_index,
+                    "lost": self.sequences[kind].lost,
+                    "stale": self.sequences[kind].stale
+                } for kind, name in ((KIND_POSE, "pose"), (KIND_IMU, "imu"))
+            }
+        }
+
+
+class IngestHub:
+    """Источники по имени провайдера: приемники пишут в них, провайдеры читают"""
+    def __init__(self):
+        self._sources: Dict[str, IngestSource] = {}
+
+    def source(self, name: str, capacity: int = DEFAULT_RING_CAPACITY,
+               plate_count: int = DEFAULT_PLATE_COUNT) -> IngestSource:
+        source = self._sources.get(name)
+        if source is None:
+            source = self._sources[name] = IngestSource(name, capacity, plate_count)
+        return source
+
+    def sources(self) -> Dict[str, IngestSource]:
+        return self._sources.copy()
+
+    def status(self) -> Dict[str, Any]:
+        return {name: source.status() for name, source in self._sources.items()}
+
+
+# Глобальный экземпляр хаба приема
+_ingest_hub: Optional[IngestHub] = None
+
+
+def get_ingest_hub() -> IngestHub:
+    """Получает глобальный экземпляр хаба приема"""
+    global _ingest_hub
+    if _ingest_hub is None:
+        _ingest_hub = IngestHub()
+    return _ingest_hub
@@ -0,0 +1,167 @@
+''' Пакетные ядра поворотов и кинематики цепочки (общие для провайдеров и fusion) '''
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Ядра обрабатывают всю цепочку сразу: углы (N, 3), матрицы (N, 3, 3), кватернионы
+# (N, 4) в порядке (w, x, y, z). Результат пишется в out, промежуточные значения - в
+# work (rotation_workspace): с буферами, сохраненными между тиками, ядра ничего не
+# выделяют. Без буферов они создаются. out не должен совпадать с входными массивами.
+
+def rotation_workspace(count: int) -> np.ndarray:
+    """Рабочий буфер ядер для цепочки из count пластин"""
+    return np.empty((3, count, 3))
+
+
+def _trig(angles: np.ndarray, work: Optional[np.ndarray], scale: float):
+    """cos и sin углов, умноженных на scale, в буферах work"""
+    if work is None:
+        work = rotation_workspace(len(angles))
+    c, s, tmp = work[0], work[1], work[2]
+    if scale != 1.0:
+        np.multiply(angles, scale, out=tmp)
+        angles = tmp
+    np.cos(angles, out=c)
+    np.sin(angles, out=s)
+    return c, s, tmp
+
+
+def _products(out: np.ndarray, terms, tmp: np.ndarray) -> np.ndarray:
+    """out = sum(sign * x * y) без временных массивов"""
+    (_, x, y), rest = terms[0], terms[1:]
+    np.multiply(x, y, out=out)
+    if terms[0][0] < 0:
+        np.negative(out, out=out)
+    for sign, x, y in rest:
+        np.multiply(x, y, out=tmp)
+        if sign < 0:
+            np.subtract(out, tmp, out=out)
+        else:
+            np.add(out, tmp, out=out)
+    return out
+
+
+def euler_to_matrix(angles: np.ndarray, out: Optional[np.ndarray] = None,
+                    work: Optional[np.ndarray] = None) -> np.ndarray:
+    """Матрицы поворота (N, 3, 3) по углам Эйлера, как create_rotation_matrix:
+    R = Rx(roll) @ Ry(pitch) @ Rz(yaw)"""
+    if out is None:
+        out = np.empty((len(angles), 3, 3))
+    c, s, tmp = _trig(angles, work, 1.0)
+    c1, c2, c3 = c[:, 0], c[:, 1], c[:, 2]
+    s1, s2, s3 = s[:, 0], s[:, 1], s[:, 2]
+    t0, s1s2, c1s2 = tmp[:, 0], tmp[:, 1], tmp[:, 2]
+    np.multiply(s1, s2, out=s1s2)
+    np.multiply(c1, s2, out=c1s2)
+
+    _products(out[:, 0, 0], ((1, c2, c3),), t0)
+    _products(out[:, 0, 1], ((-1, c2, s3),), t0)
+    out[:, 0, 2] = s2
+    _products(out[:, 1, 0], ((1, c1, s3), (1, c3, s1s2)), t0)
+    _products(out[:, 1, 1], ((1, c1, c3), (-1, s3, s1s2)), t0)
+    _products(out[:, 1, 2], ((-1, c2, s1),), t0)
+    _products(out[:, 2, 0], ((1, s1, s3), (-1, c3, c1s2)), t0)
+    _products(out[:, 2, 1], ((1, c3, s1), (1, s3, c1s2)), t0)
+    _products(out[:, 2, 2], ((1, c1, c2),), t0)
+    return out
+
+
+def euler_to_quaternion(angles: np.ndarray, out: Optional[np.ndarray] = None,
+                        work: Optional[np.ndarray] = None) -> np.ndarray:
+    """Единичные кватернионы (N, 4) по углам Эйлера: q = qx(roll) * qy(pitch) * qz(yaw)"""
+    if out is None:
+        out = np.empty((len(angles), 4))
+    # Кватерниону нужны половинные углы
+    c, s, tmp = _trig(angles, work, 0.5)
+    cx, cy, cz = c[:, 0], c[:, 1], c[:, 2]
+    sx, sy, sz = s[:, 0], s[:, 1], s[:, 2]
+    # Произведения первых двух множителей нужны всем компонентам
+    cxcy, sxsy, sxcy = tmp[:, 0], tmp[:, 1], tmp[:, 2]
+    np.multiply(cx, cy, out=cxcy)
+    np.multiply(sx, sy, out=sxsy)
+    np.multiply(sx, cy, out=sxcy)
+    np.multiply(cxcy, cz, out=out[:, 0])
+    np.multiply(sxsy, sz, out=out[:, 3])
+    np.subtract(out[:, 0], out[:, 3], out=out[:, 0])
+    np.multiply(sxsy, cz, out=out[:, 3])
+    np.multiply(cxcy, sz, out=cxcy)
+    np.add(cxcy, out[:, 3], out=out[:, 3])
+    # Осталось произведение cx * sy; буфер cxcy уже свободен
+    np.multiply(cx, sy, out=cxcy)
+    np.multiply(sxcy, cz, out=out[:, 1])
+    np.multiply(cxcy, sz, out=sxsy)
+    np.add(out[:, 1], sxsy, out=out[:, 1])
+    np.multiply(cxcy, cz, out=out[:, 2])
+    np.multiply(sxcy, sz, out=sxsy)
+    np.subtract(out[:, 2], sxsy, out=out[:, 2])
+    return out
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray, out: Optional[np.ndarray] = None,
+                        work: Optional[np.ndarray] = None) -> np.ndarray:
+    """Произведения Гамильтона a * b массивов кватернионов (N, 4)"""
+    if out is None:
+        out = np.empty(np.broadcast_shapes(a.shape, b.shape))
+    tmp = np.empty(out.shape[:-1]) if work is None else work[2][:, 0]
+    aw, ax, ay, az = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    bw, bx, by, bz = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+    _products(out[..., 0], ((1, aw, bw), (-1, ax, bx), (-1, ay, by), (-1, az, bz)), tmp)
+    _products(out[..., 1], ((1, aw, bx), (1, ax, bw), (1, ay, bz), (-1, az, by)), tmp)
+    _products(out[..., 2], ((1, aw, by), (-1, ax, bz), (1, ay, bw), (1, az, bx)), tmp)
+    _products(out[..., 3], ((1, aw, bz), (1, ax, by), (-1, ay, bx), (1, az, bw)), tmp)
+    return out
+
+
+def quaternion_normalize(q: np.ndarray, out: Optional[np.ndarray] = None,
+                         work: Optional[np.ndarray] = None) -> np.ndarray:
+    """Нормирует кватернионы (N, 4); out может быть самим q"""
+    if out is None:
+        out = np.empty_like(q)
+    norm = np.empty(len(q)) if work is None else work[2][:, 0]
+    np.einsum('ij,ij->i', q, q, out=norm)
+    np.sqrt(norm, out=norm)
+    np.divide(q, norm[:, None], out=out)
+    return out
+
+
+def rotate_points(rotations: np.ndarray, points: np.ndarray,
+                  out: Optional[np.ndarray] = None, inverse: bool = False) -> np.ndarray:
+    """
+    Пакетный apply_rotation: R[i] @ p[i] для точек (N, 3) или R[i] @ p для одной
+    точки (3,). С inverse=True - R[i].T (из мировой системы в систему пластины)
+    """
+    if out is None:
+        out = np.empty((len(rotations), 3))
+    subscripts = 'nji,' if inverse else 'nij,'
+    subscripts += 'nj->ni' if points.ndim == 2 else 'j->ni'
+    return np.einsum(subscripts, rotations, points, out=out)
+
+
+def chain_forward_kinematics(
+    rotations: np.ndarray,
+    heights: np.ndarray,
+    base: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+    centers: Optional[np.ndarray] = None,
+    ends: Optional[np.ndarray] = None,
+    work: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Пакетный calculate_end_point по цепочке: пластина начинается в конце
+    предыдущей, конец = начало + R @ (0, height, 0)
+
+    Returns:
+        (центры, концы) всех пластин, по (N, 3)
+    """
+    count = len(rotations)
+    if centers is None:
+        centers = np.empty((count, 3))
+    if ends is None:
+        ends = np.empty((count, 3))
+    segments = rotation_workspace(count)[2] if work is None else work[2]
+    # R @ (0, h, 0) - второй столбец R, умноженный на h
+    np.multiply(rotations[:, :, 1], heights[:, None], out=segments)
+    np.cumsum(segments, axis=0, out=ends)
+    np.add(ends, base, out=ends)
+    np.multiply(segments, 0.5, out=segments)
+    np.subtract(ends, segments, out=centers)
+    return centers, ends
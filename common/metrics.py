@@ -0,0 +1,172 @@
+''' Метрики в текстовом формате Prometheus '''
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from common.stats import DEFAULT_BUCKETS_MS, Histogram
+
+# Корзины для глубины очередей (число кадров)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class Counter:
+    """Монотонный счетчик"""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """Текущее значение"""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class MetricFamily:
+    """
+    Метрика с метками. Экземпляр для набора меток (labels) создается один раз;
+    на горячем пути вызывающий код хранит его и обновляет без поиска по меткам
+    """
+    def __init__(self, name: str, help_text: str, kind: str,
+                 labelnames: Sequence[str], factory: Callable[[], object]):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name}: expected labels {self.labelnames}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def labels(self, **labels):
+        """Экземпляр метрики (Counter, Gauge или Histogram) для набора меток"""
+        key = self._key(labels)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._factory()
+        return child
+
+    def attach(self, child: object, **labels) -> None:
+        """Публикует существующий объект (например, гистограмму планировщика)"""
+        self._children[self._key(labels)] = child
+
+    def remove(self, **labels) -> None:
+        self._children.pop(self._key(labels), None)
+
+    def clear(self) -> None:
+        self._children.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            if isinstance(child, Histogram):
+                lines.extend(_render_histogram(self.name, labels, child))
+            else:
+                lines.append(f"{self.name}{_format_labels(labels)} {_format_value(child.value)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render_histogram(name: str, labels: Dict[str, str], histogram: Histogram) -> List[str]:
+    """Корзины Prometheus накопительные: le - включительная верхняя граница"""
+    lines = []
+    cumulative = 0
+    bounds = [_format_value(b) for b in histogram.buckets] + ["+Inf"]
+    for bound, count in zip(bounds, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.total)}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса. Повторная регистрация метрики с тем же именем
+    возвращает существующую, поэтому модули объявляют свои метрики при импорте.
+    Сборщики (collectors) вызываются перед выдачей и обновляют метрики,
+    значения которых уже хранятся в другом месте (например, статистика соединений)
+    """
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _family(self, name: str, help_text: str, kind: str, labelnames: Sequence[str],
+                factory: Callable[[], object]) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(name, help_text, kind, labelnames,
+                                                          factory)
+        elif family.kind != kind or family.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} already registered as {family.kind} "
+                             f"with labels {family.labelnames}")
+        return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._family(name, help_text, "counter", labelnames, Counter)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._family(name, help_text, "gauge", labelnames, Gauge)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS_MS) -> MetricFamily:
+        return self._family(name, help_text, "histogram", labelnames,
+                            lambda: Histogram(buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[MetricFamily]:
+        return self._families.get(name)
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus 0.0.4"""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for family in self._families.values():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Глобальный реестр метрик
+_metrics: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Получает глобальный реестр метрик"""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
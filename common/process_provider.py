@@ -0,0 +1,192 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Type
+
+from common.base_provider import PROVIDER_FRAMES, TICK_DURATION_MS, DataProviderBase
+from common.shared_frames import SharedFrameRing
+from server.logger import server_logger
+
+# Сколько ждать штатного завершения воркера перед terminate(), секунды
+WORKER_STOP_TIMEOUT = 2.0
+
+
+async def _run_worker(provider_class: Type[DataProviderBase], manifest: dict,
+                      ring: SharedFrameRing, doorbell: int, control) -> None:
+    """Цикл провайдера внутри воркера: кадры пишутся в кольцевой буфер"""
+    provider = provider_class(manifest)
+    name = manifest.get('name')
+
+    async def publish(data: Any) -> None:
+        if not ring.write(data, time.time()):
+            server_logger.error(
+                "Provider %s: frame does not fit shared ring (capacity %d plates)",
+                name, ring.capacity
+            )
+            return
+        # Сигнал серверу; если канал переполнен, сервер и так проснется,
+        # а закрытый канал означает, что сервер уже останавливает воркер
+        try:
+            os.write(doorbell, b'\x01')
+        except (BlockingIOError, BrokenPipeError):
+            pass
+
+    task = asyncio.create_task(provider.start(publish))
+    loop = asyncio.get_running_loop()
+    # Сервер закрывает свой конец канала управления при остановке или завершении
+    await loop.run_in_executor(None, control.poll, None)
+    await provider.stop()
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+
+def worker_main(provider_class: Type[DataProviderBase], manifest: dict, ring_name: str,
+                doorbell, control) -> None:
+    """Точка входа процесса-воркера"""
+    ring = SharedFrameRing.attach(ring_name)
+    fd = doorbell.fileno()
+    os.set_blocking(fd, False)
+    try:
+        asyncio.run(_run_worker(provider_class, manifest, ring, fd, control))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        server_logger.error(f"Provider worker {manifest.get('name')} failed: {e}")
+    finally:
+        doorbell.close()
+        control.close()
+        ring.close()
+
+
+class ProcessProvider(DataProviderBase):
+    """
+    Провайдер, вынесенный в отдельный процесс. Воркер выполняет генерацию
+    (симуляцию, слияние данных датчиков) и пишет готовые кадры в кольцевой буфер
+    в разделяемой памяти, а цикл событий сервера только читает последний кадр
+    и раздает его. Тяжелые вычисления не задерживают обслуживание клиентов
+    и масштабируются по ядрам: каждый провайдер в своем процессе.
+
+    Включается секцией "execution" манифеста: {"mode": "process"}.
+    """
+    def __init__(self, provider_class: Type[DataProviderBase], manifest: dict):
+        super().__init__(manifest)
+        # Темп задает воркер, собственный планировщик не нужен
+        self.scheduler = None
+        self.provider_class = provider_class
+        execution = manifest.get('execution', {})
+        self.ring_slots = execution.get('ring_slots', 8)
+        self.max_plates = execution.get('max_plates', 1024)
+
+        self.ring: Optional[SharedFrameRing] = None
+        self.process: Optional[multiprocessing.Process] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker_exited = False
+
+    async def generate_data(self, dt: float) -> None:
+        """Кадры генерирует воркер, см. start()"""
+        return None
+
+    def _on_doorbell(self, fd: int) -> None:
+        try:
+            if not os.read(fd, 4096):
+                # Воркер закрыл канал - процесс завершился
+                self._worker_exited = True
+                asyncio.get_running_loop().remove_reader(fd)
+        except BlockingIOError:
+            return
+        self._wakeup.set()
+
+    async def start(self, send_callback: Callable[[Any], None]) -> None:
+        """Запускает воркер и раздает кадры из кольцевого буфера по мере готовности"""
+        name = self.manifest.get('name')
+        loop = asyncio.get_running_loop()
+        # spawn: воркер не наследует дескрипторы и потоки сервера
+        context = multiprocessing.get_context('spawn')
+
+        self.ring = SharedFrameRing.create(self.ring_slots, self.max_plates)
+        reader, writer = context.Pipe(duplex=False)
+        control_reader, control_writer = context.Pipe(duplex=False)
+        self.process = context.Process(
+            target=worker_main,
+            args=(self.provider_class, self.manifest, self.ring.name, writer, control_reader),
+            name=f"provider-{name}",
+            daemon=True
+        )
+        self.process.start()
+        writer.close()
+        control_reader.close()
+        server_logger.info(f"Started provider worker {name} (pid {self.process.pid})")
+
+        self._send_callback = send_callback
+        self._running = True
+        self._worker_exited = False
+        self._wakeup = asyncio.Event()
+        fd = reader.fileno()
+        os.set_blocking(fd, False)
+        loop.add_reader(fd, self._on_doorbell, fd)
+
+        # Генерация идет в воркере и в метрики сервера не попадает;
+        # тиком здесь считается чтение кадра из буфера и его раздача
+        tick_ms = TICK_DURATION_MS.labels(provider=name)
+        frames = PROVIDER_FRAMES.labels(provider=name)
+        last_seq = 0
+        try:
+            while self._running:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if self._worker_exited:
+                    server_logger.error(f"Provider worker {name} exited unexpectedly")
+                    break
+                started = time.perf_counter()
+                result = self.ring.read_latest(last_seq)
+                if result is None:
+                    continue
+                last_seq, _, frame = result
+                frames.inc()
+                try:
+                    await send_callback(frame)
+                except Exception as e:
+                    server_logger.error("Error in provider send callback: %s", e)
+                tick_ms.observe((time.perf_counter() - started) * 1000.0)
+        finally:
+            self._running = False
+            loop.remove_reader(fd)
+            await self._stop_worker(control_writer)
+            reader.close()
+
+    async def _stop_worker(self, control) -> None:
+        process, self.process = self.process, None
+        control.close()
+        try:
+            if process is not None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, process.join, WORKER_STOP_TIMEOUT)
+        finally:
+            # Ожидание может прервать отмена задачи - тогда воркер завершается сразу
+            if process is not None and process.is_alive():
+                server_logger.warning(f"Terminating provider worker {process.name}")
+                process.terminate()
+                process.join(WORKER_STOP_TIMEOUT)
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+
+    async def stop(self) -> None:
+        """Остановка: цикл чтения завершается, воркер останавливается в start()"""
+        self._running = False
+        self._send_callback = None
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def timing_stats(self) -> Optional[Dict[str, Any]]:
+        """Состояние воркера и кольцевого буфера"""
+        return {
+            "mode": "process",
+            "pid": self.process.pid if self.process else None,
+            "alive": bool(self.process and self.process.is_alive()),
+            "ring": self.ring.stats() if self.ring else None
+        }
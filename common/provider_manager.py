@@ -1,9 +1,10 @@
 import os
 import sys
 import json
-from typing import Dict, Optional, Type
+from typing import Dict, List, Optional, Type
 from pathlib import Path
 from common.base_provider import DataProviderBase
+from common.process_provider import ProcessProvider
 import importlib
 from server.logger import server_logger
 
@@ -13,6 +14,10 @@ class ProviderManager:
         self.providers_path = Path(providers_path)
         self.providers: Dict[str, dict] = {}  # name -> manifest
         self.provider_classes: Dict[str, Type[DataProviderBase]] = {}  # name -> class
+        self._modules: Dict[str, str] = {}  # name -> модуль провайдера
+        self._manifest_mtimes: Dict[Path, float] = {}
+        # Заранее созданные экземпляры: достаются первому запросу провайдера
+        self._warm: Dict[str, DataProviderBase] = {}
         
         # Добавляем корневую директорию в sys.path
         root_dir = str(self.providers_path.parent)
@@ -22,7 +27,11 @@ class ProviderManager:
         self._scan_providers()
 
     def _scan_providers(self):
-        """Сканирует директорию провайдеров и загружает их манифесты"""
+        """
+        Сканирует директорию провайдеров и загружает их манифесты.
+        Модули провайдеров не импортируются: это происходит при первом
+        обращении к провайдеру (см. get_provider)
+        """
         for provider_dir in self.providers_path.iterdir():
             if not provider_dir.is_dir():
                 continue
@@ -30,55 +39,121 @@ class ProviderManager:
             manifest_path = provider_dir / "manifest.json"
             if not manifest_path.exists():
                 continue
-
+            self._load_manifest(provider_dir, manifest_path)
+
+    def _load_manifest(self, provider_dir: Path, manifest_path: Path) -> Optional[str]:
+        """Читает манифест провайдера; возвращает имя провайдера"""
+        try:
+            mtime = manifest_path.stat().st_mtime
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except Exception as e:
+            server_logger.error(f"Error loading provider from {provider_dir}: {e}")
+            return None
+
+        provider_name = manifest.get("name")
+        if not provider_name:
+            return None
+        self.providers[provider_name] = manifest
+        # Экземпляр, созданный по старому манифесту, больше не годится
+        self._warm.pop(provider_name, None)
+        # Формируем путь импорта модуля: каталог провайдеров - пакет в sys.path
+        self._modules[provider_name] = (
+            f"{self.providers_path.name}.{provider_dir.name}.provider"
+        )
+        self._manifest_mtimes[manifest_path] = mtime
+        return provider_name
+
+    def reload_manifests(self) -> List[str]:
+        """
+        Перечитывает измененные манифесты и находит новые провайдеры.
+        Новые настройки применяются к следующему созданному экземпляру
+        провайдера; запущенные каналы перезапускает сервер
+
+        Returns:
+            Имена провайдеров, манифесты которых перечитаны
+        """
+        reloaded = []
+        for provider_dir in self.providers_path.iterdir():
+            manifest_path = provider_dir / "manifest.json"
             try:
-                # Загружаем манифест
-                with open(manifest_path) as f:
-                    manifest = json.load(f)
-                
-                provider_name = manifest.get("name")
-                if not provider_name:
-                    continue
-
-                # Формируем путь импорта модуля
-                module_name = f"providers.{provider_dir.name}.provider"
-                
-                try:
-                    # Импортируем модуль
-                    module = importlib.import_module(module_name)
-                    
-                    # Ищем класс провайдера в модуле
-                    for item_name in dir(module):
-                        item = getattr(module, item_name)
-                        if (isinstance(item, type) and 
-                            issubclass(item, DataProviderBase) and 
-                            item != DataProviderBase):
-                            self.providers[provider_name] = manifest
-                            self.provider_classes[provider_name] = item
-                            server_logger.info(f"Loaded provider: {provider_name}")
-                            break
-
-                except ImportError as e:
-                    server_logger.error(f"Error importing module {module_name}: {e}")
-
-            except Exception as e:
-                server_logger.error(f"Error loading provider from {provider_dir}: {e}")
+                mtime = manifest_path.stat().st_mtime
+            except OSError:
+                continue
+            if self._manifest_mtimes.get(manifest_path) == mtime:
+                continue
+            provider_name = self._load_manifest(provider_dir, manifest_path)
+            if provider_name:
+                server_logger.info(f"Reloaded manifest: {provider_name}")
+                reloaded.append(provider_name)
+        return reloaded
+
+    def _import_provider(self, name: str) -> Optional[Type[DataProviderBase]]:
+        """Импортирует модуль провайдера и ищет в нем класс провайдера"""
+        module_name = self._modules.get(name)
+        if module_name is None:
+            return None
+        try:
+            # Импортируем модуль
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            server_logger.error(f"Error importing module {module_name}: {e}")
+            return None
+
+        # Ищем класс провайдера в модуле
+        for item_name in dir(module):
+            item = getattr(module, item_name)
+            if (isinstance(item, type) and
+                issubclass(item, DataProviderBase) and
+                item not in (DataProviderBase, ProcessProvider)):
+                self.provider_classes[name] = item
+                server_logger.info(f"Loaded provider: {name}")
+                return item
+        server_logger.error(f"No provider class found in module {module_name}")
+        return None
 
     def get_provider(self, name: str) -> Optional[Type[DataProviderBase]]:
-        """Получает класс провайдера по имени"""
-        return self.provider_classes.get(name)
+        """Получает класс провайдера по имени; модуль импортируется при первом обращении"""
+        provider_class = self.provider_classes.get(name)
+        if provider_class is None:
+            provider_class = self._import_provider(name)
+        return provider_class
 
     def get_manifest(self, name: str) -> Optional[dict]:
         """Получает манифест провайдера по имени"""
         return self.providers.get(name)
 
     def create_provider(self, name: str) -> Optional[DataProviderBase]:
-        """Создает экземпляр провайдера по имени"""
+        """Создает экземпляр провайдера по имени (или отдает заранее созданный)"""
+        provider = self._warm.pop(name, None)
+        if provider is not None:
+            return provider
+        return self._instantiate(name)
+
+    def prewarm(self, name: str) -> bool:
+        """
+        Импортирует модуль провайдера и создает экземпляр заранее, чтобы
+        первый клиент не ждал импорта и инициализации
+
+        Returns:
+            True, если экземпляр готов
+        """
+        if name not in self._warm:
+            provider = self._instantiate(name)
+            if provider is None:
+                return False
+            self._warm[name] = provider
+        return True
+
+    def _instantiate(self, name: str) -> Optional[DataProviderBase]:
         provider_class = self.get_provider(name)
         manifest = self.get_manifest(name)
         
         if provider_class and manifest:
             try:
+                # Провайдер может выполняться в отдельном процессе-воркере
+                if manifest.get('execution', {}).get('mode') == 'process':
+                    return ProcessProvider(provider_class, manifest)
                 return provider_class(manifest)
             except Exception as e:
                 server_logger.error(f"Error creating provider {name}: {e}")
@@ -98,5 +173,7 @@ def get_provider_manager() -> ProviderManager:
     """Получает глобальный экземпляр менеджера провайдеров"""
     global _provider_manager
     if _provider_manager is None:
-        _provider_manager = ProviderManager()
+        # Каталог провайдеров читается при первом обращении, без горячей перезагрузки
+        from server.config import get_config
+        _provider_manager = ProviderManager(get_config().provider.scan_path)
     return _provider_manager
\ No newline at end of file
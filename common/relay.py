@@ -0,0 +1,420 @@
+''' Локальный pub/sub-релей между процессом-производителем и воркерами сервера '''
+import asyncio
+import struct
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from common.frame_codec import FrameData, PoseFrame
+from server.logger import server_logger
+
+# Сообщение релея: заголовок RELAY_HEADER, имя темы (utf-8), полезная нагрузка
+RELAY_HEADER = struct.Struct('<BHI')  # операция, длина темы, длина нагрузки
+OP_SUBSCRIBE = 1
+OP_UNSUBSCRIBE = 2
+OP_PUBLISH = 3
+
+DEFAULT_QUEUE_SIZE = 256
+CONNECT_TIMEOUT = 10.0
+# Пауза между попытками переподключения к брокеру, секунды (удваивается до максимума)
+RECONNECT_DELAY = 0.1
+RECONNECT_MAX_DELAY = 5.0
+
+# Кадр в релее: метка времени производителя, число пластин, число записей IMU
+# (-1 - канала IMU нет), есть ли размеры; затем массивы float64/int64 без потерь точности
+RELAY_FRAME_HEADER = struct.Struct('<dIiB')
+RELAY_IMU_DTYPE = np.dtype([
+    ('plate_id', '<i4'),
+    ('accel', '<f8', (3,)),
+    ('gyro', '<f8', (3,)),
+    ('mag', '<f8', (3,))
+])
+
+
+def frames_topic(provider_name: str) -> str:
+    """Тема кадров провайдера"""
+    return f"frames/{provider_name}"
+
+
+def encode_relay_frame(data: FrameData, timestamp: float) -> bytes:
+    """Кадр провайдера для передачи воркерам"""
+    frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+    count = len(frame)
+    parts = [
+        np.ascontiguousarray(frame.plate_ids, dtype='<i8').tobytes(),
+        np.ascontiguousarray(frame.positions, dtype='<f8').tobytes(),
+        np.ascontiguousarray(frame.orientations, dtype='<f8').tobytes()
+    ]
+    if frame.dimensions is not None:
+        parts.append(np.ascontiguousarray(frame.dimensions, dtype='<f8').tobytes())
+    imu_count = -1
+    if frame.imu is not None:
+        imu = np.zeros(len(frame.imu), dtype=RELAY_IMU_DTYPE)
+        for field in RELAY_IMU_DTYPE.names:
+            imu[field] = frame.imu[field]
+        parts.append(imu.tobytes())
+        imu_count = len(imu)
+    header = RELAY_FRAME_HEADER.pack(timestamp, count, imu_count, frame.dimensions is not None)
+    return header + b''.join(parts)
+
+
+def decode_relay_frame(payload: bytes) -> Tuple[PoseFrame, float]:
+    """
+    Returns:
+        (кадр, метка времени производителя)
+
+    Raises:
+        ValueError: если сообщение повреждено
+    """
+    if len(payload) < RELAY_FRAME_HEADER.size:
+        raise ValueError(f"Relay frame too short: {len(payload)} bytes")
+    timestamp, count, imu_count, has_dimensions = RELAY_FRAME_HEADER.unpack_from(payload, 0)
+    expected = (RELAY_FRAME_HEADER.size + count * 8 * (7 + 3 * has_dimensions)
+                + max(imu_count, 0) * RELAY_IMU_DTYPE.itemsize)
+    if len(payload) != expected:
+        raise ValueError(f"Relay frame size mismatch: {len(payload)} bytes, expected {expected}")
+
+    offset = RELAY_FRAME_HEADER.size
+    plate_ids = np.frombuffer(payload, '<i8', count, offset)
+    offset += count * 8
+    vectors = np.frombuffer(payload, '<f8', count * 3 * (2 + has_dimensions), offset)
+    vectors = vectors.reshape(2 + has_dimensions, count, 3)
+    offset += vectors.nbytes
+    imu = np.frombuffer(payload, RELAY_IMU_DTYPE, imu_count, offset) if imu_count >= 0 else None
+    dimensions = vectors[2] if has_dimensions else None
+    return PoseFrame(plate_ids, vectors[0], vectors[1], dimensions, imu), timestamp
+
+
+def _pack(op: int, topic: str, payload: bytes = b'') -> bytes:
+    name = topic.encode()
+    return RELAY_HEADER.pack(op, len(name), len(payload)) + name + payload
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Tuple[int, str, bytes]:
+    """Raises: asyncio.IncompleteReadError при закрытии соединения"""
+    op, topic_length, payload_length = RELAY_HEADER.unpack(
+        await reader.readexactly(RELAY_HEADER.size)
+    )
+    body = await reader.readexactly(topic_length + payload_length)
+    return op, body[:topic_length].decode(), body[topic_length:]
+
+
+class RelaySubscription:
+    """
+    Подписка на тему: ограниченная очередь сообщений. Публикация никогда
+    не ждет подписчика - при переполнении вытесняется самое старое сообщение
+    """
+    def __init__(self, topic: str, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 on_close: Optional[Callable[['RelaySubscription'], None]] = None):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.dropped = 0
+        self.closed = False
+        self._on_close = on_close
+
+    def deliver(self, topic: str, payload: bytes) -> None:
+        if self.closed:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((topic, payload))
+
+    async def get(self) -> Tuple[str, bytes]:
+        """
+        Следующее сообщение
+
+        Raises:
+            ConnectionError: если подписка закрыта (в том числе при потере связи с релеем)
+        """
+        if self.closed and self.queue.empty():
+            raise ConnectionError(f"Relay subscription closed: {self.topic}")
+        item = await self.queue.get()
+        if item is None:
+            raise ConnectionError(f"Relay subscription closed: {self.topic}")
+        return item
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        # Будим ожидающего читателя
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+        if self._on_close:
+            self._on_close(self)
+
+
+class RelayBroker:
+    """
+    Маршрутизация сообщений по темам внутри процесса производителя.
+    Подписчик - любой объект с методом deliver(topic, payload): локальная
+    подписка или соединение воркера. Слушатели спроса узнают, сколько
+    подписчиков у темы, - по нему производитель запускает и останавливает провайдеры
+    """
+    def __init__(self):
+        self._subscribers: Dict[str, Set[object]] = {}
+        self._demand_listeners: List[Callable[[str, int], None]] = []
+        self.published = 0
+
+    def add(self, topic: str, subscriber) -> None:
+        subscribers = self._subscribers.setdefault(topic, set())
+        if subscriber not in subscribers:
+            subscribers.add(subscriber)
+            self._notify(topic)
+
+    def remove(self, topic: str, subscriber) -> None:
+        subscribers = self._subscribers.get(topic)
+        if not subscribers or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[topic]
+        self._notify(topic)
+
+    def on_demand(self, listener: Callable[[str, int], None]) -> None:
+        self._demand_listeners.append(listener)
+
+    def demand(self, topic: str) -> int:
+        return len(self._subscribers.get(topic, ()))
+
+    def _notify(self, topic: str) -> None:
+        count = self.demand(topic)
+        for listener in self._demand_listeners:
+            try:
+                listener(topic, count)
+            except Exception as e:
+                server_logger.error(f"Relay demand listener failed for {topic}: {e}")
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        self.published += 1
+        for subscriber in list(self._subscribers.get(topic, ())):
+            subscriber.deliver(topic, payload)
+
+    def topics(self) -> Dict[str, int]:
+        return {topic: len(subscribers) for topic, subscribers in self._subscribers.items()}
+
+
+class Relay(ABC):
+    """Транспорт релея со стороны процесса: публикация и подписка на темы"""
+
+    @abstractmethod
+    async def publish(self, topic: str, payload: bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def subscribe(self, topic: str) -> RelaySubscription:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalRelay(Relay):
+    """Релей внутри одного процесса: воркер и производитель делят брокер"""
+    def __init__(self, broker: RelayBroker, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.broker = broker
+        self.queue_size = queue_size
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        self.broker.publish(topic, payload)
+
+    async def subscribe(self, topic: str) -> RelaySubscription:
+        subscription = RelaySubscription(
+            topic, self.queue_size, lambda s: self.broker.remove(s.topic, s)
+        )
+        self.broker.add(topic, subscription)
+        return subscription
+
+
+class _Peer:
+    """Соединение воркера на стороне брокера: своя очередь и задача записи"""
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int):
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.dropped = 0
+        self.task = asyncio.create_task(self._write())
+
+    def deliver(self, topic: str, payload: bytes) -> None:
+        # Медленный воркер теряет старые сообщения, но не задерживает производитель
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(_pack(OP_PUBLISH, topic, payload))
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                message = await self.queue.get()
+                self.writer.write(message)
+                # Сообщения, накопившиеся за время записи, уходят одним вызовом
+                while not self.queue.empty():
+                    self.writer.write(self.queue.get_nowait())
+                await self.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+
+class RelayServer:
+    """Брокер производителя, доступный воркерам через Unix-сокет"""
+    def __init__(self, broker: RelayBroker, path: str, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.broker = broker
+        self.path = path
+        self.queue_size = queue_size
+        self.peers: Set[_Peer] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        server_logger.info(f"Relay listening on {self.path}")
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for peer in list(self.peers):
+            peer.task.cancel()
+            peer.writer.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = _Peer(writer, self.queue_size)
+        self.peers.add(peer)
+        topics: Set[str] = set()
+        try:
+            while True:
+                op, topic, payload = await _read_message(reader)
+                if op == OP_SUBSCRIBE:
+                    topics.add(topic)
+                    self.broker.add(topic, peer)
+                elif op == OP_UNSUBSCRIBE:
+                    topics.discard(topic)
+                    self.broker.remove(topic, peer)
+                elif op == OP_PUBLISH:
+                    self.broker.publish(topic, payload)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            for topic in topics:
+                self.broker.remove(topic, peer)
+            self.peers.discard(peer)
+            peer.task.cancel()
+            writer.close()
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "workers": len(self.peers),
+            "topics": self.broker.topics(),
+            "published": self.broker.published,
+            "dropped": sum(peer.dropped for peer in self.peers)
+        }
+
+
+class UnixSocketRelay(Relay):
+    """
+    Релей воркера: одно соединение с брокером производителя, локальные
+    подписки одной темы делят одну подписку на брокере. При потере связи
+    (производитель перезапускается) релей переподключается и заново
+    подписывается на темы; подписки воркера остаются открытыми и снова
+    получают сообщения после переподключения
+    """
+    def __init__(self, path: str, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.path = path
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[RelaySubscription]] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self, timeout: float = CONNECT_TIMEOUT) -> None:
+        """Подключается к брокеру; производитель может стартовать позже воркеров"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                break
+            except OSError:
+                if loop.time() > deadline:
+                    raise
+                await asyncio.sleep(RECONNECT_DELAY)
+        self._task = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                while True:
+                    _, topic, payload = await _read_message(self._reader)
+                    for subscription in list(self._subscriptions.get(topic, ())):
+                        subscription.deliver(topic, payload)
+            except (asyncio.IncompleteReadError, ConnectionError, OSError):
+                server_logger.error(f"Relay connection lost: {self.path}, reconnecting")
+            self._writer.close()
+            self._writer = None
+            await self._reconnect()
+
+    async def _reconnect(self) -> None:
+        """Переподключение с растущей паузой и повторная подписка на темы"""
+        delay = RECONNECT_DELAY
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                break
+            except OSError:
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        for topic in self._subscriptions:
+            writer.write(_pack(OP_SUBSCRIBE, topic))
+        self._reader, self._writer = reader, writer
+        self.reconnects += 1
+        server_logger.info(f"Reconnected to relay {self.path}")
+
+    def _connected_writer(self) -> asyncio.StreamWriter:
+        """Raises: ConnectionError, если связи с брокером сейчас нет"""
+        if not self.connected:
+            raise ConnectionError(f"Relay disconnected: {self.path}")
+        return self._writer
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        """Raises: ConnectionError, если связи с брокером нет"""
+        writer = self._connected_writer()
+        writer.write(_pack(OP_PUBLISH, topic, payload))
+        await writer.drain()
+
+    async def subscribe(self, topic: str) -> RelaySubscription:
+        """Без связи подписка регистрируется и отправляется брокеру при переподключении"""
+        subscription = RelaySubscription(topic, self.queue_size, self._unsubscribe)
+        subscriptions = self._subscriptions.setdefault(topic, set())
+        if not subscriptions and self.connected:
+            self._writer.write(_pack(OP_SUBSCRIBE, topic))
+        subscriptions.add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: RelaySubscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.topic)
+        if not subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.topic]
+            if self.connected:
+                self._writer.write(_pack(OP_UNSUBSCRIBE, subscription.topic))
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.close()
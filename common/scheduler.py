@@ -0,0 +1,110 @@
+import asyncio
+import time
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from common.stats import Histogram
+
+
+class MissedTickPolicy(str, Enum):
+    """Что делать с пропущенными тиками, если цикл не успел к дедлайну"""
+    CATCH_UP = "catch_up"  # выполнить пропущенные тики подряд (не более max_catch_up)
+    SKIP = "skip"          # перескочить к ближайшему будущему дедлайну
+
+
+class FixedRateScheduler:
+    """
+    Планировщик с фиксированной частотой по монотонным часам.
+    Тики нацелены на абсолютные дедлайны start + k * period, поэтому время
+    генерации и отправки не накапливается в дрейф частоты.
+    """
+    def __init__(
+        self,
+        rate: float,
+        policy: MissedTickPolicy = MissedTickPolicy.CATCH_UP,
+        max_catch_up: int = 10
+    ):
+        if rate <= 0:
+            raise ValueError(f"Scheduler rate must be positive, got {rate}")
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.policy = MissedTickPolicy(policy)
+        self.max_catch_up = max(0, max_catch_up)
+
+        self._next_deadline: Optional[float] = None
+        self._prev_deadline: Optional[float] = None
+        self._tick_started: Optional[float] = None
+
+        self.ticks = 0
+        self.skipped_ticks = 0
+        # Опоздание тика относительно дедлайна, мс
+        self.jitter_ms = Histogram()
+        # Превышение периода временем работы тика, мс
+        self.overrun_ms = Histogram()
+        self.overruns = 0
+
+    def reset(self) -> None:
+        """Сброс дедлайнов, следующий тик начнет новую сетку времени"""
+        self._next_deadline = None
+        self._prev_deadline = None
+        self._tick_started = None
+
+    async def wait_next_tick(self) -> float:
+        """
+        Ждет дедлайна следующего тика
+
+        Returns:
+            Шаг модельного времени dt в секундах с прошлого тика
+        """
+        now = time.monotonic()
+
+        if self._tick_started is not None:
+            work = now - self._tick_started
+            if work > self.period:
+                self.overruns += 1
+                self.overrun_ms.observe((work - self.period) * 1000.0)
+
+        if self._next_deadline is None:
+            self._next_deadline = now
+            self._prev_deadline = now - self.period
+
+        delay = self._next_deadline - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+            now = time.monotonic()
+        else:
+            # Даже при отставании отдаем управление циклу событий
+            await asyncio.sleep(0)
+
+        lateness = now - self._next_deadline
+        self.jitter_ms.observe(max(0.0, lateness) * 1000.0)
+
+        missed = int(lateness // self.period)
+        if missed > 0:
+            if self.policy == MissedTickPolicy.SKIP:
+                skip = missed
+            else:
+                skip = max(0, missed - self.max_catch_up)
+            if skip:
+                self._next_deadline += skip * self.period
+                self.skipped_ticks += skip
+
+        deadline = self._next_deadline
+        dt = deadline - self._prev_deadline
+        self._prev_deadline = deadline
+        self._next_deadline = deadline + self.period
+        self._tick_started = time.monotonic()
+        self.ticks += 1
+        return dt
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика соблюдения частоты"""
+        return {
+            "target_rate": self.rate,
+            "policy": self.policy.value,
+            "ticks": self.ticks,
+            "skipped_ticks": self.skipped_ticks,
+            "overruns": self.overruns,
+            "jitter_ms": self.jitter_ms.to_dict(),
+            "overrun_ms": self.overrun_ms.to_dict()
+        }
@@ -0,0 +1,214 @@
+import struct
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from common.frame_codec import FrameData, PoseFrame
+
+# Кольцевой буфер кадров в разделяемой памяти (multiprocessing.shared_memory).
+# Процесс-воркер пишет кадры в слоты по кругу, сервер читает последний готовый
+# кадр. Кадры не сериализуются: обе стороны работают с одними и теми же байтами
+# через numpy-представления.
+#
+# Раскладка: заголовок RING_HEADER (выровнен до 64 байт), затем slots слотов
+# slot_dtype(capacity). Номер слота последнего кадра - write_seq % slots.
+# Согласованность - по схеме seqlock: на время записи поле seq слота обнуляется,
+# после записи в него кладется номер кадра; читатель сверяет seq до и после
+# копирования и повторяет чтение, если слот успели перезаписать.
+RING_MAGIC = b'SCVRING1'
+RING_HEADER = struct.Struct('<8sIIQ')  # magic, slots, capacity, write_seq
+RING_HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+
+FLAG_DIMENSIONS = 1
+FLAG_IMU = 2
+
+# Показания IMU в слоте: те же поля, что у канала IMU провайдеров
+RING_IMU_DTYPE = np.dtype([
+    ('plate_id', np.int32),
+    ('accel', np.float64, (3,)),
+    ('gyro', np.float64, (3,)),
+    ('mag', np.float64, (3,))
+])
+
+# Сколько раз читатель повторяет чтение разорванного слота
+READ_RETRIES = 3
+
+
+def slot_dtype(capacity: int) -> np.dtype:
+    """Тип слота кадра на capacity пластин"""
+    return np.dtype([
+        ('seq', '<u8'),
+        ('timestamp', '<f8'),
+        ('count', '<u4'),
+        ('flags', '<u4'),
+        ('plate_ids', '<i8', (capacity,)),
+        ('positions', '<f8', (capacity, 3)),
+        ('orientations', '<f8', (capacity, 3)),
+        ('dimensions', '<f8', (capacity, 3)),
+        ('imu', RING_IMU_DTYPE, (capacity,))
+    ])
+
+
+class SharedFrameRing:
+    """
+    Кольцевой буфер кадров в разделяемой памяти. Сервер создает буфер
+    (create) и отвечает за его удаление, воркер подключается по имени (attach).
+    Писатель один, читателей может быть несколько.
+    """
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool):
+        self._memory = memory
+        self.owner = owner
+        magic, slots, capacity, _ = RING_HEADER.unpack_from(memory.buf, 0)
+        if magic != RING_MAGIC:
+            raise ValueError(f"Not a frame ring: {memory.name}")
+        self.slots_count = slots
+        self.capacity = capacity
+        self.dtype = slot_dtype(capacity)
+
+        self._write_seq = np.ndarray((1,), dtype='<u8', buffer=memory.buf,
+                                     offset=WRITE_SEQ_OFFSET)
+        self.slots = np.ndarray((slots,), dtype=self.dtype, buffer=memory.buf,
+                                offset=RING_HEADER_SIZE)
+
+        # Копия последнего прочитанного кадра на стороне читателя
+        self._frame = np.zeros((), dtype=self.dtype)
+        self.frames_read = 0
+        self.frames_missed = 0
+        self.torn_reads = 0
+        self.frames_dropped = 0
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    @classmethod
+    def create(cls, slots: int, capacity: int) -> 'SharedFrameRing':
+        """Создает новый буфер на slots кадров по capacity пластин"""
+        if slots < 2 or capacity < 1:
+            raise ValueError(f"Invalid ring size: {slots} slots x {capacity} plates")
+        size = RING_HEADER_SIZE + slots * slot_dtype(capacity).itemsize
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        memory.buf[:size] = bytes(size)
+        RING_HEADER.pack_into(memory.buf, 0, RING_MAGIC, slots, capacity, 0)
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedFrameRing':
+        """Подключается к существующему буферу по имени"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def write_seq(self) -> int:
+        """Номер последнего записанного кадра (0 - кадров еще не было)"""
+        return int(self._write_seq[0])
+
+    def write(self, data: FrameData, timestamp: float) -> bool:
+        """
+        Записывает кадр в следующий слот
+
+        Returns:
+            False, если кадр не помещается в буфер (больше capacity пластин)
+        """
+        frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+        count = len(frame)
+        if count > self.capacity:
+            self.frames_dropped += 1
+            return False
+
+        seq = self.write_seq + 1
+        slot = self.slots[seq % self.slots_count]
+        slot['seq'] = 0
+        slot['timestamp'] = timestamp
+        slot['count'] = count
+        slot['plate_ids'][:count] = frame.plate_ids
+        slot['positions'][:count] = frame.positions
+        slot['orientations'][:count] = frame.orientations
+
+        flags = 0
+        if frame.dimensions is not None:
+            slot['dimensions'][:count] = frame.dimensions
+            flags |= FLAG_DIMENSIONS
+        imu = frame.imu
+        # Показания IMU передаются, только если они есть для каждой пластины кадра
+        if imu is not None and len(imu) == count:
+            imu_slot = slot['imu'][:count]
+            for field in RING_IMU_DTYPE.names:
+                imu_slot[field] = imu[field]
+            flags |= FLAG_IMU
+        slot['flags'] = flags
+
+        slot['seq'] = seq
+        self._write_seq[0] = seq
+        return True
+
+    def read_latest(self, after_seq: int = 0) -> Optional[Tuple[int, float, PoseFrame]]:
+        """
+        Читает последний готовый кадр, если он новее after_seq
+
+        Returns:
+            (номер кадра, метка времени, кадр) или None. Массивы кадра - внутренний
+            буфер читателя, он перезаписывается следующим вызовом
+        """
+        for _ in range(READ_RETRIES):
+            seq = self.write_seq
+            if seq <= after_seq:
+                return None
+            slot = self.slots[seq % self.slots_count]
+            if int(slot['seq']) != seq:
+                # Писатель уже ушел на следующий круг - берем более свежий номер
+                self.torn_reads += 1
+                continue
+            self._copy_slot(slot)
+            if int(slot['seq']) != seq:
+                self.torn_reads += 1
+                continue
+
+            if after_seq:
+                self.frames_missed += seq - after_seq - 1
+            self.frames_read += 1
+            return seq, float(self._frame['timestamp']), self._make_frame()
+        return None
+
+    def _copy_slot(self, slot: np.void) -> None:
+        """Копирует в буфер читателя только занятую часть слота"""
+        frame = self._frame
+        count = min(int(slot['count']), self.capacity)
+        frame['timestamp'] = slot['timestamp']
+        frame['count'] = count
+        frame['flags'] = slot['flags']
+        for field in ('plate_ids', 'positions', 'orientations', 'dimensions', 'imu'):
+            frame[field][:count] = slot[field][:count]
+
+    def _make_frame(self) -> PoseFrame:
+        frame = self._frame
+        count = int(frame['count'])
+        flags = int(frame['flags'])
+        return PoseFrame(
+            frame['plate_ids'][:count],
+            frame['positions'][:count],
+            frame['orientations'][:count],
+            frame['dimensions'][:count] if flags & FLAG_DIMENSIONS else None,
+            frame['imu'][:count] if flags & FLAG_IMU else None
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "slots": self.slots_count,
+            "capacity": self.capacity,
+            "write_seq": self.write_seq,
+            "frames_read": self.frames_read,
+            "frames_missed": self.frames_missed,
+            "torn_reads": self.torn_reads
+        }
+
+    def close(self) -> None:
+        """Отключается от буфера; владелец также удаляет сегмент памяти"""
+        # Представления держат экспортированный буфер, без них close() не пройдет
+        self._write_seq = None
+        self.slots = None
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
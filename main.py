@@ -1,26 +1,61 @@
-import json
-from pathlib import Path
+import argparse
+
 import uvicorn
 
+from server.config import read_config
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sensor Chain Visualization server")
+    parser.add_argument("--production", action="store_true",
+                        help="без перезагрузчика и журнала доступа uvicorn")
+    parser.add_argument("--host", help="адрес (по умолчанию server.host из конфигурации)")
+    parser.add_argument("--port", type=int, help="порт (по умолчанию server.port)")
+    parser.add_argument("--workers", type=int,
+                        help="процессов uvicorn (по умолчанию server.workers)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     # Загружаем конфигурацию
-    config_path = Path("server/config.json")
-    if not config_path.exists():
-        print("Error: config.json not found")
+    try:
+        config = read_config()
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
         exit(1)
 
-    with open(config_path) as f:
-        config = json.load(f)
+    server_config = config.server
+    workers = args.workers or server_config.workers
+    # Перезагрузчик следит за файлами проекта и держит лишний процесс - только для разработки
+    reload = server_config.reload and not args.production
+    producer = None
+    if config.relay.enabled and config.relay.transport == "unix":
+        # Провайдеры работают в процессе-производителе, воркеры получают кадры через релей
+        # Упавший производитель перезапускается, воркеры переподключаются к релею
+        from server.relay import ProducerSupervisor
+        producer = ProducerSupervisor()
+        producer.start()
+    elif workers > 1:
+        print("Warning: several workers require relay.enabled with the unix transport, "
+              "starting one worker")
+        workers = 1
+    if workers > 1 and reload:
+        print("Warning: reload is not supported with several workers, reload disabled")
+        reload = False
 
     # Запускаем сервер
-    server_config = config["server"]
-    uvicorn.run(
-        "server.server:app",
-        host=server_config["host"],
-        port=server_config["port"],
-        reload=server_config["reload"],
-
-
-        
-        log_level="info"
-    )
+    try:
+        uvicorn.run(
+            "server.server:app",
+            host=args.host or server_config.host,
+            port=args.port or server_config.port,
+            reload=reload,
+            workers=workers,
+            log_level="warning" if args.production else "info",
+            access_log=not args.production
+        )
+    finally:
+        if producer is not None:
+            producer.stop()
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from typing import Optional, Tuple
+import numpy as np
+from common.base_provider import DataProviderBase
+from common.frame_codec import PoseFrame
+from common.fusion import ComplementaryFusion
+from common.ingest import (DEFAULT_PLATE_COUNT, DEFAULT_RING_CAPACITY, KIND_IMU, KIND_POSE,
+                           get_ingest_hub)
+
+# Канал IMU кадра: поля как у симулятора IMU провайдера spacedata
+FRAME_IMU_DTYPE = np.dtype([
+    ('plate_id', np.int32),
+    ('accel', np.float64, (3,)),
+    ('gyro', np.float64, (3,)),
+    ('mag', np.float64, (3,))
+])
+
+# Наибольший шаг интегрирования отсчета IMU, секунды: пауза шлюза не превращается
+# в один большой поворот
+MAX_IMU_DT = 0.1
+
+
+class IngestProvider(DataProviderBase):
+    """
+    Провайдер режима source: кадры строятся из отсчетов, которые шлюзы
+    реальных цепочек присылают на /ingest/{provider} (или по UDP).
+    Тик - появление новых отсчетов, но не чаще data_rate.max_rate кадров в секунду;
+    в кадр попадает последний по выровненному времени отсчет каждой пластины.
+
+    Слияние по IMU (fusion.enabled) ведет сам провайдер, а не общая стадия
+    конвейера: в фильтр попадает каждый отсчет, а не только последний за тик,
+    с шагом по выровненным меткам времени пластины
+    """
+    def __init__(self, manifest: dict):
+        super().__init__(manifest)
+        ingest_config = manifest.get('ingest', {})
+        self.plate_count = ingest_config.get('plate_count', DEFAULT_PLATE_COUNT)
+        max_rate = manifest.get('data_rate', {}).get('max_rate')
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.source = get_ingest_hub().source(
+            manifest['name'], ingest_config.get('ring_capacity', DEFAULT_RING_CAPACITY),
+            self.plate_count
+        )
+        # Читаем только отсчеты, пришедшие после создания провайдера
+        self._cursors = {kind: ring.write_index for kind, ring in self.source.rings.items()}
+        self._last_frame = 0.0
+        self.lost = 0
+        self.unknown = 0
+
+        count = self.plate_count
+        self.plate_ids = np.arange(count, dtype=np.int64)
+        self.positions = np.zeros((count, 3), dtype=np.float64)
+        self.orientations = np.zeros((count, 3), dtype=np.float64)
+        self.dimensions = np.tile(
+            np.asarray(ingest_config.get('dimensions', (10.0, 200.0, 100.0)), dtype=np.float64),
+            (count, 1)
+        )
+        self.imu = np.zeros(count, dtype=FRAME_IMU_DTYPE)
+        self.imu['plate_id'] = self.plate_ids
+        # Время последнего принятого отсчета пластины (часы сервера); -inf - не было
+        self._pose_time = np.full(count, -np.inf)
+        self._imu_time = np.full(count, -np.inf)
+
+        self.imu_fusion: Optional[ComplementaryFusion] = None
+        fusion_config = manifest.get('fusion', {})
+        if fusion_config.get('enabled'):
+            self.imu_fusion = ComplementaryFusion.from_config(
+                fusion_config, count, self.dimensions[:, 1]
+            )
+
+    def _read(self, kind: int) -> np.ndarray:
+        """Отсчеты кольца, пришедшие с прошлого чтения"""
+        samples, self._cursors[kind], lost = self.source.rings[kind].read(self._cursors[kind])
+        self.lost += lost
+        known = samples['plate_id'] < self.plate_count
+        if not known.all():
+            self.unknown += int((~known).sum())
+            samples = samples[known]
+        return samples
+
+    def _latest(self, samples: np.ndarray, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Для каждой пластины - самый поздний по времени отсчет, если он новее уже
+        принятого (шлюзы одной цепочки могут отставать друг от друга)
+
+        Returns:
+            (номера пластин, их отсчеты)
+        """
+        if not len(samples):
+            return np.empty(0, dtype=np.int64), samples
+
+        # Сортировка по пластине, затем по времени: последний в группе - самый свежий
+        order = np.lexsort((samples['timestamp'], samples['plate_id']))
+        samples = samples[order]
+        plates = samples['plate_id'].astype(np.int64)
+        last = np.ones(len(samples), dtype=bool)
+        last[:-1] = plates[1:] != plates[:-1]
+        samples, plates = samples[last], plates[last]
+        newer = samples['timestamp'] > times[plates]
+        samples, plates = samples[newer], plates[newer]
+        times[plates] = samples['timestamp']
+        return plates, samples
+
+    def _fuse(self, samples: np.ndarray) -> None:
+        """Новые отсчеты IMU - в фильтр по порядку времени, с шагом от прошлого отсчета пластины"""
+        plates = samples['plate_id'].astype(np.int64)
+        # Отсчеты не новее уже принятых (отставший шлюз, повтор) не интегрируются
+        newer = samples['timestamp'] > self._imu_time[plates]
+        samples, plates = samples[newer], plates[newer]
+        if not len(samples):
+            return
+        order = np.lexsort((samples['timestamp'], plates))
+        samples, plates = samples[order], plates[order]
+        times = samples['timestamp']
+        previous = np.empty(len(times))
+        previous[1:] = times[:-1]
+        first = np.ones(len(times), dtype=bool)
+        first[1:] = plates[1:] != plates[:-1]
+        previous[first] = self._imu_time[plates[first]]
+        dt = times - previous
+        same = dt <= 0
+        if same.any():
+            keep = ~same
+            samples, plates, dt = samples[keep], plates[keep], dt[keep]
+        self.imu_fusion.update_samples(
+            plates, samples['accel'].astype(np.float64), samples['gyro'].astype(np.float64),
+            samples['mag'].astype(np.float64), np.minimum(dt, MAX_IMU_DT)
+        )
+
+    async def wait_source(self) -> None:
+        """Ждет новые отсчеты источника, но не дольше, чем позволяет max_rate"""
+        wait = self._last_frame + self.min_interval - time.monotonic()
+        if wait > 0:
+            # Отсчеты тем временем копятся в кольце источника
+            await asyncio.sleep(wait)
+        await self.source.data_ready.wait()
+        self.source.data_ready.clear()
+        self._last_frame = time.monotonic()
+
+    async def generate_data(self, dt: float) -> Optional[PoseFrame]:
+        """
+        Кадр из отсчетов, пришедших с предыдущего тика
+        """
+        if not self._running:
+            return None
+        plates, samples = self._latest(self._read(KIND_POSE), self._pose_time)
+        self.positions[plates] = samples['position']
+        self.orientations[plates] = samples['orientation']
+        imu_samples = self._read(KIND_IMU)
+        fusion = self.imu_fusion
+        if fusion is not None and fusion.quaternions is not None:
+            self._fuse(imu_samples)
+        imu_plates, imu_samples = self._latest(imu_samples, self._imu_time)
+        for field in ('accel', 'gyro', 'mag'):
+            self.imu[field][imu_plates] = imu_samples[field]
+
+        if fusion is not None:
+            # Позы восстанавливает слияние: начальная ориентация - по показаниям всех пластин
+            if fusion.quaternions is None:
+                if not np.isfinite(self._imu_time).all():
+                    return None
+                fusion.initialize(self.imu['accel'], self.imu['mag'])
+            imu = self.imu.copy() if len(imu_plates) else None
+            positions = fusion.positions if fusion.chain_kinematics else self.positions.copy()
+            return PoseFrame(self.plate_ids, positions, fusion.orientations,
+                             self.dimensions, imu)
+
+        # В кадре только пластины, от которых уже приходили позы
+        seen = np.flatnonzero(np.isfinite(self._pose_time))
+        if not len(seen) or not (len(plates) or len(imu_plates)):
+            return None
+        imu = None
+        if len(imu_plates) and np.isfinite(self._imu_time[seen]).all():
+            imu = self.imu[seen]
+        return PoseFrame(self.plate_ids[seen], self.positions[seen], self.orientations[seen],
+                         self.dimensions[seen], imu)
+
+    async def stop(self) -> None:
+        await super().stop()
+        # Будим цикл, ожидающий отсчеты
+        self.source.data_ready.set()
@@ -0,0 +1,90 @@
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from common.base_provider import DataProviderBase
+from common.frame_codec import PoseFrame
+from common.frame_log import FrameLogReader
+
+LOG_EXTENSION = '.scvlog'
+# Как часто в конце записи проверяется, не дописана ли она, секунды
+REFRESH_INTERVAL = 1.0
+
+
+def resolve_recording(source: str) -> Path:
+    """Файл записи или самый свежий файл в каталоге"""
+    path = Path(source)
+    if path.is_dir():
+        recordings = sorted(path.glob(f"*{LOG_EXTENSION}"), key=lambda p: p.stat().st_mtime)
+        if not recordings:
+            raise FileNotFoundError(f"No recordings found in {path}")
+        return recordings[-1]
+    if not path.exists():
+        raise FileNotFoundError(f"Recording not found: {path}")
+    return path
+
+
+class ReplayProvider(DataProviderBase):
+    def __init__(self, manifest: dict):
+        super().__init__(manifest)
+        replay_config = manifest.get('replay', {})
+        self.speed = replay_config.get('speed', 1.0)
+        self.loop = replay_config.get('loop', True)
+        self.reader = FrameLogReader(resolve_recording(replay_config.get('source', 'recordings')))
+        self.position = self.reader.time_range()[0]
+        self._refreshed = time.monotonic()
+
+    def seek(self, timestamp: float) -> None:
+        """Переход к моменту записи (секунды, как в метках времени кадров)"""
+        if not math.isfinite(timestamp):
+            raise ValueError(f"Invalid seek position: {timestamp}")
+        start, end = self.reader.time_range()
+        self.position = min(max(timestamp, start), end)
+
+    def set_speed(self, speed: float) -> None:
+        """Скорость воспроизведения; отрицательная - воспроизведение назад, 0 - пауза"""
+        if not math.isfinite(speed):
+            raise ValueError(f"Invalid playback speed: {speed}")
+        self.speed = speed
+
+    def playback_status(self) -> Dict[str, Any]:
+        start, end = self.reader.time_range()
+        return {
+            "source": str(self.reader.path),
+            "position": self.position,
+            "speed": self.speed,
+            "loop": self.loop,
+            "start": start,
+            "end": end
+        }
+
+    def _refresh(self) -> None:
+        """Переотображает запись не чаще REFRESH_INTERVAL: файл мог быть дописан"""
+        now = time.monotonic()
+        if now - self._refreshed >= REFRESH_INTERVAL:
+            self._refreshed = now
+            self.reader.refresh()
+
+    async def generate_data(self, dt: float) -> Optional[PoseFrame]:
+        """
+        Кадр записи, соответствующий текущей позиции воспроизведения
+        """
+        if not len(self.reader):
+            self._refresh()
+            if not len(self.reader):
+                return None
+
+        self.position += dt * self.speed
+        start, end = self.reader.time_range()
+        if self.position > end:
+            # Запись могла быть дописана с момента открытия
+            self._refresh()
+            start, end = self.reader.time_range()
+        if self.position > end or self.position < start:
+            if self.loop and end > start:
+                self.position = start + (self.position - start) % (end - start)
+            else:
+                self.position = min(max(self.position, start), end)
+
+        _, frame = self.reader.frame(self.reader.index_at(self.position))
+        return frame
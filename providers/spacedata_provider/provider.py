@@ -1,29 +1,49 @@
-from typing import Optional, Dict, Any
+from typing import Optional
 from common.base_provider import DataProviderBase
+from common.frame_codec import PoseFrame
+from common.fusion import ComplementaryFusion
+from .simulation.imu import ChainIMUSimulator
 from .simulation.simulator import PlatesSimulation
 
 class SpaceDataProvider(DataProviderBase):
     def __init__(self, manifest: dict):
         super().__init__(manifest)
-        self.simulator = PlatesSimulation()
+        simulation_config = manifest.get('simulation', {})
+        self.simulator = PlatesSimulation(simulation_config.get('plate_count', 3))
+        self.imu = self._create_imu(manifest.get('imu', {}))
 
-    async def generate_data(self) -> Optional[Dict[str, Any]]:
+        # Позы восстанавливаются из показаний IMU, как для реальной цепочки
+        fusion_config = manifest.get('fusion', {})
+        if self.imu and fusion_config.get('enabled'):
+            plates = self.simulator.plates
+            self.fusion = ComplementaryFusion.from_config(
+                fusion_config, len(plates), plates['dimensions'][:, 1]
+            )
+
+    def _create_imu(self, imu_config: dict) -> Optional[ChainIMUSimulator]:
+        """Канал сырых показаний IMU включается секцией "imu" манифеста"""
+        if not imu_config.get('enabled'):
+            return None
+        params = {key: value for key, value in imu_config.items() if key != 'enabled'}
+        return ChainIMUSimulator(self.simulator.plates['plate_id'], **params)
+
+    async def generate_data(self, dt: float) -> Optional[PoseFrame]:
         """
         Генерация данных через симулятор
         """
-        # Получаем новое состояние симуляции
-        state = self.simulator.update(1.0/100)
-        if not state or not state["plates"]:
+        # Продвигаем симуляцию на фактический шаг планировщика
+        plates = self.simulator.step(dt)
+        if plates is None or not len(plates):
             return None
-            
-        return {
-            "version": "1.0",
-            "plates": [
-                {
-                    "plate_id": plate["plate_id"],
-                    "position": plate["coordinates"],
-                    "orientation": plate["angles"],
-                    "dimensions": plate["dimensions"]
-                } for plate in state["plates"]
-            ]
-        }
+
+        imu = None
+        if self.imu:
+            imu = self.imu.update(self.simulator.time, plates['position'], plates['angles'])
+
+        return PoseFrame(
+            plates['plate_id'],
+            plates['position'],
+            plates['angles'],
+            plates['dimensions'],
+            imu
+        )
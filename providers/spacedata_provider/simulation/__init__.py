@@ -1,4 +1,4 @@
-from .simulator import PlatesSimulation
-from .imu import IMUSimulator
+from .simulator import PlatesSimulation, PLATE_DTYPE
+from .imu import IMUSimulator, ChainIMUSimulator, IMU_DTYPE
 
-__all__ = ['PlatesSimulation', 'IMUSimulator']
\ No newline at end of file
+__all__ = ['PlatesSimulation', 'PLATE_DTYPE', 'IMUSimulator', 'ChainIMUSimulator', 'IMU_DTYPE']
\ No newline at end of file
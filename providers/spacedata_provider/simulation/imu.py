@@ -2,6 +2,8 @@ import time
 from typing import Optional, Tuple
 import numpy as np
 
+from common.kinematics import euler_to_matrix, rotate_points, rotation_workspace
+
 class IMUSimulator:
     def __init__(self, plate_id: int):
         self.plate_id = plate_id
@@ -47,3 +49,139 @@ class IMUSimulator:
             "mag_z": float(mag_z),
             "timestamp": int(current_time * 1e6)
         }
+
+
+# Показания IMU одной пластины: ускорение (м/с²), угловая скорость (рад/с),
+# магнитное поле (нормированное), все в связанной системе координат пластины
+IMU_DTYPE = np.dtype([
+    ('plate_id', np.int32),
+    ('accel', np.float64, (3,)),
+    ('gyro', np.float64, (3,)),
+    ('mag', np.float64, (3,))
+])
+
+GRAVITY = 9.81
+
+
+class ChainIMUSimulator:
+    """
+    Пакетный IMU для всей цепочки: показания всех пластин считаются одним
+    векторизованным шагом по траектории симуляции, в модельном времени.
+
+    Модель датчика на каждую ось: истинное значение + постоянное смещение
+    (случайное для каждого датчика) + случайное блуждание смещения + белый шум.
+    """
+    def __init__(
+        self,
+        plate_ids: np.ndarray,
+        sample_rate: Optional[float] = None,
+        accel_noise: float = 0.02,      # м/с², СКО белого шума
+        gyro_noise: float = 0.002,      # рад/с
+        mag_noise: float = 0.01,        # доли поля
+        accel_bias: float = 0.05,       # м/с², СКО начального смещения
+        gyro_bias: float = 0.005,       # рад/с
+        accel_bias_walk: float = 0.0005,  # м/с² за √с
+        gyro_bias_walk: float = 0.0001,   # рад/с за √с
+        mag_inclination: float = 60.0,  # наклонение магнитного поля, градусы
+        seed: Optional[int] = None
+    ):
+        n = len(plate_ids)
+        self.plate_count = n
+        self.sample_period = 1.0 / sample_rate if sample_rate else None
+        self.accel_noise = accel_noise
+        self.gyro_noise = gyro_noise
+        self.mag_noise = mag_noise
+        self.accel_bias_walk = accel_bias_walk
+        self.gyro_bias_walk = gyro_bias_walk
+
+        self._rng = np.random.default_rng(seed)
+        self.accel_bias = self._rng.normal(0.0, accel_bias, (n, 3))
+        self.gyro_bias = self._rng.normal(0.0, gyro_bias, (n, 3))
+
+        # Поле Земли в мировой системе (Y - вверх)
+        inclination = np.radians(mag_inclination)
+        self.mag_field = np.array([np.cos(inclination), -np.sin(inclination), 0.0])
+        self.gravity = np.array([0.0, GRAVITY, 0.0])
+
+        self.samples = np.zeros(n, dtype=IMU_DTYPE)
+        self.samples['plate_id'] = plate_ids
+        self.sample_time = 0.0
+
+        self._last_time: Optional[float] = None
+        self._last_position = np.zeros((n, 3))
+        self._last_velocity = np.zeros((n, 3))
+        self._has_velocity = False
+        self._rotation = np.zeros((n, 3, 3))
+        self._last_rotation = np.zeros((n, 3, 3))
+        self._world = np.zeros((n, 3))
+        self._body = np.zeros((2, n, 3))
+        self._work = rotation_workspace(n)
+        self._since_sample = 0.0
+
+    def update(self, sim_time: float, positions: np.ndarray,
+               angles: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Рассчитывает показания по позициям (N,3, мм) и углам (N,3, рад)
+
+        Returns:
+            Массив IMU_DTYPE (внутренний буфер) или None, если по частоте
+            дискретизации датчика на этом шаге отсчета нет
+        """
+        if self._last_time is None:
+            self._last_time = sim_time
+            self._last_position[...] = positions
+            euler_to_matrix(angles, self._last_rotation, self._work)
+            return None
+
+        dt = sim_time - self._last_time
+        if dt <= 0:
+            return None
+
+        # Кинематика по траектории: скорость и ускорение конечными разностями (м)
+        velocity = (positions - self._last_position) * (0.001 / dt)
+        if self._has_velocity:
+            acceleration = (velocity - self._last_velocity) / dt
+        else:
+            acceleration = np.zeros_like(velocity)
+        euler_to_matrix(angles, self._rotation, self._work)
+
+        self._last_time = sim_time
+        self._last_position[...] = positions
+        self._last_velocity[...] = velocity
+        self._has_velocity = True
+
+        # Смещения дрейфуют случайным блужданием в модельном времени
+        sqrt_dt = np.sqrt(dt)
+        shape = self.accel_bias.shape
+        self.accel_bias += self._rng.normal(0.0, self.accel_bias_walk * sqrt_dt, shape)
+        self.gyro_bias += self._rng.normal(0.0, self.gyro_bias_walk * sqrt_dt, shape)
+
+        self._since_sample += dt
+        if self.sample_period and self._since_sample < self.sample_period:
+            self._last_rotation[...] = self._rotation
+            return None
+        sample_dt = dt
+        self._since_sample = 0.0
+
+        # Акселерометр измеряет удельную силу в связанной системе: Rᵀ (a + g)
+        np.add(acceleration, self.gravity, out=self._world)
+        accel = rotate_points(self._rotation, self._world, self._body[0], inverse=True)
+
+        # Гироскоп: относительный поворот за шаг Rprevᵀ R ≈ I + [ω]× dt
+        delta = np.einsum('nji,njk->nik', self._last_rotation, self._rotation)
+        gyro = np.stack((
+            delta[:, 2, 1] - delta[:, 1, 2],
+            delta[:, 0, 2] - delta[:, 2, 0],
+            delta[:, 1, 0] - delta[:, 0, 1]
+        ), axis=1) / (2.0 * sample_dt)
+        self._last_rotation[...] = self._rotation
+
+        # Магнитометр: поле Земли в связанной системе
+        mag = rotate_points(self._rotation, self.mag_field, self._body[1], inverse=True)
+
+        noise = self._rng.standard_normal((3, self.plate_count, 3))
+        self.samples['accel'] = accel + self.accel_bias + noise[0] * self.accel_noise
+        self.samples['gyro'] = gyro + self.gyro_bias + noise[1] * self.gyro_noise
+        self.samples['mag'] = mag + noise[2] * self.mag_noise
+        self.sample_time = sim_time
+        return self.samples
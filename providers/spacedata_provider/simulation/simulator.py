@@ -1,10 +1,19 @@
 from datetime import datetime
 import numpy as np
-from typing import List
+from typing import List, Optional
 from server.logger import server_logger
 
+# Состояние одной пластины: позиция (x, y, z), углы (roll, pitch, yaw), размеры
+PLATE_DTYPE = np.dtype([
+    ('plate_id', np.int32),
+    ('position', np.float64, (3,)),
+    ('angles', np.float64, (3,)),
+    ('dimensions', np.float64, (3,))
+])
+
+
 class PlatesSimulation:
-    def __init__(self):
+    def __init__(self, plate_count: int = 3):
         # Данные для симуляции
         self.time = 0.0
         self.frequency = 1  # Увеличиваем частоту колебаний для более быстрого движения
@@ -17,55 +26,94 @@ class PlatesSimulation:
         self.plate_thickness = 10.0     # толщина пластины в мм
         self.plate_height = 200.0       # Высота пластины в мм
         self.plate_width = 100.0        # Ширина пластины в мм
-        
-    def update(self, dt: float):
-        """  Обновляет состояние симуляции на заданный промежуток времени. """
+
+        self.plate_count = plate_count
+        self.plates = np.zeros(plate_count, dtype=PLATE_DTYPE)
+        self._init_plates()
+
+    def _init_plates(self):
+        """Заполняет неизменяемую часть состояния и буферы для пакетного расчета"""
+        n = self.plate_count
+        index = np.arange(n)
+
+        self.plates['plate_id'] = index
+        self.plates['dimensions'] = (self.plate_thickness, self.plate_height, self.plate_width)
+        # Представления полей, чтобы не искать их на каждом тике
+        self._position = self.plates['position']
+        self._angles = self.plates['angles']
+
+        # Фазовый сдвиг для каждой пластины
+        self._phases = index * self.phase_shift
+        # Базовая высота увеличивается для каждой следующей пластины
+        self._base_y = ((self.above_table + self.plate_height/2)
+                        + index * (self.plate_height + self.plate_spacing))
+
+        # Рабочие буферы, переиспользуются на каждом тике
+        self._arg = np.empty(n)
+        self._sin = np.empty(n)
+        self._cos = np.empty(n)
+        self._tmp = np.empty(n)
+
+    def step(self, dt: float) -> Optional[np.ndarray]:
+        """
+        Продвигает симуляцию на dt и пересчитывает все пластины одним пакетным проходом.
+
+        Returns:
+            Структурированный массив состояния (PLATE_DTYPE); это внутренний буфер,
+            он перезаписывается следующим вызовом
+        """
         try:
             self.time += dt
-            plates = []
-        
-            # Генерируем три пластины
-            for i in range(3):
-                # Фазовый сдвиг для каждой пластины
-                phase = i * self.phase_shift
-
-                # Базовая высота увеличивается для каждой следующей пластины
-                base_y = (self.above_table + self.plate_height/2) + i * (self.plate_height + self.plate_spacing)
-
-                # Добавляем вертикальное колебание
-                vertical_oscillation = 30.0 * np.sin(self.time * self.frequency * 0.7 + phase)
-                y = base_y + vertical_oscillation
-
-                # Создаем колебательное движение по X и Z с фазовым сдвигом
-                x = self.amplitude * np.cos(self.time * self.frequency + phase)
-                z = self.amplitude * np.sin(self.time * self.frequency + phase)
-
-                # Делаем более заметные углы наклона
-                roll = np.radians(15 * np.sin(self.time * self.frequency + phase))
-                pitch = np.radians(15 * np.cos(self.time * self.frequency + phase))
-                yaw = np.radians(30 * np.sin(self.time * self.frequency * 0.5))
-
-                position = (float(x), float(y), float(z))
-                angles = (float(roll), float(pitch), float(yaw))
-
-                plate ={
-                    "plate_id": i,
-                    "coordinates": position,
-                    "angles": angles,
-                    "dimensions":(
-                        float(self.plate_thickness),
-                        float(self.plate_height),
-                        float(self.plate_width)
-                    )
-                }
-
-                plates.append(plate)
-
-            return {
-                "timestamp": datetime.now(),
-                "plates": plates
-            }
+            t = self.time * self.frequency
+            position = self._position
+            angles = self._angles
+
+            np.add(self._phases, t, out=self._arg)
+            np.sin(self._arg, out=self._sin)
+            np.cos(self._arg, out=self._cos)
+
+            # Колебательное движение по X и Z с фазовым сдвигом
+            np.multiply(self._cos, self.amplitude, out=position[:, 0])
+            np.multiply(self._sin, self.amplitude, out=position[:, 2])
+
+            # Вертикальное колебание вокруг базовой высоты
+            np.add(self._phases, t * 0.7, out=self._tmp)
+            np.sin(self._tmp, out=self._tmp)
+            np.multiply(self._tmp, 30.0, out=self._tmp)
+            np.add(self._base_y, self._tmp, out=position[:, 1])
+
+            # Углы наклона
+            np.multiply(self._sin, np.radians(15), out=angles[:, 0])
+            np.multiply(self._cos, np.radians(15), out=angles[:, 1])
+            angles[:, 2] = np.radians(30 * np.sin(t * 0.5))
+
+            return self.plates
 
         except Exception as e:
-            server_logger.error(f"Error in simulation update: {e}")
+            server_logger.error("Error in simulation update: %s", e)
+            return None
+
+    def plates_view(self) -> List[dict]:
+        """Представление состояния в виде списка словарей (совместимый формат)"""
+        return [
+            {
+                "plate_id": plate_id,
+                "coordinates": tuple(position),
+                "angles": tuple(angles),
+                "dimensions": tuple(dimensions)
+            } for plate_id, position, angles, dimensions in zip(
+                self.plates['plate_id'].tolist(),
+                self.plates['position'].tolist(),
+                self.plates['angles'].tolist(),
+                self.plates['dimensions'].tolist()
+            )
+        ]
+
+    def update(self, dt: float):
+        """  Обновляет состояние симуляции на заданный промежуток времени. """
+        if self.step(dt) is None:
             return None
+        return {
+            "timestamp": datetime.now(),
+            "plates": self.plates_view()
+        }
@@ -0,0 +1,252 @@
+// Бинарный протокол кадров /ws (см. common/frame_codec.py)
+export const FRAME_VERSION = 1;
+export const FRAME_TYPE_POSES = 0;
+export const FRAME_TYPE_KEYFRAME = 1;
+export const FRAME_TYPE_DELTA = 2;
+export const FRAME_TYPE_IMU = 3;
+
+// version u8, type u8, stream u16, seq u32, timestamp f64, plate count u32
+export const HEADER_SIZE = 20;
+
+// plate_id, x, y, z, roll, pitch, yaw, thickness, height, width (float32)
+export const RECORD_FIELDS = 10;
+
+// plate_id, accel xyz, gyro xyz, mag xyz (float32)
+export const IMU_RECORD_FIELDS = 10;
+
+// Квантованная запись режима delta: x, y, z, roll, pitch, yaw
+export const QUANTIZED_FIELDS = 6;
+
+export function readFrameType(buffer) {
+    return new DataView(buffer).getUint8(1);
+}
+
+export function decodeBinaryFrame(buffer) {
+    const view = new DataView(buffer);
+    const version = view.getUint8(0);
+    if (version !== FRAME_VERSION) {
+        throw new Error(`Unsupported frame version: ${version}`);
+    }
+
+    const count = view.getUint32(16, true);
+    // Записи читаются прямо из буфера, без копирования и разбора
+    const records = new Float32Array(buffer, HEADER_SIZE, count * RECORD_FIELDS);
+
+    const plates = new Array(count);
+    for (let i = 0; i < count; i++) {
+        const offset = i * RECORD_FIELDS;
+        plates[i] = {
+            plate_id: records[offset],
+            position: records.subarray(offset + 1, offset + 4),
+            orientation: records.subarray(offset + 4, offset + 7),
+            dimensions: records.subarray(offset + 7, offset + 10)
+        };
+    }
+
+    return {
+        version,
+        type: view.getUint8(1),
+        stream: view.getUint16(2, true),
+        seq: view.getUint32(4, true),
+        timestamp: view.getFloat64(8, true),
+        records,
+        plates
+    };
+}
+
+export function decodeImuFrame(buffer) {
+    const view = new DataView(buffer);
+    const count = view.getUint32(16, true);
+    return {
+        seq: view.getUint32(4, true),
+        timestamp: view.getFloat64(8, true),
+        count,
+        records: new Float32Array(buffer, HEADER_SIZE, count * IMU_RECORD_FIELDS)
+    };
+}
+
+// Восстанавливает полное состояние из metadata, ключевых кадров и приращений
+export class DeltaStateDecoder {
+    constructor() {
+        this.metadata = null;
+        this.quantized = null;  // Int32Array, накопленное квантованное состояние
+        this.values = null;     // Float32Array, состояние в мм и радианах
+        this.plates = [];
+        this.lastSeq = null;
+    }
+
+    setMetadata(metadata) {
+        this.metadata = metadata;
+        const count = metadata.plates.length;
+        this.quantized = new Int32Array(count * QUANTIZED_FIELDS);
+        this.values = new Float32Array(count * QUANTIZED_FIELDS);
+        this.plates = metadata.plates.map((plate, i) => {
+            const offset = i * QUANTIZED_FIELDS;
+            return {
+                plate_id: plate.plate_id,
+                position: this.values.subarray(offset, offset + 3),
+                orientation: this.values.subarray(offset + 3, offset + 6),
+                dimensions: plate.dimensions
+            };
+        });
+        this.lastSeq = null;
+    }
+
+    // Возвращает полный кадр или null, если нужен ключевой кадр
+    decode(buffer) {
+        const view = new DataView(buffer);
+        const type = view.getUint8(1);
+        const seq = view.getUint32(4, true);
+        const count = view.getUint32(16, true);
+
+        if (!this.metadata || count !== this.plates.length) {
+            return null;
+        }
+
+        const length = count * QUANTIZED_FIELDS;
+        if (type === FRAME_TYPE_KEYFRAME) {
+            this.quantized.set(new Int32Array(buffer, HEADER_SIZE, length));
+        } else if (type === FRAME_TYPE_DELTA) {
+            // Приращение применимо только к непосредственно предыдущему кадру
+            if (this.lastSeq === null || seq !== ((this.lastSeq + 1) >>> 0)) {
+                this.lastSeq = null;
+                return null;
+            }
+            const delta = new Int16Array(buffer, HEADER_SIZE, length);
+            for (let i = 0; i < length; i++) {
+                this.quantized[i] += delta[i];
+            }
+        } else {
+            return null;
+        }
+        this.lastSeq = seq;
+
+        const positionQuantum = this.metadata.position_quantum;
+        const angleQuantum = this.metadata.angle_quantum;
+        for (let i = 0; i < length; i += QUANTIZED_FIELDS) {
+            this.values[i] = this.quantized[i] * positionQuantum;
+            this.values[i + 1] = this.quantized[i + 1] * positionQuantum;
+            this.values[i + 2] = this.quantized[i + 2] * positionQuantum;
+            this.values[i + 3] = this.quantized[i + 3] * angleQuantum;
+            this.values[i + 4] = this.quantized[i + 4] * angleQuantum;
+            this.values[i + 5] = this.quantized[i + 5] * angleQuantum;
+        }
+
+        return {
+            version: view.getUint8(0),
+            type,
+            stream: view.getUint16(2, true),
+            seq,
+            timestamp: view.getFloat64(8, true),
+            plates: this.plates
+        };
+    }
+}
+
+// Запись кадра для отрисовки: plate_id, x, y, z, roll, pitch, yaw,
+// thickness, height, width, qx, qy, qz, qw (кватернион из углов в порядке XYZ)
+export const POSE_FIELDS = 14;
+
+// Поля position/orientation/dimensions кадра любого формата в записи POSE_FIELDS
+export function toPoseRecords(plates) {
+    const records = new Float32Array(plates.length * POSE_FIELDS);
+    for (let i = 0; i < plates.length; i++) {
+        const plate = plates[i];
+        const offset = i * POSE_FIELDS;
+        const position = plate.position || [0, 0, 0];
+        const orientation = plate.orientation || [0, 0, 0];
+        records[offset] = plate.plate_id;
+        records[offset + 1] = position[0];
+        records[offset + 2] = position[1];
+        records[offset + 3] = position[2];
+        records[offset + 4] = orientation[0];
+        records[offset + 5] = orientation[1];
+        records[offset + 6] = orientation[2];
+        if (plate.dimensions) {
+            records[offset + 7] = plate.dimensions[0];
+            records[offset + 8] = plate.dimensions[1];
+            records[offset + 9] = plate.dimensions[2];
+        }
+
+        // Как THREE.Quaternion.setFromEuler для порядка 'XYZ'
+        const c1 = Math.cos(orientation[0] / 2), s1 = Math.sin(orientation[0] / 2);
+        const c2 = Math.cos(orientation[1] / 2), s2 = Math.sin(orientation[1] / 2);
+        const c3 = Math.cos(orientation[2] / 2), s3 = Math.sin(orientation[2] / 2);
+        records[offset + 10] = s1 * c2 * c3 + c1 * s2 * s3;
+        records[offset + 11] = c1 * s2 * c3 - s1 * c2 * s3;
+        records[offset + 12] = c1 * c2 * s3 + s1 * s2 * c3;
+        records[offset + 13] = c1 * c2 * c3 - s1 * s2 * s3;
+    }
+    return records;
+}
+
+// Разбор сообщений /ws в события для клиента; работает в frame-worker.js
+// (или в основном потоке, если Web Worker недоступен). Результат - событие
+// и список буферов, передаваемых без копирования
+export class FrameDecoder {
+    constructor() {
+        // Состояние режима delta ведется отдельно для каждого потока
+        this.deltaDecoders = new Map();
+    }
+
+    reset() {
+        this.deltaDecoders.clear();
+    }
+
+    decode(data) {
+        return data instanceof ArrayBuffer ? this.decodeBinary(data) : this.decodeText(data);
+    }
+
+    decodeText(text) {
+        const data = JSON.parse(text);
+        if (data.type === 'metadata') {
+            // Статические данные пластин режима delta
+            this.getDeltaDecoder(data.stream_id).setMetadata(data);
+            return { event: { type: 'metadata', data }, transfer: [] };
+        }
+        if (data.type) {
+            // Управляющие сообщения сервера: subscribed, clock
+            return { event: { type: data.type, data }, transfer: [] };
+        }
+        if (!data.plates) {
+            return null;
+        }
+        return this.poseEvent(data.stream_id || 0, data.seq, data.timestamp, data.plates);
+    }
+
+    decodeBinary(buffer) {
+        const type = readFrameType(buffer);
+        if (type === FRAME_TYPE_POSES) {
+            const frame = decodeBinaryFrame(buffer);
+            return this.poseEvent(frame.stream, frame.seq, frame.timestamp, frame.plates);
+        }
+        if (type === FRAME_TYPE_IMU) {
+            // Сырые показания IMU - отдельный канал
+            const frame = decodeImuFrame(buffer);
+            return { event: { type: 'imu', frame }, transfer: [buffer] };
+        }
+
+        const stream = new DataView(buffer).getUint16(2, true);
+        const frame = this.getDeltaDecoder(stream).decode(buffer);
+        if (!frame) {
+            // Потеряно приращение или нет metadata - нужен ключевой кадр
+            return { event: { type: 'keyframe_needed', stream }, transfer: [] };
+        }
+        return this.poseEvent(stream, frame.seq, frame.timestamp, frame.plates);
+    }
+
+    poseEvent(stream, seq, timestamp, plates) {
+        const records = toPoseRecords(plates);
+        const frame = { stream, seq, timestamp, count: plates.length, records };
+        return { event: { type: 'frame', frame }, transfer: [records.buffer] };
+    }
+
+    getDeltaDecoder(stream) {
+        let decoder = this.deltaDecoders.get(stream);
+        if (!decoder) {
+            decoder = new DeltaStateDecoder();
+            this.deltaDecoders.set(stream, decoder);
+        }
+        return decoder;
+    }
+}
@@ -0,0 +1,24 @@
+// Разбор кадров /ws вне основного потока: основной поток передает сюда
+// сообщения сокета и получает готовые записи поз (см. FrameDecoder)
+import { FrameDecoder } from './frame-codec.js';
+
+const decoder = new FrameDecoder();
+
+self.onmessage = (message) => {
+    const { data, received, reset } = message.data;
+    if (reset) {
+        decoder.reset();
+        return;
+    }
+    const started = performance.now();
+    try {
+        const result = decoder.decode(data);
+        if (result) {
+            result.event.received = received;
+            result.event.decodeMs = performance.now() - started;
+            self.postMessage(result.event, result.transfer);
+        }
+    } catch (error) {
+        self.postMessage({ type: 'decode_error', message: error.message, received });
+    }
+};
@@ -0,0 +1,127 @@
+// Буфер кадров с метками времени сервера. Кадры показываются с задержкой,
+// которая покрывает интервал между кадрами и разброс времени доставки;
+// позы между двумя соседними кадрами интерполируются при отрисовке
+
+// Окно оценки минимального времени доставки, кадров
+const TRANSIT_WINDOW = 64;
+// Метка времени меньше последней на столько мс - новый поток, буфер сбрасывается
+const RESET_GAP_MS = 1000;
+// Наибольшее изменение задержки показа за один кадр, мс: время показа не прыгает
+const DELAY_SLEW_MS = 2;
+
+export class JitterBuffer {
+    constructor(options = {}) {
+        this.options = {
+            capacity: 64,       // кадров
+            minMargin: 20,      // запас сверх минимального времени доставки, мс
+            maxMargin: 500,
+            jitterFactor: 3,    // запас в единицах оценки разброса доставки
+            ...options
+        };
+        this.reset();
+    }
+
+    reset() {
+        this.frames = [];           // { time, frame } по возрастанию time, мс сервера
+        this.transits = [];         // время доставки последних кадров, мс
+        this.lastTransit = null;
+        this.jitter = 0;            // оценка разброса доставки (RFC 3550, 6.4.1), мс
+        this.interval = null;       // сглаженный интервал между кадрами, мс
+        this.delay = null;          // задержка показа относительно часов сервера, мс
+        this.shownTime = -Infinity;
+        this.underrun = false;
+        this.counters = { frames: 0, late: 0, underruns: 0 };
+    }
+
+    // frame.timestamp - время сервера, с; arrival - время получения по часам сервера, мс
+    push(frame, arrival) {
+        const time = frame.timestamp * 1000;
+        const last = this.frames[this.frames.length - 1];
+        if (last && time <= last.time) {
+            if (last.time - time < RESET_GAP_MS) {
+                this.counters.late++;
+                return false;
+            }
+            this.reset();
+        }
+        this.counters.frames++;
+
+        const transit = arrival - time;
+        if (this.lastTransit !== null) {
+            this.jitter += (Math.abs(transit - this.lastTransit) - this.jitter) / 16;
+        }
+        this.lastTransit = transit;
+        this.transits.push(transit);
+        if (this.transits.length > TRANSIT_WINDOW) {
+            this.transits.shift();
+        }
+        if (last) {
+            const interval = time - last.time;
+            this.interval = this.interval === null
+                ? interval : this.interval + (interval - this.interval) / 16;
+        }
+
+        // Минимальное время доставки включает погрешность синхронизации часов,
+        // поэтому ограничивается только запас сверх него
+        const margin = Math.min(this.options.maxMargin, Math.max(
+            this.options.minMargin,
+            (this.interval || 0) + this.options.jitterFactor * this.jitter
+        ));
+        const target = Math.min(...this.transits) + margin;
+        this.delay = this.delay === null ? target
+            : this.delay + Math.max(-DELAY_SLEW_MS, Math.min(DELAY_SLEW_MS, target - this.delay));
+
+        if (time < arrival - this.delay) {
+            // Пришел позже, чем должен был быть показан
+            this.counters.late++;
+        }
+        this.frames.push({ time, frame });
+        if (this.frames.length > this.options.capacity) {
+            this.frames.shift();
+        }
+        return true;
+    }
+
+    // Кадры и доля интерполяции для момента now (мс, часы сервера) или null
+    sample(now) {
+        if (!this.frames.length) {
+            return null;
+        }
+        // Время показа не идет назад при уменьшении задержки
+        const time = Math.max(now - this.delay, this.shownTime);
+        this.shownTime = time;
+
+        // Кадры старше предыдущего для момента показа больше не нужны
+        while (this.frames.length > 2 && this.frames[1].time <= time) {
+            this.frames.shift();
+        }
+        const [first, second] = this.frames;
+        if (time <= first.time || !second) {
+            if (!second && time > first.time) {
+                // Буфер исчерпан - держим последний кадр
+                if (!this.underrun) {
+                    this.counters.underruns++;
+                }
+                this.underrun = true;
+            }
+            return { from: first.frame, to: first.frame, alpha: 0, time: first.time };
+        }
+        this.underrun = false;
+        const alpha = (time - first.time) / (second.time - first.time);
+        return { from: first.frame, to: second.frame, alpha, time };
+    }
+
+    // Состояние буфера и счетчики с прошлого вызова
+    takeStats() {
+        const transit = this.transits.length ? Math.min(...this.transits) : null;
+        const stats = {
+            buffered: this.frames.length,
+            transitMs: transit,
+            jitterMs: this.jitter,
+            bufferMs: this.delay !== null && transit !== null ? this.delay - transit : null,
+            ...this.counters
+        };
+        this.counters = { frames: 0, late: 0, underruns: 0 };
+        return stats;
+    }
+}
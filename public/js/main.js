@@ -1,8 +1,20 @@
 import { PlatesManager } from './plates.js';
 import { Scene3D } from './scene.js';
 import { WebSocketManager } from './websocket-manager.js';
+import { JitterBuffer } from './jitter-buffer.js';
+
+// Период обновления информационной панели и отчета о задержках, мс
+const PANEL_INTERVAL = 250;
+const LATENCY_REPORT_INTERVAL = 1000;
 
 let scene3D, platesManager, wsManager;
+const jitterBuffer = new JitterBuffer();
+// Поток, который показывает сцена: первый из подписок соединения
+let displayStream = null;
+let latestFrame = null;
+let panelUpdated = 0;
+// Задержка показанной позы относительно времени сервера и число кадров экрана
+const renderStats = { frames: 0, latencyMs: 0 };
 
 function initTogglePanel() {
     const toggleButton = document.getElementById('toggle-panel');
@@ -28,16 +40,61 @@ function showNotification(message, type = 'info') {
     }, 3000);
 }
 
+function renderFrame(now) {
+    const serverNow = wsManager.serverNow(now);
+    const sample = jitterBuffer.sample(serverNow);
+    if (!sample) return;
+    try {
+        platesManager.renderSample(sample);
+    } catch (error) {
+        console.error('Error rendering plates:', error);
+        return;
+    }
+    renderStats.frames++;
+    renderStats.latencyMs += serverNow - sample.time;
+
+    if (latestFrame && now - panelUpdated >= PANEL_INTERVAL) {
+        platesManager.updateInfoPanel(latestFrame);
+        panelUpdated = now;
+    }
+}
+
+function reportLatency() {
+    const buffer = jitterBuffer.takeStats();
+    const frames = renderStats.frames;
+    wsManager.reportLatency({
+        stream_id: displayStream,
+        render_latency_ms: frames ? renderStats.latencyMs / frames : null,
+        display_fps: frames * 1000 / LATENCY_REPORT_INTERVAL,
+        transit_ms: buffer.transitMs,
+        jitter_ms: buffer.jitterMs,
+        buffer_ms: buffer.bufferMs,
+        decode_ms: wsManager.takeDecodeStats(),
+        clock_rtt_ms: wsManager.clock.rtt,
+        frames: buffer.frames,
+        late_frames: buffer.late,
+        underruns: buffer.underruns
+    });
+    renderStats.frames = 0;
+    renderStats.latencyMs = 0;
+}
+
 function init() {
     // Инициализация 3D сцены
     scene3D = new Scene3D();
     platesManager = new PlatesManager(scene3D);
+    // Позы между кадрами сервера интерполируются с частотой обновления экрана
+    scene3D.onFrame(renderFrame);
     scene3D.animate();
 
+    // ?rate= - частота кадров с сервера; плавность обеспечивает интерполяция
+    const rate = parseFloat(new URLSearchParams(window.location.search).get('rate')) || null;
+
     // Инициализация WebSocket с опциями
     wsManager = new WebSocketManager(`ws://${window.location.host}/ws`, {
         reconnectInterval: 1000,
-        maxReconnectAttempts: 5
+        maxReconnectAttempts: 5,
+        encoding: 'delta'
     });
 
     // Обработчики событий WebSocket
@@ -58,15 +115,34 @@ function init() {
         showNotification('Unable to connect to server. Please refresh the page.', 'error');
     });
 
-    wsManager.on('message', (data) => {
-        try {
-            platesManager.updatePlates(data);
-        } catch (error) {
-            console.error('Error processing data:', error);
-            showNotification('Error processing data from server', 'error');
+    wsManager.on('metadata', (metadata) => {
+        platesManager.setMetadata(metadata);
+    });
+
+    wsManager.on('subscribed', (data) => {
+        const stream = data.streams[0];
+        if (!stream) return;
+        if (stream.stream_id !== displayStream) {
+            displayStream = stream.stream_id;
+            jitterBuffer.reset();
+        }
+        if (rate && stream.rate !== rate) {
+            // Повторная подписка меняет ее параметры
+            wsManager.subscribe([{ provider: stream.provider, rate }]);
+        }
+    });
+
+    wsManager.on('frame', (frame) => {
+        if (displayStream === null) {
+            displayStream = frame.stream;
         }
+        if (frame.stream !== displayStream) return;
+        jitterBuffer.push(frame, wsManager.serverNow(frame.received));
+        latestFrame = frame;
     });
 
+    setInterval(reportLatency, LATENCY_REPORT_INTERVAL);
+
     // Инициализация UI компонентов
     initTogglePanel();
 
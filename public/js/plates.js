@@ -1,5 +1,6 @@
 import * as THREE from 'three';
 import { OutlineEffect } from 'three/addons/effects/OutlineEffect.js';
+import { POSE_FIELDS } from './frame-codec.js';
 
 export class PlatesManager {
     constructor(scene3D) {
@@ -13,12 +14,18 @@ export class PlatesManager {
         this.scaleForDisplay = 1 / 100;
 
         this.plates = [];
+        // Статические данные пластин (размеры) из сообщения metadata
+        this.plateMetadata = new Map();
         this.debugObjects = {
             points: [],
             lines: [],
             axes: []
         };
 
+        // Промежуточные значения интерполяции
+        this.fromQuaternion = new THREE.Quaternion();
+        this.toQuaternion = new THREE.Quaternion();
+
         this.setupEffects();
         this.clearScene();
 
@@ -67,10 +74,21 @@ export class PlatesManager {
         return axes;
     }
 
+    setMetadata(metadata) {
+        this.plateMetadata.clear();
+        metadata.plates.forEach(plate => this.plateMetadata.set(plate.plate_id, plate));
+        // Состав пластин мог измениться - пересоздаем их при следующем кадре
+        this.clearScene();
+    }
+
     createPlate(plateData) {
-        // Получаем размеры из данных или используем значения по умолчанию
+        // Получаем размеры из данных, metadata или используем значения по умолчанию
         const defaultDimensions = [5, 50, 30]; // thickness, height, width in mm
-        const dimensions = (plateData.dimensions || defaultDimensions).map(d => d * this.scaleForDisplay);
+        const metadata = this.plateMetadata.get(plateData.plate_id);
+        const sourceDimensions = plateData.dimensions
+            || (metadata && metadata.dimensions)
+            || defaultDimensions;
+        const dimensions = sourceDimensions.map(d => d * this.scaleForDisplay);
         const [thickness, height, width] = dimensions;
 
         const geometry = new THREE.BoxGeometry(thickness, height, width);
@@ -90,13 +108,20 @@ export class PlatesManager {
         label.position.set(0.1, height / 2 + 0.1, width / 2 + 0.1);
         plate.add(label);
 
+        let point = null;
         if (this.debugMode) {
             const axes = this.createDebugAxes();
             plate.add(axes);
+
+            // Отладочная точка в начале координат пластины
+            point = this.createDebugPoint();
+            this.scene.add(point);
+            this.debugObjects.points.push(point);
         }
 
         plate.userData = {
             label,
+            point,
             plateData
         };
         return plate;
@@ -150,66 +175,66 @@ export class PlatesManager {
         });
     }
 
-    updatePlates(data) {
-        // Получаем данные из сервера и обрабатываем их
-        if (!data || !data.version || !data.plates) {
-            console.warn("Invalid data format:", data);
-            return;
-        }
-
-        console.log("Raw data from server:", {
-            plates: data.plates.map(plate => ({
-                id: plate.plate_id,
-                position: [...plate.position],
-                orientation: [...plate.orientation],
-                dimensions: plate.dimensions ? [...plate.dimensions] : null
-            }))
-        });
-
-        // Очищаем предыдущие отладочные объекты и создание новых
-        Object.values(this.debugObjects).forEach(objects => {
-            objects.forEach(obj => this.scene.remove(obj));
-            objects.length = 0;
-        });
-
-        // Создаем новые объекты и добавляем их к сцене
-        while (this.plates.length < data.plates.length) {
-            const plate = this.createPlate(data.plates[this.plates.length]);
-            this.scene.add(plate);
-            this.plates.push(plate);
+    // Пластины кадра из записей POSE_FIELDS (для создания пластин и панели)
+    framePlates(frame) {
+        const plates = new Array(frame.count);
+        for (let i = 0; i < frame.count; i++) {
+            const offset = i * POSE_FIELDS;
+            const dimensions = frame.records.subarray(offset + 7, offset + 10);
+            plates[i] = {
+                plate_id: frame.records[offset],
+                position: frame.records.subarray(offset + 1, offset + 4),
+                orientation: frame.records.subarray(offset + 4, offset + 7),
+                // Нули - размеры не переданы (есть в metadata или по умолчанию)
+                dimensions: dimensions.some(value => value) ? Array.from(dimensions) : null
+            };
         }
-
-        // Обновляем все объекты
-        data.plates.forEach((plateData, i) => {
-            this.updateSinglePlate(plateData, i);
-        });
-
-        // Обновляем информационную панель
-        this.updateInfoPanel(data);
+        return plates;
     }
 
-    updateSinglePlate(plateData, index) {
-        const plate = this.plates[index];
-        if (!plate) return;
-
-        // Преобразуем координаты в единицы сцены и обеспечиваем положительные значения
-        const scaledPosition = plateData.position.map(coord => Math.max(0, coord * this.scaleForDisplay));
-        plate.position.set(...scaledPosition);
+    // Поза пластин между кадрами from и to: положение линейно, ориентация - slerp
+    renderSample({ from, to, alpha }) {
+        if (this.plates.length < to.count) {
+            // Создаем недостающие объекты и добавляем их к сцене
+            const plates = this.framePlates(to);
+            while (this.plates.length < to.count) {
+                const plate = this.createPlate(plates[this.plates.length]);
+                this.scene.add(plate);
+                this.plates.push(plate);
+            }
+        }
 
-        // Создаем отладочные точки
-        const pointMesh = this.createDebugPoint();
-        pointMesh.position.copy(plate.position);
-        this.scene.add(pointMesh);
-        this.debugObjects.points.push(pointMesh);
+        const a = from.records;
+        const b = to.records;
+        for (let i = 0; i < to.count; i++) {
+            const plate = this.plates[i];
+            const offset = i * POSE_FIELDS;
+            // Интерполируется только та же пластина на том же месте в обоих кадрах
+            const t = i < from.count && a[offset] === b[offset] ? alpha : 1;
+
+            // Преобразуем координаты в единицы сцены и обеспечиваем положительные значения
+            const coord = k => Math.max(0, (a[offset + k] + (b[offset + k] - a[offset + k]) * t)
+                * this.scaleForDisplay);
+            plate.position.set(coord(1), coord(2), coord(3));
+            if (t === 1) {
+                plate.quaternion.fromArray(b, offset + 10);
+            } else {
+                this.fromQuaternion.fromArray(a, offset + 10);
+                this.toQuaternion.fromArray(b, offset + 10);
+                plate.quaternion.slerpQuaternions(this.fromQuaternion, this.toQuaternion, t);
+            }
 
-        // Применяем углы поворота
-        const euler = new THREE.Euler(...plateData.orientation, 'XYZ');
-        plate.setRotationFromEuler(euler);
+            if (plate.userData.point) {
+                plate.userData.point.position.copy(plate.position);
+            }
+        }
     }
 
-    updateInfoPanel(data) {
+    // Панель показывает последний полученный кадр (без интерполяции)
+    updateInfoPanel(frame) {
         const panel = document.getElementById('info-panel');
         if (!panel) return;
+        const data = { plates: this.framePlates(frame) };
 
         // Форматируем значения, обеспечивая положительные значения
         const formatCoord = num => Math.max(0, num).toFixed(1).padStart(8) + ' мм';
@@ -9,6 +9,9 @@ export class Scene3D {
         this.worldCenter = new THREE.Group();
         this.scene.add(this.worldCenter);
 
+        // Вызываются перед отрисовкой каждого кадра экрана со временем performance.now()
+        this.frameCallbacks = [];
+
         this.setupRenderer();
         this.setupCamera();
         this.setupLights();
@@ -257,8 +260,13 @@ export class Scene3D {
         return this.worldCenter;
     }
 
-    animate() {
-        requestAnimationFrame(() => this.animate());
+    onFrame(callback) {
+        this.frameCallbacks.push(callback);
+    }
+
+    animate(now = performance.now()) {
+        requestAnimationFrame(time => this.animate(time));
+        this.frameCallbacks.forEach(callback => callback(now));
         this.controls.update();
         this.renderer.render(this.scene, this.camera);
     }
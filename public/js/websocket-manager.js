@@ -1,12 +1,32 @@
+import { FrameDecoder } from './frame-codec.js';
+
+// Окно замеров часов: смещение берется по замеру с наименьшим временем ответа
+const CLOCK_SAMPLES = 8;
+
 export class WebSocketManager {
     constructor(url, options = {}) {
         this.url = url;
         this.options = {
             reconnectInterval: 1000,
             maxReconnectAttempts: 5,
+            encoding: 'binary', // 'binary', 'delta' или 'json'
+            streams: [],        // имена провайдеров; пусто - провайдер по умолчанию
+            worker: true,       // разбор кадров в Web Worker
+            clockSyncInterval: 5000,
             ...options
         };
 
+        this.keyframeRequested = new Set();
+        this.streams = new Map();
+        this.setupDecoder();
+
+        // Часы сервера относительно performance.now(), мс; до первого замера -
+        // по системным часам клиента
+        this.clock = { offset: Date.now() - performance.now(), rtt: null, samples: [] };
+        this.clockTimer = null;
+        // Время разбора кадров с последнего вызова takeDecodeStats()
+        this.decodeStats = { count: 0, totalMs: 0 };
+
         this.ws = null;
         this.reconnectAttempts = 0;
         this.listeners = new Map();
@@ -16,6 +36,133 @@ export class WebSocketManager {
         this.connect();
     }
 
+    setupDecoder() {
+        this.worker = null;
+        this.decoder = null;
+        if (this.options.worker && typeof Worker !== 'undefined') {
+            try {
+                // import.meta.resolve учитывает карту импорта: адрес воркера с версией
+                const url = import.meta.resolve
+                    ? import.meta.resolve('./frame-worker.js')
+                    : new URL('./frame-worker.js', import.meta.url);
+                this.worker = new Worker(url, { type: 'module' });
+                this.worker.onmessage = (message) => this.handleDecoded(message.data);
+                this.worker.onerror = (error) => {
+                    // Например, браузер без модульных воркеров - разбор в основном потоке
+                    console.error('Frame worker failed, decoding on the main thread:', error);
+                    this.worker.terminate();
+                    this.worker = null;
+                    this.decoder = new FrameDecoder();
+                };
+                return;
+            } catch (error) {
+                console.error('Frame worker unavailable:', error);
+            }
+        }
+        this.decoder = new FrameDecoder();
+    }
+
+    decode(data, received) {
+        if (this.worker) {
+            // Бинарный кадр передается воркеру без копирования
+            this.worker.postMessage({ data, received },
+                                    data instanceof ArrayBuffer ? [data] : []);
+            return;
+        }
+        const started = performance.now();
+        const result = this.decoder.decode(data);
+        if (result) {
+            this.handleDecoded({ ...result.event, received,
+                                 decodeMs: performance.now() - started });
+        }
+    }
+
+    resetDecoder() {
+        // Id потоков назначаются заново при каждом подключении
+        if (this.worker) {
+            this.worker.postMessage({ reset: true });
+        } else {
+            this.decoder.reset();
+        }
+    }
+
+    handleDecoded(event) {
+        switch (event.type) {
+            case 'frame':
+                this.keyframeRequested.delete(event.frame.stream);
+                this.decodeStats.count++;
+                this.decodeStats.totalMs += event.decodeMs;
+                event.frame.received = event.received;
+                this.emit('frame', event.frame);
+                break;
+            case 'keyframe_needed':
+                // Потеряно приращение или нет metadata - просим ключевой кадр
+                if (!this.keyframeRequested.has(event.stream)
+                        && this.send({ type: 'keyframe_request', stream_id: event.stream })) {
+                    this.keyframeRequested.add(event.stream);
+                }
+                break;
+            case 'metadata':
+                this.emit('metadata', event.data);
+                break;
+            case 'subscribed':
+                // Сопоставление id потока в кадрах с провайдером
+                this.streams = new Map(event.data.streams.map(
+                    stream => [stream.stream_id, stream]
+                ));
+                event.data.errors.forEach(error => console.warn('Subscription error:', error));
+                this.emit('subscribed', event.data);
+                break;
+            case 'clock':
+                this.handleClock(event.data, event.received);
+                break;
+            case 'imu':
+                this.emit('imu', event.frame);
+                break;
+            case 'decode_error':
+                console.error('Error parsing WebSocket message:', event.message);
+                this.emit('error', new Error(event.message));
+                break;
+            default:
+                this.emit('message', event.data);
+        }
+    }
+
+    syncClock() {
+        return this.send({ type: 'clock', client_time: performance.now() });
+    }
+
+    handleClock(data, received) {
+        // Сервер ответил между отправкой и получением: его время соответствует середине
+        const rtt = received - data.client_time;
+        const offset = data.server_time * 1000 - (data.client_time + received) / 2;
+        const samples = this.clock.samples;
+        samples.push({ rtt, offset });
+        if (samples.length > CLOCK_SAMPLES) {
+            samples.shift();
+        }
+        const best = samples.reduce((a, b) => (b.rtt < a.rtt ? b : a));
+        this.clock.offset = best.offset;
+        this.clock.rtt = best.rtt;
+    }
+
+    // Текущее время сервера, мс
+    serverNow(now = performance.now()) {
+        return now + this.clock.offset;
+    }
+
+    // Среднее время разбора кадра с прошлого вызова, мс
+    takeDecodeStats() {
+        const { count, totalMs } = this.decodeStats;
+        this.decodeStats = { count: 0, totalMs: 0 };
+        return count ? totalMs / count : null;
+    }
+
+    // Отчет о задержках отрисовки; сервер показывает его в /status и /metrics
+    reportLatency(report) {
+        return this.send({ type: 'latency_report', ...report });
+    }
+
     setupStatusIndicator() {
         this.connectionStatus.className = 'connection-status';
         this.connectionStatus.style.position = 'fixed';
@@ -48,17 +195,31 @@ export class WebSocketManager {
     connect() {
         try {
             this.updateConnectionStatus('connecting');
-            this.ws = new WebSocket(this.url);
+            const url = new URL(this.url);
+            url.searchParams.set('encoding', this.options.encoding);
+            if (this.options.streams.length) {
+                url.searchParams.set('streams', this.options.streams.join(','));
+            }
+            this.ws = new WebSocket(url.toString());
+            this.ws.binaryType = 'arraybuffer';
 
             this.ws.onopen = () => {
                 console.log('WebSocket connected');
                 this.reconnectAttempts = 0;
+                this.resetDecoder();
+                this.keyframeRequested.clear();
+                this.clock.samples = [];
+                this.syncClock();
+                clearInterval(this.clockTimer);
+                this.clockTimer = setInterval(() => this.syncClock(),
+                                              this.options.clockSyncInterval);
                 this.updateConnectionStatus('connected');
                 this.emit('connected');
             };
 
             this.ws.onclose = () => {
                 console.log('WebSocket disconnected');
+                clearInterval(this.clockTimer);
                 this.updateConnectionStatus('disconnected');
                 this.emit('disconnected');
                 this.tryReconnect();
@@ -72,8 +233,8 @@ export class WebSocketManager {
 
             this.ws.onmessage = (event) => {
                 try {
-                    const data = JSON.parse(event.data);
-                    this.emit('message', data);
+                    // Разбор - в воркере, здесь только время получения
+                    this.decode(event.data, performance.now());
                 } catch (error) {
                     console.error('Error parsing WebSocket message:', error);
                     this.emit('error', error);
@@ -87,6 +248,15 @@ export class WebSocketManager {
         }
     }
 
+    // streams: имена провайдеров или объекты { provider, rate, fields }
+    subscribe(streams) {
+        return this.send({ type: 'subscribe', streams });
+    }
+
+    unsubscribe(streams) {
+        return this.send({ type: 'unsubscribe', streams });
+    }
+
     tryReconnect() {
         if (this.reconnectAttempts < this.options.maxReconnectAttempts) {
             this.reconnectAttempts++;
@@ -127,9 +297,13 @@ export class WebSocketManager {
     }
 
     close() {
+        clearInterval(this.clockTimer);
         if (this.ws) {
             this.ws.close();
         }
+        if (this.worker) {
+            this.worker.terminate();
+        }
         this.connectionStatus.remove();
     }
 }
@@ -0,0 +1,416 @@
+''' Общий broadcast-хаб: один провайдер на имя, раздача кадров всем подписчикам '''
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from common.base_provider import DataProviderBase
+from common.frame_codec import (DeltaEncoder, Encoding, PoseFrame, encode_frame,
+                                encode_imu_binary)
+from common.metrics import get_metrics
+from server.client_connection import ClientConnection
+from server.config import RecordingSettings, get_config
+from server.recorder import FrameRecorder
+from server.subscription import FrameSampler, Subscription
+from server.provider_factory import ProviderFactory
+from server.logger import data_logger, data_sampler, server_logger
+
+_metrics = get_metrics()
+ENCODE_MS = _metrics.histogram(
+    "scv_encode_ms", "Frame encoding for one stream group, ms", ("provider", "encoding")
+)
+FRAMES_ENQUEUED = _metrics.counter(
+    "scv_frames_enqueued_total", "Frames queued to clients", ("provider",)
+)
+BYTES_ENQUEUED = _metrics.counter(
+    "scv_bytes_enqueued_total", "Encoded bytes queued to clients", ("provider",)
+)
+FRAMES_DROPPED = _metrics.counter(
+    "scv_frames_dropped_total", "Frames dropped by client queue overflow", ("provider",)
+)
+
+# Фабрика провайдеров канала: имя -> провайдер или None
+ProviderCreator = Callable[[str], Awaitable[Optional[DataProviderBase]]]
+
+
+class StreamGroup:
+    """
+    Подписчики канала с одинаковыми параметрами подписки (частота, прореживание,
+    набор полей, детализация). У группы своя нумерация кадров и свой кодировщик
+    delta: прореживание по частоте и выборка пластин не разрывают цепочку
+    приращений, а кадр готовится и кодируется один раз на группу.
+    """
+    def __init__(self, subscription: Subscription, stream_id: int, keyframe_interval: int):
+        self.subscription = subscription
+        self.rate = subscription.rate
+        self.fields = subscription.fields
+        self.sampler = FrameSampler(subscription)
+        self.stream_id = stream_id
+        self.members: Dict[str, ClientConnection] = {}
+        self.delta_encoder = DeltaEncoder(keyframe_interval, stream_id=stream_id)
+        self.seq = 0
+        self.frames_sent = 0
+        # Кадры, которые не удалось подготовить или закодировать для группы
+        self.errors = 0
+        self._last_slot: Optional[int] = None
+
+        provider = subscription.provider
+        self._encode_ms: Dict[str, Any] = {}
+        self._frames = FRAMES_ENQUEUED.labels(provider=provider)
+        self._bytes = BYTES_ENQUEUED.labels(provider=provider)
+        self._dropped = FRAMES_DROPPED.labels(provider=provider)
+
+    def _observe_encode(self, encoding: str, started: float) -> None:
+        histogram = self._encode_ms.get(encoding)
+        if histogram is None:
+            histogram = self._encode_ms[encoding] = ENCODE_MS.labels(
+                provider=self.subscription.provider, encoding=encoding
+            )
+        histogram.observe((time.perf_counter() - started) * 1000.0)
+
+    def due(self, timestamp: float) -> bool:
+        """Прореживание: не больше одного кадра на интервал 1/rate по времени сервера"""
+        if self.rate is None:
+            return True
+        slot = int(timestamp * self.rate)
+        if slot == self._last_slot:
+            return False
+        self._last_slot = slot
+        return True
+
+    def add(self, connection: ClientConnection) -> None:
+        """Добавляет подписчика; клиенту режима delta отправляется metadata и ключевой кадр"""
+        self.members[connection.client_id] = connection
+        if connection.encoding == Encoding.DELTA:
+            if self.delta_encoder.metadata:
+                connection.enqueue_control(self.delta_encoder.metadata)
+            self.delta_encoder.request_keyframe()
+
+    def offer(self, data: Any, timestamp: float) -> None:
+        """Кадр канала: учитывается в окне прореживания и отправляется, если пора"""
+        self.sampler.add(data)
+        if self.due(timestamp):
+            self.send(self.sampler.take(data), timestamp)
+
+    def send(self, data: Any, timestamp: float) -> None:
+        """Кодирует кадр один раз для каждого формата группы и раздает подписчикам"""
+        self.seq += 1
+        self.frames_sent += 1
+        payloads = {}
+        metadata = None
+        # Сырые показания IMU бинарные клиенты получают отдельным сообщением
+        imu_payload = None
+        if self.fields is None or "imu" in self.fields:
+            started = time.perf_counter()
+            imu_payload = encode_imu_binary(data, self.seq, timestamp, self.stream_id)
+            if imu_payload is not None:
+                self._observe_encode("imu", started)
+        frames = sent_bytes = dropped = 0
+        for connection in list(self.members.values()):
+            payload = payloads.get(connection.encoding)
+            if payload is None:
+                started = time.perf_counter()
+                if connection.encoding == Encoding.DELTA:
+                    metadata, payload = self.delta_encoder.encode(data, self.seq, timestamp)
+                else:
+                    payload = encode_frame(data, connection.encoding, self.seq, timestamp,
+                                           self.stream_id, self.fields)
+                self._observe_encode(connection.encoding.value, started)
+                payloads[connection.encoding] = payload
+            if metadata and connection.encoding == Encoding.DELTA:
+                connection.enqueue_control(metadata)
+            dropped += connection.enqueue(payload, self.stream_id)
+            frames += 1
+            sent_bytes += len(payload)
+            if imu_payload is not None and connection.encoding != Encoding.JSON:
+                dropped += connection.enqueue(imu_payload, self.stream_id)
+                frames += 1
+                sent_bytes += len(imu_payload)
+        self._frames.inc(frames)
+        self._bytes.inc(sent_bytes)
+        self._dropped.inc(dropped)
+
+
+class BroadcastChannel:
+    """
+    Канал одного провайдера: кадр генерируется один раз и раздается
+    группам подписчиков, каждая группа кодирует его один раз на формат
+    """
+    def __init__(self, name: str, provider: DataProviderBase, keyframe_interval: int = 100,
+                 recorder: Optional[FrameRecorder] = None, stream_id: int = 0):
+        self.name = name
+        self.provider = provider
+        self.stream_id = stream_id
+        self.keyframe_interval = keyframe_interval
+        self.recorder = recorder
+        self.subscribers: Dict[str, ClientConnection] = {}
+        self.groups: Dict[tuple, StreamGroup] = {}
+        self._membership: Dict[str, tuple] = {}
+        self.frames_broadcast = 0
+        self.seq = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запуск цикла провайдера в отдельной задаче"""
+        self._task = asyncio.create_task(self.provider.start(self._broadcast))
+        self._task.add_done_callback(self._on_task_done)
+
+    async def stop(self) -> None:
+        """Остановка провайдера и ожидание завершения задачи"""
+        await self.provider.stop()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self.recorder:
+            self.recorder.close()
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error:
+            server_logger.error(f"Provider {self.name} stopped with error: {error}")
+
+    async def _broadcast(self, data: Any) -> None:
+        """
+        Раздает кадр группам подписчиков, которым он положен по частоте.
+        Отправкой занимаются задачи записи клиентов, поэтому медленный
+        клиент не задерживает провайдер.
+        """
+        if not self.subscribers:
+            return
+        self.seq += 1
+        self.frames_broadcast += 1
+        timestamp = time.time()
+        if self.recorder:
+            self.recorder.record(data, timestamp)
+        # Покадровый журнал данных: сэмплер отсекает лишнее до построения записи
+        if data_sampler.allow():
+            frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+            data_logger.info("frame", extra={
+                "provider": self.name, "seq": self.seq, "timestamp": timestamp,
+                **frame.to_dict()
+            })
+
+        for group in list(self.groups.values()):
+            # Ошибка одной группы не останавливает раздачу остальным
+            try:
+                group.offer(data, timestamp)
+            except Exception as e:
+                group.errors += 1
+                if group.errors == 1:
+                    server_logger.error(
+                        "Error sending frame to stream group %d of %s: %s",
+                        group.stream_id, self.name, e, exc_info=True
+                    )
+
+    def add_subscriber(self, connection: ClientConnection,
+                       subscription: Optional[Subscription] = None) -> None:
+        """Добавляет подписчика или переводит его в группу с новыми параметрами"""
+        subscription = subscription or Subscription(self.name)
+        self.remove_subscriber(connection.client_id)
+        group = self.groups.get(subscription.key)
+        if group is None:
+            group = StreamGroup(subscription, self.stream_id, self.keyframe_interval)
+            self.groups[subscription.key] = group
+        group.add(connection)
+        self.subscribers[connection.client_id] = connection
+        self._membership[connection.client_id] = subscription.key
+
+    def remove_subscriber(self, client_id: str) -> None:
+        self.subscribers.pop(client_id, None)
+        key = self._membership.pop(client_id, None)
+        group = self.groups.get(key)
+        if group is not None:
+            group.members.pop(client_id, None)
+            if not group.members:
+                del self.groups[key]
+
+    def request_keyframe(self, client_id: Optional[str] = None) -> None:
+        """Ключевой кадр для группы клиента (или для всех групп канала)"""
+        if client_id is None:
+            groups = self.groups.values()
+        else:
+            group = self.groups.get(self._membership.get(client_id))
+            groups = [group] if group else []
+        for group in groups:
+            group.delta_encoder.request_keyframe()
+
+
+class BroadcastHub:
+    """
+    Реестр каналов с подсчетом ссылок: провайдер запускается с первым
+    подписчиком и останавливается после ухода последнего
+    """
+    def __init__(self, keyframe_interval: Optional[int] = None,
+                 recording: Optional[RecordingSettings] = None,
+                 provider_factory: Optional[ProviderCreator] = None):
+        self._channels: Dict[str, BroadcastChannel] = {}
+        # Откуда берутся провайдеры каналов (в воркере релея - из производителя)
+        self.provider_factory = provider_factory or ProviderFactory.create_provider
+        self._next_stream_id = 1
+        self._lock = asyncio.Lock()
+        # Без явных значений параметры берутся из текущей конфигурации
+        # при создании канала, так что перезагрузка конфигурации действует
+        # на следующие запущенные провайдеры
+        self._keyframe_interval = keyframe_interval
+        self._recording = recording
+
+    @property
+    def keyframe_interval(self) -> int:
+        if self._keyframe_interval is not None:
+            return self._keyframe_interval
+        return get_config().stream.keyframe_interval
+
+    @property
+    def recording(self) -> RecordingSettings:
+        return self._recording if self._recording is not None else get_config().recording
+
+    @recording.setter
+    def recording(self, recording: Optional[RecordingSettings]) -> None:
+        self._recording = recording
+
+    async def subscribe(self, provider_name: str, connection: ClientConnection,
+                        subscription: Optional[Subscription] = None) -> Optional[int]:
+        """
+        Подписывает клиента на канал провайдера; повторная подписка
+        меняет ее параметры
+
+        Args:
+            provider_name: Имя провайдера
+            connection: Исходящая очередь клиента
+            subscription: Частота и набор полей (по умолчанию - все кадры целиком)
+
+        Returns:
+            Id потока канала в заголовках кадров или None, если подписка не оформлена
+        """
+        async with self._lock:
+            channel = self._channels.get(provider_name)
+            if channel is None:
+                provider = await self.provider_factory(provider_name)
+                if not provider:
+                    return None
+                channel = BroadcastChannel(
+                    provider_name, provider, self.keyframe_interval,
+                    self._create_recorder(provider_name), self._allocate_stream_id()
+                )
+                self._channels[provider_name] = channel
+
+            channel.add_subscriber(connection, subscription)
+            if not channel.running:
+                channel.start()
+                server_logger.info(f"Started provider channel: {provider_name}")
+            return channel.stream_id
+
+    async def restart_channel(self, provider_name: str) -> bool:
+        """
+        Пересоздает провайдер запущенного канала (после изменения манифеста).
+        Подписчики остаются в канале и получают ключевой кадр нового провайдера
+
+        Returns:
+            True, если канал перезапущен
+        """
+        async with self._lock:
+            channel = self._channels.get(provider_name)
+            if channel is None:
+                return False
+            provider = await self.provider_factory(provider_name)
+            if not provider:
+                server_logger.error(
+                    f"Failed to restart channel {provider_name}, keeping previous provider"
+                )
+                return False
+            await channel.stop()
+            channel.provider = provider
+            # Набор пластин мог измениться: запись продолжается в новый файл
+            channel.recorder = self._create_recorder(provider_name)
+            channel.request_keyframe()
+            channel.start()
+            server_logger.info(f"Restarted provider channel: {provider_name}")
+            return True
+
+    def _allocate_stream_id(self) -> int:
+        """Свободный id потока (u16 в заголовке кадра, 0 не используется)"""
+        used = {channel.stream_id for channel in self._channels.values()}
+        while self._next_stream_id in used:
+            self._next_stream_id = self._next_stream_id % 0xFFFF + 1
+        stream_id = self._next_stream_id
+        self._next_stream_id = stream_id % 0xFFFF + 1
+        return stream_id
+
+    async def unsubscribe(self, provider_name: str, client_id: str) -> None:
+        """Отписывает клиента и останавливает провайдер, если подписчиков не осталось"""
+        async with self._lock:
+            channel = self._channels.get(provider_name)
+            if channel is None:
+                return
+            channel.remove_subscriber(client_id)
+            if not channel.subscribers:
+                del self._channels[provider_name]
+                await channel.stop()
+                server_logger.info(f"Stopped provider channel: {provider_name}")
+
+    def _create_recorder(self, provider_name: str) -> Optional[FrameRecorder]:
+        """Запись включается секцией "recording" конфигурации"""
+        recording = self.recording
+        if not recording.enabled or provider_name in recording.exclude:
+            return None
+        return FrameRecorder(recording.directory, provider_name)
+
+    def request_keyframe(self, provider_name: str, client_id: Optional[str] = None) -> None:
+        """Запрос ключевого кадра от клиента, потерявшего приращения"""
+        channel = self._channels.get(provider_name)
+        if channel:
+            channel.request_keyframe(client_id)
+
+    def provider(self, provider_name: str) -> Optional[DataProviderBase]:
+        """Экземпляр провайдера канала или None, если канала нет"""
+        channel = self._channels.get(provider_name)
+        return channel.provider if channel else None
+
+    def provider_for_stream(self, stream_id: int) -> Optional[str]:
+        """Имя провайдера по id потока из заголовка кадра"""
+        for name, channel in self._channels.items():
+            if channel.stream_id == stream_id:
+                return name
+        return None
+
+    def status(self) -> Dict[str, dict]:
+        """Состояние каналов для /status"""
+        return {
+            name: {
+                "stream_id": channel.stream_id,
+                "running": channel.running,
+                "subscribers": len(channel.subscribers),
+                "groups": [
+                    {
+                        **group.subscription.to_dict(),
+                        "subscribers": len(group.members),
+                        "frames_sent": group.frames_sent,
+                        "errors": group.errors
+                    } for group in channel.groups.values()
+                ],
+                "frames_broadcast": channel.frames_broadcast,
+                "scheduler": channel.provider.timing_stats(),
+                "recording": channel.recorder.status() if channel.recorder else None
+            } for name, channel in self._channels.items()
+        }
+
+
+# Глобальный экземпляр хаба
+_broadcast_hub: Optional[BroadcastHub] = None
+
+
+def get_broadcast_hub() -> BroadcastHub:
+    """Получает глобальный экземпляр broadcast-хаба"""
+    global _broadcast_hub
+    if _broadcast_hub is None:
+        _broadcast_hub = BroadcastHub()
+    return _broadcast_hub
@@ -0,0 +1,202 @@
+''' Исходящая очередь клиента с отдельной задачей записи в сокет '''
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, Tuple, Union
+
+from fastapi import WebSocket
+from common.frame_codec import Encoding
+from common.metrics import QUEUE_DEPTH_BUCKETS, get_metrics
+from server.config import StreamSettings
+from server.logger import server_logger
+
+_metrics = get_metrics()
+SEND_MS = _metrics.histogram(
+    "scv_send_ms", "Socket send of one message, ms", ("encoding",)
+)
+QUEUE_DEPTH = _metrics.histogram(
+    "scv_queue_depth", "Client queue depth after enqueue, frames", (), QUEUE_DEPTH_BUCKETS
+).labels()
+
+
+class OverflowPolicy(str, Enum):
+    """Поведение при переполнении очереди клиента"""
+    LATEST = "latest"            # оставить только самый новый кадр каждого потока
+    DROP_OLDEST = "drop_oldest"  # вытеснить самый старый кадр
+    DISCONNECT = "disconnect"    # отключить клиента после max_overflows переполнений подряд
+
+
+class ClientConnection:
+    """
+    Ограниченная очередь исходящих кадров клиента.
+    Провайдер только кладет кадры в очередь и никогда не ждет сокет,
+    отправкой занимается собственная задача записи клиента.
+    """
+    def __init__(
+        self,
+        client_id: str,
+        websocket: WebSocket,
+        stats: Dict[str, Any],
+        queue_size: int = 4,
+        overflow_policy: OverflowPolicy = OverflowPolicy.LATEST,
+        max_overflows: int = 100,
+        encoding: Encoding = Encoding.JSON
+    ):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.stats = stats
+        self.queue_size = max(1, queue_size)
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.max_overflows = max_overflows
+        self.encoding = Encoding(encoding)
+
+        # (время постановки в очередь, id потока, закодированный кадр)
+        self._queue: Deque[Tuple[float, int, Union[str, bytes]]] = deque()
+        # Служебные сообщения (metadata) не вытесняются и уходят раньше кадров
+        self._control: Deque[str] = deque()
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        # Ссылка на задачу отключения: иначе сборщик мусора может удалить ее до запуска
+        self._disconnect_task: Optional[asyncio.Task] = None
+        # Переполнения подряд, без успешной отправки между ними (политика disconnect)
+        self._consecutive_overflows = 0
+        self.closed = False
+        self._send_ms = SEND_MS.labels(encoding=self.encoding.value)
+
+        self.stats.update({
+            'bytes_sent': 0,
+            'messages_dropped': 0,
+            'overflows': 0,
+            'queue_depth': 0,
+            'lag_ms': 0.0,
+            'max_lag_ms': 0.0
+        })
+
+    @classmethod
+    def from_config(cls, client_id: str, websocket: WebSocket, stats: Dict[str, Any],
+                    config: StreamSettings,
+                    encoding: Encoding = Encoding.JSON) -> 'ClientConnection':
+        """Создает соединение с параметрами из секции "stream" конфигурации"""
+        return cls(
+            client_id,
+            websocket,
+            stats,
+            queue_size=config.queue_size,
+            overflow_policy=config.overflow_policy,
+            max_overflows=config.max_overflows,
+            encoding=encoding
+        )
+
+    def start(self) -> None:
+        """Запуск задачи записи"""
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        """Остановка задачи записи"""
+        self.closed = True
+        self._queue.clear()
+        self._control.clear()
+        self._ready.set()
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._writer = None
+
+    def enqueue(self, payload: Union[str, bytes], stream_id: int = 0) -> int:
+        """
+        Кладет кадр в очередь без ожидания, применяя политику переполнения
+
+        Returns:
+            Сколько кадров отброшено (вытесненные из очереди или сам кадр)
+        """
+        if self.closed:
+            return 1
+
+        dropped = 0
+        if len(self._queue) >= self.queue_size:
+            self.stats['overflows'] += 1
+            self._consecutive_overflows += 1
+            if self.overflow_policy == OverflowPolicy.LATEST:
+                # Устаревшие кадры этого потока вытесняются, кадры других потоков остаются
+                kept = deque(item for item in self._queue if item[1] != stream_id)
+                if len(kept) == len(self._queue):
+                    kept.popleft()
+                dropped = len(self._queue) - len(kept)
+                self.stats['messages_dropped'] += dropped
+                self._queue = kept
+            elif self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                self._queue.popleft()
+                dropped = 1
+                self.stats['messages_dropped'] += 1
+            else:
+                self.stats['messages_dropped'] += 1
+                # Отключается клиент, который перестал принимать кадры, а не тот,
+                # у кого переполнения изредка случались за всю сессию
+                if self._consecutive_overflows >= self.max_overflows:
+                    server_logger.warning(
+                        "Client %s exceeded %d consecutive queue overflows, disconnecting",
+                        self.client_id, self.max_overflows
+                    )
+                    self.closed = True
+                    self._queue.clear()
+                    self.stats['queue_depth'] = 0
+                    self._disconnect_task = asyncio.create_task(self._disconnect())
+                return 1
+
+        self._queue.append((time.monotonic(), stream_id, payload))
+        self.stats['queue_depth'] = len(self._queue)
+        QUEUE_DEPTH.observe(len(self._queue))
+        self._ready.set()
+        return dropped
+
+    def enqueue_control(self, message: str) -> None:
+        """Кладет служебное сообщение, которое не отбрасывается при переполнении"""
+        if self.closed:
+            return
+        self._control.append(message)
+        self._ready.set()
+
+    async def _disconnect(self) -> None:
+        try:
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def _write_loop(self) -> None:
+        try:
+            while not self.closed:
+                if self._control:
+                    await self.websocket.send_text(self._control.popleft())
+                    continue
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                enqueued_at, _, payload = self._queue.popleft()
+                self.stats['queue_depth'] = len(self._queue)
+                started = time.perf_counter()
+                if isinstance(payload, bytes):
+                    await self.websocket.send_bytes(payload)
+                else:
+                    await self.websocket.send_text(payload)
+                self._send_ms.observe((time.perf_counter() - started) * 1000.0)
+                self._consecutive_overflows = 0
+
+                lag_ms = (time.monotonic() - enqueued_at) * 1000.0
+                self.stats['messages_sent'] += 1
+                self.stats['bytes_sent'] += len(payload)
+                self.stats['lag_ms'] = lag_ms
+                if lag_ms > self.stats['max_lag_ms']:
+                    self.stats['max_lag_ms'] = lag_ms
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.closed = True
+            self._queue.clear()
+            self.stats['last_error'] = str(e)
+            server_logger.error("Error sending data to client %s: %s", self.client_id, e)
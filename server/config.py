@@ -0,0 +1,176 @@
+''' Загрузка конфигурации сервера '''
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from server.logger import server_logger
+
+CONFIG_PATH = Path("server/config.json")
+
+
+class _Section(BaseModel):
+    # Неизвестные ключи сохраняются: секции могут дополняться без правки моделей
+    model_config = ConfigDict(extra="allow")
+
+
+class ServerSettings(_Section):
+    host: str = "localhost"
+    port: int = Field(8000, ge=1, le=65535)
+    reload: bool = False
+    # Период проверки изменений конфигурации и манифестов, секунды (0 - не следить)
+    watch_interval: float = Field(1.0, ge=0)
+    # Процессов uvicorn; больше одного - только вместе с relay.enabled
+    workers: int = Field(1, ge=1)
+    # Бюджет времени запуска процесса до готовности, мс (0 - не проверять)
+    startup_budget_ms: float = Field(2000.0, ge=0)
+
+
+class StreamSettings(_Section):
+    queue_size: int = Field(4, ge=1)
+    overflow_policy: Literal["latest", "drop_oldest", "disconnect"] = "latest"
+    max_overflows: int = Field(100, ge=1)
+    keyframe_interval: int = Field(100, ge=1)
+
+
+class RecordingSettings(_Section):
+    enabled: bool = False
+    directory: str = "recordings"
+    exclude: List[str] = []
+
+
+class ProviderSettings(_Section):
+    default: Optional[str] = None
+    scan_path: str = "providers"
+    # Провайдеры, экземпляры которых создаются при старте, до первого клиента
+    prewarm: List[str] = []
+
+
+class LoggingSettings(_Section):
+    level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
+    # Журнал сервера в файл (помимо консоли)
+    file: Optional[str] = None
+    # Журнал данных (покадровая запись и data_logger)
+    data_file: Optional[str] = "data.log"
+    file_format: Literal["json", "text"] = "json"
+    max_bytes: int = Field(10 * 1024 * 1024, ge=0)
+    backup_count: int = Field(5, ge=0)
+    compress: bool = True
+    # Покадровая запись в журнал данных и ее предельная частота, записей в секунду
+    data_frames: bool = False
+    data_sample_rate: float = Field(10.0, ge=0)
+
+
+class MetricsSettings(_Section):
+    # Семплирующий профилировщик цикла событий при старте (переключается и через API)
+    profiler: bool = False
+    profiler_interval_ms: float = Field(5.0, gt=0)
+
+
+class RelaySettings(_Section):
+    # Провайдеры в отдельном процессе-производителе, воркеры получают кадры через релей
+    enabled: bool = False
+    # "unix" - производитель отдельным процессом, "local" - в процессе воркера
+    transport: Literal["unix", "local"] = "unix"
+    path: str = "/tmp/scv-relay.sock"
+    # Сообщений в очереди подписчика; при переполнении вытесняются старые
+    queue_size: int = Field(256, ge=1)
+    # Период обмена статусом между воркерами и производителем, секунды
+    status_interval: float = Field(1.0, gt=0)
+
+
+class Config(_Section):
+    """Типизированная конфигурация сервера (server/config.json)"""
+    server: ServerSettings = ServerSettings()
+    stream: StreamSettings = StreamSettings()
+    recording: RecordingSettings = RecordingSettings()
+    provider: ProviderSettings = ProviderSettings()
+    logging: LoggingSettings = LoggingSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    relay: RelaySettings = RelaySettings()
+
+
+def read_config(path: Path = CONFIG_PATH) -> Config:
+    """
+    Читает и проверяет файл конфигурации
+
+    Raises:
+        FileNotFoundError: если файл конфигурации отсутствует
+        ValueError: если файл не разбирается или не проходит проверку
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"Config file not found: {path}")
+    with open(path) as f:
+        try:
+            return Config.model_validate(json.load(f))
+        except (json.JSONDecodeError, ValidationError) as e:
+            raise ValueError(f"Invalid config {path}: {e}") from e
+
+
+class ConfigStore:
+    """
+    Конфигурация, загруженная один раз и закэшированная в памяти.
+    Подключения читают кэш, а не диск; файл перечитывается только при смене
+    mtime (reload_if_changed вызывается наблюдателем сервера). Если новая
+    версия файла не проходит проверку, остается действующая конфигурация.
+    """
+    def __init__(self, path: Path = CONFIG_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime = self._stat()
+        self._config = read_config(self.path)
+        self.reloads = 0
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def get(self) -> Config:
+        return self._config
+
+    def reload_if_changed(self) -> bool:
+        """
+        Перечитывает файл, если он изменился с последней загрузки
+
+        Returns:
+            True, если конфигурация обновлена
+        """
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                config = read_config(self.path)
+            except (OSError, ValueError) as e:
+                server_logger.error(f"Config reload failed, keeping previous config: {e}")
+                return False
+            self._config = config
+            self.reloads += 1
+        server_logger.info(f"Reloaded config from {self.path}")
+        return True
+
+
+# Глобальное хранилище конфигурации
+_config_store: Optional[ConfigStore] = None
+
+
+def get_config_store() -> ConfigStore:
+    """Получает глобальное хранилище конфигурации"""
+    global _config_store
+    if _config_store is None:
+        _config_store = ConfigStore()
+    return _config_store
+
+
+def get_config() -> Config:
+    """Текущая конфигурация сервера (из кэша)"""
+    return get_config_store().get()
+
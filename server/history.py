@@ -0,0 +1,234 @@
+''' HTTP API истории поз пластин по записанным сессиям '''
+import json
+import threading
+from collections import OrderedDict
+from enum import Enum
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from common.frame_log import FrameLogReader
+from server.config import get_config
+from server.logger import server_logger
+from server.recorder import LOG_EXTENSION
+
+router = APIRouter(prefix="/history", tags=["history"])
+
+# Каналы позы пластины в записи
+CHANNELS = ("x", "y", "z", "roll", "pitch", "yaw")
+
+# Сколько корзин агрегируется за один проход (ограничивает объем читаемых данных)
+BUCKETS_PER_BLOCK = 256
+
+# Сколько записей держится открытыми; давно не запрашиваемые закрываются
+MAX_OPEN_READERS = 16
+
+_readers: "OrderedDict[Path, FrameLogReader]" = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+class DownsampleMethod(str, Enum):
+    MEAN = "mean"        # среднее по корзине
+    MINMAX = "minmax"    # минимум и максимум по корзине
+    LTTB = "lttb"        # Largest-Triangle-Three-Buckets по выбранному каналу
+    RAW = "raw"          # без прореживания
+
+
+def _recordings_dir() -> Path:
+    return Path(get_config().recording.directory)
+
+
+def _open_reader(path: Path) -> FrameLogReader:
+    """Открытая запись из кеша (последние MAX_OPEN_READERS), при необходимости открывает"""
+    with _readers_lock:
+        reader = _readers.get(path)
+        if reader is not None:
+            _readers.move_to_end(path)
+            # Запись может еще дописываться
+            reader.refresh()
+            return reader
+        reader = FrameLogReader(path)
+        _readers[path] = reader
+        while len(_readers) > MAX_OPEN_READERS:
+            # Потоки ответов работают со своими представлениями записей,
+            # отображение освобождается, когда они завершатся
+            _, evicted = _readers.popitem(last=False)
+            evicted.close()
+        return reader
+
+
+def _get_reader(session: str) -> FrameLogReader:
+    """Открывает запись по имени сессии (имя файла без расширения)"""
+    path = _recordings_dir() / f"{session}{LOG_EXTENSION}"
+    # Имя сессии - только имя файла, без переходов по каталогам
+    if Path(session).name != session or not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Session not found: {session}")
+    return _open_reader(path)
+
+
+def _range_indices(reader: FrameLogReader, start: Optional[float],
+                   end: Optional[float]) -> Tuple[int, int]:
+    """Полуинтервал записей [lo, hi) для диапазона времени через индекс"""
+    first, last = reader.time_range()
+    start = first if start is None else start
+    end = last if end is None else end
+    if not len(reader) or end < start or end < first or start > last:
+        return 0, 0
+    lo = reader.index_at(start)
+    if reader.timestamps[lo] < start:
+        lo += 1
+    hi = reader.index_at(end) + 1
+    return lo, max(lo, hi)
+
+
+def _bucket_edges(lo: int, hi: int, points: int) -> np.ndarray:
+    buckets = max(1, min(points, hi - lo))
+    return np.linspace(lo, hi, buckets + 1).astype(np.int64)
+
+
+def _aggregate(records: np.ndarray, plate: int, lo: int, hi: int, points: int,
+               method: DownsampleMethod) -> Iterator[dict]:
+    """Агрегаты по корзинам блоками, чтобы не держать весь диапазон в памяти"""
+    edges = _bucket_edges(lo, hi, points)
+    for b0 in range(0, len(edges) - 1, BUCKETS_PER_BLOCK):
+        block_edges = edges[b0:b0 + BUCKETS_PER_BLOCK + 1]
+        first, last = int(block_edges[0]), int(block_edges[-1])
+        block = records[first:last]
+        times = block['timestamp']
+        values = block['poses'][:, plate, :].astype(np.float64)
+        starts = block_edges[:-1] - first
+        counts = np.diff(block_edges)
+
+        result = {"t": (np.add.reduceat(times, starts) / counts).tolist()}
+        if method == DownsampleMethod.MINMAX:
+            result["min"] = np.minimum.reduceat(values, starts).tolist()
+            result["max"] = np.maximum.reduceat(values, starts).tolist()
+        else:
+            result["values"] = (np.add.reduceat(values, starts) / counts[:, None]).tolist()
+        yield result
+
+
+def _lttb_indices(times: np.ndarray, values: np.ndarray, points: int) -> np.ndarray:
+    """Индексы точек, отобранных алгоритмом Largest-Triangle-Three-Buckets"""
+    count = len(values)
+    if points >= count or points < 3:
+        return np.arange(count)
+
+    bucket_size = (count - 2) / (points - 2)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for i in range(points - 2):
+        b0 = int(i * bucket_size) + 1
+        b1 = int((i + 1) * bucket_size) + 1
+        # Третья вершина треугольника - среднее следующей корзины (или последняя точка)
+        if i == points - 3:
+            avg_t, avg_v = times[count - 1], values[count - 1]
+        else:
+            n1 = min(int((i + 2) * bucket_size) + 1, count)
+            avg_t, avg_v = times[b1:n1].mean(), values[b1:n1].mean()
+        t, v = times[b0:b1], values[b0:b1]
+        area = np.abs((times[previous] - avg_t) * (v - values[previous])
+                      - (times[previous] - t) * (avg_v - values[previous]))
+        previous = b0 + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def _select(records: np.ndarray, plate: int, lo: int, hi: int, points: int,
+            method: DownsampleMethod, channel: int, chunk_size: int) -> Iterator[dict]:
+    """Отобранные исходные точки (raw и lttb), порциями по chunk_size"""
+    if method == DownsampleMethod.LTTB:
+        times = records['timestamp'][lo:hi]
+        values = records['poses'][lo:hi, plate, channel]
+        indices = lo + _lttb_indices(times, values, points)
+    else:
+        indices = np.arange(lo, hi)
+
+    for c0 in range(0, len(indices), chunk_size):
+        chunk = records[indices[c0:c0 + chunk_size]]
+        yield {
+            "t": chunk['timestamp'].tolist(),
+            "values": chunk['poses'][:, plate, :].astype(np.float64).tolist()
+        }
+
+
+def _plate_index(reader: FrameLogReader, plate_id: int) -> int:
+    matches = np.flatnonzero(reader.plate_ids == plate_id)
+    if not len(matches):
+        raise HTTPException(status_code=404, detail=f"Plate not found: {plate_id}")
+    return int(matches[0])
+
+
+@router.get("/sessions")
+def list_sessions() -> List[dict]:
+    '''Список записанных сессий (чтение файлов - в пуле потоков)'''
+    sessions = []
+    for path in sorted(_recordings_dir().glob(f"*{LOG_EXTENSION}")):
+        try:
+            reader = _open_reader(path)
+        except Exception as e:
+            server_logger.error(f"Error opening recording {path}: {e}")
+            continue
+        start, end = reader.time_range()
+        sessions.append({
+            "session": path.stem,
+            "plate_ids": reader.plate_ids.tolist(),
+            "frames": len(reader),
+            "start": start,
+            "end": end
+        })
+    return sessions
+
+
+@router.get("/sessions/{session}/plates/{plate_id}")
+def get_plate_history(
+    session: str,
+    plate_id: int,
+    start: Optional[float] = Query(None, description="Начало диапазона, секунды"),
+    end: Optional[float] = Query(None, description="Конец диапазона, секунды"),
+    points: int = Query(1000, ge=1, le=100000, description="Желаемое число точек"),
+    method: DownsampleMethod = DownsampleMethod.MINMAX,
+    channel: str = Query("y", description="Канал для LTTB"),
+    chunk_size: int = Query(1000, ge=1, le=100000)
+):
+    '''
+    История позы пластины за диапазон времени, прореженная на сервере.
+    Ответ - NDJSON: первая строка описывает запрос, далее порции точек.
+    '''
+    if channel not in CHANNELS:
+        raise HTTPException(status_code=400, detail=f"Unknown channel: {channel}")
+    reader = _get_reader(session)
+    plate = _plate_index(reader, plate_id)
+    lo, hi = _range_indices(reader, start, end)
+    # Ответ читает свое представление записей: оно не меняется при refresh()
+    # и остается доступным, если запись вытеснена из кеша
+    records = reader.records
+
+    # Если точек в диапазоне меньше запрошенного, прореживать нечего
+    effective = method if hi - lo > points else DownsampleMethod.RAW
+
+    def generate() -> Iterator[bytes]:
+        header = {
+            "session": session,
+            "plate_id": plate_id,
+            "channels": CHANNELS,
+            "method": effective.value,
+            "frames_in_range": hi - lo
+        }
+        yield (json.dumps(header) + "\n").encode()
+        if hi <= lo:
+            return
+        if effective in (DownsampleMethod.MEAN, DownsampleMethod.MINMAX):
+            chunks = _aggregate(records, plate, lo, hi, points, effective)
+        else:
+            chunks = _select(records, plate, lo, hi, points, effective,
+                             CHANNELS.index(channel), chunk_size)
+        for chunk in chunks:
+            yield (json.dumps(chunk, separators=(",", ":")) + "\n").encode()
+
+    # Синхронный генератор выполняется в пуле потоков и не блокирует цикл событий
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,208 @@
+''' Прием отсчетов от шлюзов реальных цепочек датчиков (WebSocket и UDP) '''
+import asyncio
+import struct
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, WebSocket
+
+from common.ingest import (DEFAULT_PLATE_COUNT, DEFAULT_RING_CAPACITY, IngestSource,
+                           decode_ingest_packet, get_ingest_hub)
+from common.metrics import get_metrics
+from common.provider_manager import get_provider_manager
+from common.relay import Relay
+from server.config import get_config
+from server.logger import server_logger
+
+# Пакеты шлюзов разбираются прямо в цикле событий и только копируются в кольцо
+# источника: прием никогда не ждет провайдер или рассылку клиентам. Если провайдер
+# не успевает, кольцо затирает старые отсчеты, а потери видны в /ingest/status.
+
+router = APIRouter(prefix="/ingest", tags=["ingest"])
+
+# В режиме релея провайдеры работают в производителе: воркер проверяет пакеты
+# и пересылает их туда вместе со временем приема
+RECEIVED_HEADER = struct.Struct('<d')
+_forward_relay: Optional[Relay] = None
+
+_metrics = get_metrics()
+INGEST_PACKETS = _metrics.counter(
+    "scv_ingest_packets_total", "Gateway packets accepted", ("source",)
+)
+INGEST_SAMPLES = _metrics.counter(
+    "scv_ingest_samples_total", "Sensor samples written to the ingest ring", ("source",)
+)
+INGEST_MALFORMED = _metrics.counter(
+    "scv_ingest_malformed_total", "Gateway packets rejected as malformed", ("source",)
+)
+INGEST_REJECTED = _metrics.counter(
+    "scv_ingest_rejected_samples_total", "Samples with plate_id outside the plate count",
+    ("source",)
+)
+INGEST_LOST = _metrics.counter(
+    "scv_ingest_lost_samples_total", "Samples missing from per-sensor sequences", ("source",)
+)
+INGEST_STALE = _metrics.counter(
+    "scv_ingest_stale_samples_total", "Duplicate or out-of-order samples dropped", ("source",)
+)
+
+
+def collect_ingest_metrics() -> None:
+    '''Счетчики ведут источники, здесь они только копируются'''
+    for name, source in get_ingest_hub().sources().items():
+        INGEST_PACKETS.labels(source=name).value = source.packets
+        INGEST_SAMPLES.labels(source=name).value = source.samples
+        INGEST_MALFORMED.labels(source=name).value = source.malformed
+        INGEST_REJECTED.labels(source=name).value = source.rejected
+        INGEST_LOST.labels(source=name).value = sum(
+            tracker.lost for tracker in source.sequences.values()
+        )
+        INGEST_STALE.labels(source=name).value = sum(
+            tracker.stale for tracker in source.sequences.values()
+        )
+
+
+_metrics.add_collector(collect_ingest_metrics)
+
+
+def is_ingest_provider(manifest: Optional[dict]) -> bool:
+    '''Провайдер режима source с секцией "ingest" в манифесте'''
+    return bool(manifest) and manifest.get('data_rate', {}).get('mode') == 'source' \
+        and 'ingest' in manifest
+
+
+def ingest_source(provider: str) -> Optional[IngestSource]:
+    '''Источник провайдера приема или None, если провайдер не принимает данные шлюзов'''
+    manifest = get_provider_manager().get_manifest(provider)
+    if not is_ingest_provider(manifest):
+        return None
+    ingest_config = manifest['ingest']
+    return get_ingest_hub().source(
+        provider,
+        ingest_config.get('ring_capacity', DEFAULT_RING_CAPACITY),
+        ingest_config.get('plate_count', DEFAULT_PLATE_COUNT)
+    )
+
+
+def ingest_topic(provider: str) -> str:
+    return f"ingest/{provider}"
+
+
+def forward_ingest_to(relay: Optional[Relay]) -> None:
+    '''Включает (relay) или выключает (None) пересылку пакетов производителю'''
+    global _forward_relay
+    _forward_relay = relay
+
+
+async def _consume(relay: Relay, provider: str) -> None:
+    source = ingest_source(provider)
+    subscription = await relay.subscribe(ingest_topic(provider))
+    try:
+        while True:
+            _, payload = await subscription.get()
+            received, = RECEIVED_HEADER.unpack_from(payload)
+            try:
+                source.ingest(payload[RECEIVED_HEADER.size:], received)
+            except ValueError:
+                pass
+    finally:
+        subscription.close()
+
+
+async def consume_relay_ingest(relay: Relay) -> None:
+    '''Производитель: пакеты, пересланные воркерами, попадают в источники приема'''
+    providers = [name for name, manifest in get_provider_manager().list_providers().items()
+                 if is_ingest_provider(manifest)]
+    await asyncio.gather(*(_consume(relay, name) for name in providers))
+
+
+@router.websocket("/{provider}")
+async def ingest_endpoint(websocket: WebSocket, provider: str):
+    '''Шлюз присылает бинарные пакеты отсчетов; текстовые сообщения игнорируются'''
+    if not is_ingest_provider(get_provider_manager().get_manifest(provider)):
+        server_logger.warning(f"Ingest connection for unknown source: {provider}")
+        await websocket.close(code=1008)
+        return
+    relay = _forward_relay
+    source = ingest_source(provider) if relay is None else None
+    await websocket.accept()
+    gateway = f"{websocket.client.host}:{websocket.client.port}" if websocket.client else "?"
+    server_logger.info(f"Ingest gateway {gateway} connected to {provider}")
+
+    packets = malformed = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            packet = message.get("bytes")
+            if packet is None:
+                continue
+            try:
+                if relay is None:
+                    source.ingest(packet, time.time())
+                else:
+                    decode_ingest_packet(packet)
+                    await relay.publish(ingest_topic(provider),
+                                        RECEIVED_HEADER.pack(time.time()) + packet)
+                packets += 1
+            except ValueError as e:
+                # Поврежденные пакеты считаются источником; в журнал - только первый
+                malformed += 1
+                if malformed == 1:
+                    server_logger.warning("Malformed ingest packet from %s: %s", gateway, e)
+    except Exception as e:
+        server_logger.error(f"Error in ingest connection {gateway}: {e}", exc_info=True)
+    finally:
+        server_logger.info(
+            f"Ingest gateway {gateway} disconnected from {provider}. "
+            f"Packets: {packets}, malformed: {malformed}"
+        )
+
+
+@router.get("/status")
+async def get_ingest_status():
+    '''
+    Статистика источников: пакеты, потери по номерам отсчетов, смещения часов шлюзов.
+    В режиме релея источники работают в производителе - см. "ingest" в /status
+    '''
+    return get_ingest_hub().status()
+
+
+class IngestDatagramProtocol(asyncio.DatagramProtocol):
+    '''Прием по UDP: одна датаграмма - один пакет шлюза'''
+    def __init__(self, source: IngestSource):
+        self.source = source
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            self.source.ingest(data, time.time())
+        except ValueError:
+            pass
+
+    def error_received(self, exc: Exception) -> None:
+        server_logger.warning("Ingest UDP error for %s: %s", self.source.name, exc)
+
+
+async def start_udp_listeners() -> List[asyncio.DatagramTransport]:
+    '''Слушатели UDP для манифестов с ingest.udp_port'''
+    loop = asyncio.get_running_loop()
+    host = get_config().server.host
+    transports = []
+    for name, manifest in get_provider_manager().list_providers().items():
+        port = manifest.get('ingest', {}).get('udp_port')
+        if not port:
+            continue
+        source = ingest_source(name)
+        if source is None:
+            continue
+        try:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda source=source: IngestDatagramProtocol(source), local_addr=(host, port)
+            )
+        except OSError as e:
+            server_logger.error(f"Failed to listen for ingest on UDP {host}:{port}: {e}")
+            continue
+        server_logger.info(f"Ingest for {name} listening on UDP {host}:{port}")
+        transports.append(transport)
+    return transports
@@ -1,16 +1,352 @@
 # src/logger.py
+import atexit
+import gzip
+import json
 import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Dict, Hashable, List, Optional
+
+if TYPE_CHECKING:
+    from server.config import LoggingSettings
+
+# Записи журнала не пишутся в вызывающем потоке: логгеры кладут их в очередь,
+# а фоновый поток пачками форматирует и выводит их (консоль, файлы JSON lines
+# с ротацией и сжатием). Цикл событий не ждет диск.
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Записей в очереди; при переполнении новые записи отбрасываются, а не ждут
+QUEUE_SIZE = 10000
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.5
+
+# Метка остановки потока записи в очереди
+_STOP = object()
+
+# Атрибуты LogRecord, которые не относятся к полям extra
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Аргументы сообщения, которые не меняются до записи: подставляются в потоке записи
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Одна запись - один JSON-объект в строке; поля extra попадают в объект"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+
+class RotatingLogFile:
+    """
+    Файл журнала с ротацией по размеру: path -> path.1 -> ... -> path.N.
+    Вытесненные части сжимаются gzip (path.1.gz); работает в потоке записи.
+    Размер считается в байтах UTF-8, как на диске
+    """
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, compress: bool = True):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: IO[bytes] = open(self.path, 'ab')
+        self._size = self._file.tell()
+
+    def _backup(self, index: int) -> Path:
+        suffix = f".{index}.gz" if self.compress else f".{index}"
+        return self.path.with_name(self.path.name + suffix)
+
+    def write(self, text: str) -> None:
+        data = text.encode('utf-8')
+        if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                if self._backup(index).exists():
+                    os.replace(self._backup(index), self._backup(index + 1))
+            if self.compress:
+                with open(self.path, 'rb') as source, gzip.open(self._backup(1), 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self._backup(1))
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'ab')
+        self._size = 0
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _Sink:
+    """
+    Куда и в каком формате пишутся записи одного логгера. Вывод с тем же
+    ключом (путь и параметры файла) переиспользуется при перенастройке
+    """
+    def __init__(self, output, formatter: logging.Formatter, key: Optional[Hashable] = None):
+        self.output = output
+        self.formatter = formatter
+        self.key = key
+
+    def close(self) -> None:
+        if isinstance(self.output, RotatingLogFile):
+            self.output.close()
+
+
+class _Enqueue(QueueHandler):
+    """Кладет запись в очередь конвейера, никогда не блокируясь"""
+    def __init__(self, pipeline: 'LogPipeline'):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # В вызывающем потоке подставляются только аргументы-объекты (они могут
+        # измениться до записи); строки и числа подставляет поток записи
+        args = record.args
+        if args and not (isinstance(args, tuple)
+                         and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.dropped += 1
+
+
+class LogPipeline:
+    """
+    Очередь записей и фоновый поток записи. Поток забирает записи пачками
+    до BATCH_SIZE, пишет их одним вызовом на вывод и сбрасывает буферы
+    файлов, когда очередь опустела или прошло FLUSH_INTERVAL секунд
+    """
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.handler = _Enqueue(self)
+        self.dropped = 0
+        self._sinks: Dict[str, List[_Sink]] = {}
+        # Выводы, которые больше не используются; закрывает поток записи
+        self._retired: List[_Sink] = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def set_sinks(self, logger_name: str, sinks: List[_Sink]) -> None:
+        """Заменяет выводы логгера; старые файлы закрываются потоком записи"""
+        with self._lock:
+            old = self._sinks.get(logger_name, [])
+            self._sinks[logger_name] = sinks
+            used = {id(sink) for sinks in self._sinks.values() for sink in sinks}
+            self._retired.extend(sink for sink in old if id(sink) not in used)
+            if not self._thread.is_alive():
+                self._close_retired()
+
+    def find_sink(self, key: Hashable) -> Optional[_Sink]:
+        """Текущий вывод с таким ключом (для переиспользования открытого файла)"""
+        with self._lock:
+            for sinks in self._sinks.values():
+                for sink in sinks:
+                    if sink.key == key:
+                        return sink
+        return None
+
+    def _close_retired(self) -> None:
+        for sink in self._retired:
+            try:
+                sink.close()
+            except Exception as e:
+                sys.stderr.write(f"Log close failed: {e}\n")
+        self._retired = []
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        while True:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=FLUSH_INTERVAL))
+            except queue.Empty:
+                pass
+            while batch and len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            with self._lock:
+                self._write([item for item in batch if item is not _STOP])
+                now = time.monotonic()
+                if stop or self.queue.empty() or now - last_flush >= FLUSH_INTERVAL:
+                    self._flush()
+                    last_flush = now
+                self._close_retired()
+            if stop:
+                return
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        lines: Dict[int, List[str]] = {}
+        outputs = {}
+        for record in records:
+            for sink in self._sinks.get(record.name.split('.', 1)[0], ()):
+                try:
+                    text = sink.formatter.format(record)
+                except Exception:
+                    continue
+                lines.setdefault(id(sink), []).append(text)
+                outputs[id(sink)] = sink
+        for key, text in lines.items():
+            try:
+                outputs[key].output.write("\n".join(text) + "\n")
+            except Exception as e:
+                sys.stderr.write(f"Log write failed: {e}\n")
+
+    def _flush(self) -> None:
+        for sinks in self._sinks.values():
+            for sink in sinks:
+                try:
+                    sink.output.flush()
+                except Exception:
+                    pass
+
+    def stop(self) -> None:
+        """Записывает накопленное и останавливает поток"""
+        if not self._thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout=5)
+        with self._lock:
+            self._close_retired()
+            for sinks in self._sinks.values():
+                for sink in sinks:
+                    sink.close()
+
+
+class RateLimitedSampler:
+    """
+    Ограничение частоты записей (token bucket): не больше rate записей в секунду
+    с запасом burst. Проверка allow() дешевле форматирования сообщения, поэтому
+    ее вызывают до построения записи:
+
+        if data_sampler.allow():
+            data_logger.info("frame", extra={...})
+    """
+    def __init__(self, rate: float = 10.0, burst: Optional[float] = None,
+                 enabled: bool = False):
+        self.enabled = enabled
+        self.configure(rate, burst)
+        self.dropped = 0
+
+    def configure(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = max(0.0, rate)
+        self.burst = max(1.0, burst if burst is not None else self.rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def allow(self) -> bool:
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1.0:
+            self.dropped += 1
+            return False
+        self._tokens -= 1.0
+        return True
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Совместимость с logging.Filter"""
+        return self.allow()
+
+
+_pipeline = LogPipeline()
+atexit.register(_pipeline.stop)
+_pipeline.set_sinks('server', [_Sink(sys.stderr, logging.Formatter(TEXT_FORMAT), 'console')])
 
 # Настройка логгера для сервера
 server_logger = logging.getLogger('server')
 server_logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-server_logger.addHandler(handler)
+server_logger.addHandler(_pipeline.handler)
 
-# Настройка логгера для данных
+# Настройка логгера для данных: вывод подключается configure_logging()
 data_logger = logging.getLogger('data')
 data_logger.setLevel(logging.INFO)
-data_handler = logging.FileHandler('data.log')
-data_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
-data_logger.addHandler(data_handler)
+data_logger.addHandler(_pipeline.handler)
+data_logger.propagate = False
+
+# Покадровая запись данных, выключена по умолчанию
+data_sampler = RateLimitedSampler()
+
+
+def _console_sink() -> _Sink:
+    return _pipeline.find_sink('console') \
+        or _Sink(sys.stderr, logging.Formatter(TEXT_FORMAT), 'console')
+
+
+def _file_sink(path: str, settings: 'LoggingSettings') -> _Sink:
+    """Вывод в файл; открытый файл с теми же параметрами переиспользуется"""
+    key = (os.path.abspath(path), settings.file_format, settings.max_bytes,
+           settings.backup_count, settings.compress)
+    sink = _pipeline.find_sink(key)
+    if sink is not None:
+        return sink
+    formatter = JsonLinesFormatter() if settings.file_format == 'json' \
+        else logging.Formatter(TEXT_FORMAT)
+    output = RotatingLogFile(path, settings.max_bytes, settings.backup_count, settings.compress)
+    return _Sink(output, formatter, key)
+
+
+def configure_logging(settings: 'LoggingSettings') -> None:
+    """
+    Применяет секцию "logging" конфигурации; вызывается при старте и перезагрузке.
+    Файлы, параметры которых не изменились, остаются открытыми
+    """
+    server_logger.setLevel(settings.level.upper())
+    server_sinks = [_console_sink()]
+    if settings.file:
+        server_sinks.append(_file_sink(settings.file, settings))
+    _pipeline.set_sinks('server', server_sinks)
+    _pipeline.set_sinks('data', [_file_sink(settings.data_file, settings)]
+                        if settings.data_file else [])
+
+    data_sampler.enabled = settings.data_frames
+    data_sampler.configure(settings.data_sample_rate)
+
+
+def logging_stats() -> Dict[str, int]:
+    return {
+        "queued": _pipeline.queue.qsize(),
+        "dropped": _pipeline.dropped,
+        "data_sampled_out": data_sampler.dropped
+    }
@@ -0,0 +1,129 @@
+''' Семплирующий профилировщик цикла событий '''
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Глубина стека, которая сохраняется в выборке
+MAX_STACK_DEPTH = 64
+# Пределы интервала выборки, секунды: чаще поток профилировщика отнимает GIL
+# у цикла событий, реже выборок слишком мало для профиля
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 1.0
+
+
+def clamp_interval(interval: float) -> float:
+    """Интервал выборки в пределах [MIN_INTERVAL, MAX_INTERVAL]"""
+    if not math.isfinite(interval) or interval <= 0:
+        raise ValueError(f"Profiler interval must be positive, got {interval}")
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+
+
+class SamplingProfiler:
+    """
+    Фоновый поток раз в interval секунд снимает стек наблюдаемого потока
+    (по умолчанию - потока, вызвавшего start(), то есть цикла событий сервера)
+    и считает одинаковые стеки. Код сервера не инструментируется, поэтому
+    выключенный профилировщик ничего не стоит, а включенный - одно чтение
+    стека за интервал.
+
+    Результат - свернутые стеки ("func;func;func count"), формат flamegraph.pl
+    и speedscope.
+    """
+    def __init__(self, interval: float = 0.005):
+        self.interval = clamp_interval(interval)
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, thread_id: Optional[int] = None, interval: Optional[float] = None) -> None:
+        """
+        Начинает новую сессию профилирования. У запущенного профилировщика
+        меняется только интервал (со следующей выборки), собранное сохраняется
+        """
+        if interval is not None:
+            self.interval = clamp_interval(interval)
+        if self.running:
+            return
+        self._target = thread_id if thread_id is not None else threading.get_ident()
+        self.samples.clear()
+        self.sample_count = 0
+        self.started_at = time.monotonic()
+        self.duration = 0.0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler",
+                                         daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.monotonic() - self.started_at
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            self.samples[self._stack(frame)] += 1
+            self.sample_count += 1
+
+    @staticmethod
+    def _stack(frame) -> Tuple[str, ...]:
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def collapsed(self) -> str:
+        """Свернутые стеки, от самых частых"""
+        return "".join(f"{';'.join(stack)} {count}\n"
+                       for stack, count in self.samples.most_common())
+
+    def top(self, limit: int = 20) -> List[Dict[str, object]]:
+        """Функции, на которых чаще всего останавливалась выборка (собственное время)"""
+        leaves: Counter = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack[-1]] += count
+        total = self.sample_count or 1
+        return [{"function": name, "samples": count, "share": round(count / total, 4)}
+                for name, count in leaves.most_common(limit)]
+
+    def status(self) -> Dict[str, object]:
+        duration = self.duration
+        if self.running:
+            duration = time.monotonic() - self.started_at
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000.0,
+            "samples": self.sample_count,
+            "duration_s": round(duration, 3),
+            "top": self.top()
+        }
+
+
+# Глобальный профилировщик сервера
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """Получает глобальный профилировщик"""
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
@@ -1,8 +1,7 @@
-import json
-from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional
 from common.base_provider import DataProviderBase
 from common.provider_manager import get_provider_manager
+from server.config import get_config
 from server.logger import server_logger
 
 
@@ -39,26 +38,49 @@ class ProviderFactory:
             return None
 
     @staticmethod
-    async def create_from_config() -> Optional[DataProviderBase]:
+    def prewarm(provider_names: Iterable[str]) -> List[str]:
         """
-        Создает провайдер на основе конфигурации сервера
-        
+        Заранее создает экземпляры провайдеров (секция provider.prewarm конфигурации)
+
         Returns:
-            Инициализированный провайдер или None в случае ошибки
+            Имена подготовленных провайдеров
         """
-        try:
-            # Загружаем конфигурацию
-            config_path = Path("server/config.json")
-            if not config_path.exists():
-                server_logger.error("Config file not found")
-                return None
+        manager = get_provider_manager()
+        ready = []
+        for provider_name in provider_names:
+            try:
+                if manager.prewarm(provider_name):
+                    ready.append(provider_name)
+                else:
+                    server_logger.error(f"Failed to prewarm provider: {provider_name}")
+            except Exception as e:
+                server_logger.error(f"Error prewarming provider {provider_name}: {e}")
+        return ready
 
-            with open(config_path) as f:
-                config = json.load(f)
+    @staticmethod
+    def get_default_provider_name() -> Optional[str]:
+        """
+        Читает имя провайдера по умолчанию из конфигурации сервера
 
-            provider_name = config["provider"]["default"]
-            return await ProviderFactory.create_provider(provider_name)
+        Returns:
+            Имя провайдера или None в случае ошибки
+        """
+        try:
+            return get_config().provider.default
 
         except Exception as e:
-            server_logger.error(f"Error creating provider from config: {e}")
-            return None
\ No newline at end of file
+            server_logger.error(f"Error reading provider from config: {e}")
+            return None
+
+    @staticmethod
+    async def create_from_config() -> Optional[DataProviderBase]:
+        """
+        Создает провайдер на основе конфигурации сервера
+        
+        Returns:
+            Инициализированный провайдер или None в случае ошибки
+        """
+        provider_name = ProviderFactory.get_default_provider_name()
+        if not provider_name:
+            return None
+        return await ProviderFactory.create_provider(provider_name)
\ No newline at end of file
@@ -0,0 +1,60 @@
+''' Запись транслируемых кадров в бинарный журнал (.scvlog) '''
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from common.frame_codec import FrameData, PoseFrame
+from common.frame_log import FrameLogWriter
+from server.logger import server_logger
+
+LOG_EXTENSION = '.scvlog'
+
+
+class FrameRecorder:
+    """
+    Дописывает каждый кадр канала в файл записи. При изменении состава
+    пластин начинается новый файл, так как размер записи фиксирован.
+    """
+    def __init__(self, directory: str, provider_name: str, flush_interval: float = 1.0):
+        self.directory = Path(directory)
+        self.provider_name = provider_name
+        self.flush_interval = flush_interval
+        self.writer: Optional[FrameLogWriter] = None
+        self.frames_recorded = 0
+        self._last_flush = time.monotonic()
+
+    def _open(self, frame: PoseFrame) -> FrameLogWriter:
+        if self.writer:
+            self.writer.close()
+        name = f"{self.provider_name}_{datetime.now():%Y%m%d_%H%M%S_%f}{LOG_EXTENSION}"
+        path = self.directory / name
+        server_logger.info(f"Recording {self.provider_name} to {path}")
+        return FrameLogWriter(path, frame.plate_ids, frame.dimensions)
+
+    def record(self, data: FrameData, timestamp: float) -> None:
+        """Дописывает кадр; ошибки записи не прерывают трансляцию"""
+        try:
+            frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+            if self.writer is None or not self.writer.matches(frame):
+                self.writer = self._open(frame)
+            self.writer.append(frame, timestamp)
+            self.frames_recorded += 1
+
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self.writer.flush()
+                self._last_flush = now
+        except Exception as e:
+            server_logger.error("Error recording frame for %s: %s", self.provider_name, e)
+
+    def close(self) -> None:
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    def status(self) -> dict:
+        return {
+            "file": str(self.writer.path) if self.writer else None,
+            "frames_recorded": self.frames_recorded
+        }
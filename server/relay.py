@@ -0,0 +1,450 @@
+''' Горизонтальное масштабирование: производитель кадров и воркеры, связанные релеем
+
+Провайдеры работают в одном процессе-производителе и публикуют кадры в релей
+(common/relay.py). Воркеры uvicorn подписываются на кадры нужных им провайдеров
+и сами раздают их своим клиентам через обычный BroadcastHub: кодирование и
+прореживание зависят от подписок клиентов воркера. Воркеры и производитель
+обмениваются статусом, поэтому /status любого воркера показывает всю систему.
+'''
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from common.base_provider import DataProviderBase
+from common.ingest import get_ingest_hub
+from common.provider_manager import get_provider_manager
+from common.relay import (LocalRelay, Relay, RelayBroker, RelayServer, RelaySubscription,
+                          UnixSocketRelay, decode_relay_frame, encode_relay_frame, frames_topic)
+from server.config import RecordingSettings, RelaySettings, get_config, get_config_store
+from server.ingest import consume_relay_ingest, forward_ingest_to, start_udp_listeners
+from server.logger import configure_logging, server_logger
+from server.provider_factory import ProviderFactory
+from server.recorder import FrameRecorder
+
+STATUS_TOPIC = "status"
+# Статус узла, не обновлявшийся столько периодов, считается устаревшим
+STATUS_EXPIRY_PERIODS = 3
+# Пауза перед перезапуском упавшего производителя, секунды (удваивается до максимума);
+# после PRODUCER_STABLE_SECONDS работы пауза снова минимальная
+PRODUCER_RESTART_DELAY = 1.0
+PRODUCER_RESTART_MAX_DELAY = 30.0
+PRODUCER_STABLE_SECONDS = 60.0
+
+
+class RelayProvider(DataProviderBase):
+    """Провайдер воркера: кадры провайдера производителя из темы релея"""
+    def __init__(self, name: str, relay: Relay):
+        super().__init__({'name': name, 'data_rate': {'mode': 'source'}})
+        self.relay = relay
+        self._subscription: Optional[RelaySubscription] = None
+        self._payload: Optional[bytes] = None
+
+    async def start(self, send_callback: Callable[[Any], None]) -> None:
+        self._subscription = await self.relay.subscribe(frames_topic(self.manifest['name']))
+        try:
+            await super().start(send_callback)
+        finally:
+            self._subscription.close()
+
+    async def wait_source(self) -> None:
+        try:
+            _, self._payload = await self._subscription.get()
+        except ConnectionError:
+            if self._running:
+                raise
+
+    async def generate_data(self, dt: float):
+        payload, self._payload = self._payload, None
+        if payload is None:
+            return None
+        frame, _ = decode_relay_frame(payload)
+        return frame
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._subscription:
+            self._subscription.close()
+
+
+class FramePublisher:
+    """
+    Провайдеры производителя: провайдер запускается, когда на его кадры
+    подписан хотя бы один воркер, и останавливается после ухода последнего.
+    Запись кадров ведется здесь, один раз на всю систему
+    """
+    def __init__(self, broker: RelayBroker, recording: Optional[RecordingSettings] = None):
+        self.broker = broker
+        self._recording = recording
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Остановленные, но еще не завершившиеся задачи провайдеров
+        self._stopping: Dict[str, asyncio.Task] = {}
+        self._providers: Dict[str, DataProviderBase] = {}
+        self._recorders: Dict[str, FrameRecorder] = {}
+        self.frames: Dict[str, int] = {}
+        broker.on_demand(self._on_demand)
+
+    @property
+    def recording(self) -> RecordingSettings:
+        return self._recording if self._recording is not None else get_config().recording
+
+    def _on_demand(self, topic: str, count: int) -> None:
+        prefix = frames_topic("")
+        if not topic.startswith(prefix):
+            return
+        name = topic[len(prefix):]
+        if count and name not in self._tasks:
+            self._tasks[name] = asyncio.create_task(self._run(name, self._stopping.get(name)))
+        elif not count and name in self._tasks:
+            task = self._tasks.pop(name)
+            task.cancel()
+            self._stopping[name] = task
+            task.add_done_callback(lambda done: self._forget_stopping(name, done))
+
+    def _forget_stopping(self, name: str, task: asyncio.Task) -> None:
+        if self._stopping.get(name) is task:
+            del self._stopping[name]
+
+    async def _run(self, name: str, previous: Optional[asyncio.Task] = None) -> None:
+        # Спрос вернулся до остановки прежнего провайдера: новый запускается
+        # после того, как прежний остановлен и закрыл запись
+        if previous is not None:
+            await asyncio.wait([previous])
+        provider = await ProviderFactory.create_provider(name)
+        if provider is None:
+            if self._tasks.get(name) is asyncio.current_task():
+                del self._tasks[name]
+            return
+        recording = self.recording
+        recorder = None
+        if recording.enabled and name not in recording.exclude:
+            recorder = self._recorders[name] = FrameRecorder(recording.directory, name)
+        topic = frames_topic(name)
+        self._providers[name] = provider
+        self.frames.setdefault(name, 0)
+
+        async def publish(data: Any) -> None:
+            timestamp = time.time()
+            if recorder:
+                recorder.record(data, timestamp)
+            self.broker.publish(topic, encode_relay_frame(data, timestamp))
+            self.frames[name] += 1
+
+        server_logger.info(f"Started provider for relay: {name}")
+        try:
+            await provider.start(publish)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            server_logger.error(f"Provider {name} stopped with error: {e}")
+        finally:
+            await provider.stop()
+            if recorder:
+                recorder.close()
+            # Записи удаляются, только если они принадлежат этой задаче
+            if recorder is not None and self._recorders.get(name) is recorder:
+                del self._recorders[name]
+            if self._providers.get(name) is provider:
+                del self._providers[name]
+            server_logger.info(f"Stopped provider for relay: {name}")
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values()) + list(self._stopping.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "workers": self.broker.demand(frames_topic(name)),
+                "frames_published": self.frames.get(name, 0),
+                "scheduler": provider.timing_stats(),
+                "recording": self._recorders[name].status() if name in self._recorders else None
+            } for name, provider in self._providers.items()
+        }
+
+
+class StatusExchange:
+    """
+    Обмен статусом между узлами: каждый узел периодически публикует свой статус
+    в общую тему и хранит последний статус остальных
+    """
+    def __init__(self, relay: Relay, node: str, role: str,
+                 collect: Callable[[], Dict[str, Any]], interval: float):
+        self.relay = relay
+        self.node = node
+        self.role = role
+        self.collect = collect
+        self.interval = interval
+        self._peers: Dict[str, Dict[str, Any]] = {}
+        self._received: Dict[str, float] = {}
+
+    async def run(self) -> None:
+        subscription = await self.relay.subscribe(STATUS_TOPIC)
+        try:
+            await asyncio.gather(self._publish(), self._receive(subscription))
+        finally:
+            subscription.close()
+
+    async def _publish(self) -> None:
+        while True:
+            message = {"node": self.node, "role": self.role, "pid": os.getpid(),
+                       "status": self.collect()}
+            try:
+                await self.relay.publish(STATUS_TOPIC, json.dumps(message, default=str).encode())
+            except ConnectionError:
+                # Потеря связи с релеем уже в журнале; статус уйдет после переподключения
+                pass
+            except Exception as e:
+                server_logger.error(f"Error publishing relay status: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _receive(self, subscription: RelaySubscription) -> None:
+        while True:
+            _, payload = await subscription.get()
+            try:
+                message = json.loads(payload)
+                node = message["node"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            self._peers[node] = message
+            self._received[node] = time.monotonic()
+
+    def peers(self) -> Dict[str, Dict[str, Any]]:
+        """Свежие статусы других узлов (с возрастом в секундах)"""
+        now = time.monotonic()
+        expiry = self.interval * STATUS_EXPIRY_PERIODS
+        return {
+            node: {**message, "age": round(now - self._received[node], 3)}
+            for node, message in self._peers.items()
+            if node != self.node and now - self._received[node] <= expiry
+        }
+
+
+class Producer:
+    """Процесс-производитель: брокер релея, провайдеры, прием данных шлюзов"""
+    def __init__(self, settings: RelaySettings):
+        self.settings = settings
+        self.broker = RelayBroker()
+        self.publisher = FramePublisher(self.broker)
+        self.relay = LocalRelay(self.broker, settings.queue_size)
+        self.server = RelayServer(self.broker, settings.path, settings.queue_size) \
+            if settings.transport == "unix" else None
+        self.exchange = StatusExchange(self.relay, f"producer-{os.getpid()}", "producer",
+                                       self.status, settings.status_interval)
+        self._tasks: List[asyncio.Task] = []
+        self._udp_transports = []
+
+    async def start(self) -> None:
+        if self.server:
+            # Сокет от предыдущего запуска мешает bind
+            with suppress(FileNotFoundError):
+                os.unlink(self.settings.path)
+            await self.server.start()
+        self._udp_transports = await start_udp_listeners()
+        ProviderFactory.prewarm(get_config().provider.prewarm)
+        self._tasks = [
+            asyncio.create_task(self.exchange.run()),
+            asyncio.create_task(consume_relay_ingest(self.relay))
+        ]
+
+    async def close(self) -> None:
+        for transport in self._udp_transports:
+            transport.close()
+        for task in self._tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await self.publisher.close()
+        if self.server:
+            await self.server.close()
+            with suppress(FileNotFoundError):
+                os.unlink(self.settings.path)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "providers": self.publisher.status(),
+            "relay": self.server.status() if self.server else {
+                "topics": self.broker.topics(), "published": self.broker.published
+            },
+            "ingest": get_ingest_hub().status()
+        }
+
+
+class RelayWorker:
+    """Воркер сервера: провайдеры берутся из релея, статус публикуется в релей"""
+    def __init__(self, relay: Relay, settings: RelaySettings,
+                 collect: Callable[[], Dict[str, Any]], producer: Optional[Producer] = None):
+        self.relay = relay
+        self.producer = producer
+        self.node = f"worker-{os.getpid()}"
+        self.exchange = StatusExchange(relay, self.node, "worker", collect,
+                                       settings.status_interval)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.exchange.run())
+        forward_ingest_to(self.relay)
+
+    async def close(self) -> None:
+        forward_ingest_to(None)
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        await self.relay.close()
+        if self.producer:
+            await self.producer.close()
+
+    async def create_provider(self, name: str) -> Optional[DataProviderBase]:
+        """Фабрика провайдеров хаба воркера; имя проверяется по манифестам"""
+        if get_provider_manager().get_manifest(name) is None:
+            server_logger.error(f"Failed to create provider: {name}")
+            return None
+        return RelayProvider(name, self.relay)
+
+    def aggregate_status(self, local: Dict[str, Any]) -> Dict[str, Any]:
+        """Статус системы: локальный статус воркера, дополненный статусами остальных узлов"""
+        peers = self.exchange.peers()
+        workers = {self.node: {**local, "age": 0.0}}
+        producer = self.producer.status() if self.producer else None
+        for node, message in peers.items():
+            if message.get("role") == "worker":
+                workers[node] = {**message.get("status", {}), "age": message["age"]}
+            elif producer is None and message.get("role") == "producer":
+                producer = message.get("status")
+
+        connection_stats = {
+            f"{node}/{client_id}": stats
+            for node, status in workers.items()
+            for client_id, stats in status.get("connection_stats", {}).items()
+        }
+        active = sum(status.get("active_connections", 0) for status in workers.values())
+        return {
+            **local,
+            "active_connections": active,
+            "provider_status": "running" if active else "stopped",
+            "connection_stats": connection_stats,
+            "ingest": (producer or {}).get("ingest", {}),
+            "relay": {
+                "node": self.node,
+                "workers": {
+                    node: {
+                        "active_connections": status.get("active_connections", 0),
+                        "channels": status.get("channels", {}),
+                        "age": status["age"]
+                    } for node, status in workers.items()
+                },
+                "producer": producer
+            }
+        }
+
+
+async def start_relay_worker(settings: RelaySettings,
+                             collect: Callable[[], Dict[str, Any]]) -> RelayWorker:
+    """
+    Подключает воркер к релею. Транспорт "local" - производитель в этом же
+    процессе (один воркер, например для отладки), "unix" - отдельный процесс
+    производителя (run_producer), к которому подключаются все воркеры
+    """
+    producer = None
+    if settings.transport == "local":
+        producer = Producer(settings)
+        await producer.start()
+        relay: Relay = LocalRelay(producer.broker, settings.queue_size)
+    else:
+        relay = UnixSocketRelay(settings.path, settings.queue_size)
+        await relay.connect()
+        server_logger.info(f"Connected to relay {settings.path}")
+    worker = RelayWorker(relay, settings, collect, producer)
+    worker.start()
+    return worker
+
+
+async def _produce() -> None:
+    config = get_config_store().get()
+    configure_logging(config.logging)
+    producer = Producer(config.relay)
+    await producer.start()
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await producer.close()
+
+
+def run_producer() -> None:
+    """Точка входа процесса-производителя (main.py при relay.enabled)"""
+    Path(get_config().relay.path).parent.mkdir(parents=True, exist_ok=True)
+    asyncio.run(_produce())
+
+
+class ProducerSupervisor:
+    """
+    Процесс-производитель под присмотром main.py: завершившийся сам процесс
+    перезапускается с растущей паузой, воркеры переподключаются к релею
+    """
+    def __init__(self):
+        self.process: Optional[multiprocessing.Process] = None
+        self.restarts = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="producer-supervisor",
+                                        daemon=True)
+        self._thread.start()
+
+    def _spawn(self) -> Optional[multiprocessing.Process]:
+        with self._lock:
+            if self._stop.is_set():
+                return None
+            self.process = multiprocessing.get_context("spawn").Process(
+                target=run_producer, name="scv-producer"
+            )
+            self.process.start()
+            return self.process
+
+    def _run(self) -> None:
+        delay = PRODUCER_RESTART_DELAY
+        while True:
+            started = time.monotonic()
+            process = self._spawn()
+            if process is None:
+                return
+            process.join()
+            if self._stop.is_set():
+                return
+            if time.monotonic() - started >= PRODUCER_STABLE_SECONDS:
+                delay = PRODUCER_RESTART_DELAY
+            server_logger.error(f"Relay producer exited with code {process.exitcode}, "
+                                f"restarting in {delay:.1f} s")
+            if self._stop.wait(delay):
+                return
+            delay = min(delay * 2, PRODUCER_RESTART_MAX_DELAY)
+            self.restarts += 1
+
+    def stop(self) -> None:
+        """Останавливает производитель без перезапуска"""
+        with self._lock:
+            self._stop.set()
+            process = self.process
+        if process is not None and process.is_alive():
+            process.terminate()
+            process.join()
+        if self._thread:
+            self._thread.join()
@@ -1,18 +1,280 @@
 ''' server scrip for the websocket server '''
-from typing import Set, Dict, Any
-from datetime import datetime
-import os
+from contextlib import asynccontextmanager, suppress
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import json
+import math
+import time
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+from common.ingest import get_ingest_hub
+from common.metrics import get_metrics
+from common.frame_codec import Encoding
 from server.provider_factory import ProviderFactory
-from server.logger import server_logger
+from server.broadcast_hub import get_broadcast_hub
+from server.client_connection import ClientConnection
+from server.history import router as history_router
+from server.ingest import router as ingest_router, start_udp_listeners
+from server.subscription import Subscription
+from server.config import RecordingSettings, get_config, get_config_store
+from server.logger import configure_logging, logging_stats, server_logger
+from server.profiler import get_profiler
+from server.relay import RelayWorker, start_relay_worker
+from server.startup import get_startup_timer
+from server.static import get_static_cache, router as static_router
+from common.provider_manager import get_provider_manager
 
 active_connections: Set[WebSocket] = set()
 connection_stats: Dict[str, Dict] = {}
+# Связь с производителем кадров, если включен relay (несколько воркеров)
+relay_worker: Optional[RelayWorker] = None
+
+
+async def watch_settings() -> None:
+    '''Горячая перезагрузка: проверяет mtime конфигурации и манифестов провайдеров'''
+    store = get_config_store()
+    while True:
+        interval = store.get().server.watch_interval
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
+        try:
+            if store.reload_if_changed():
+                configure_logging(store.get().logging)
+            for name in get_provider_manager().reload_manifests():
+                if relay_worker is None:
+                    await get_broadcast_hub().restart_channel(name)
+                else:
+                    # Провайдеры работают в производителе, который манифесты не отслеживает
+                    server_logger.warning(
+                        f"Manifest of {name} changed; restart the relay producer to apply it"
+                    )
+            get_static_cache().reload_if_changed()
+        except Exception as e:
+            server_logger.error(f"Error checking settings for changes: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    '''Конфигурация читается один раз при старте, дальше - только при изменении файла'''
+    global relay_worker
+    timer = get_startup_timer()
+    config = get_config_store().get()
+    configure_logging(config.logging)
+    if config.metrics.profiler:
+        # Запуск из цикла событий: профилировщик наблюдает его поток
+        get_profiler().start(interval=config.metrics.profiler_interval_ms / 1000.0)
+    watcher = asyncio.create_task(watch_settings())
+    timer.mark("config")
+    # Статические файлы читаются и сжимаются до первого запроса
+    get_static_cache()
+    timer.mark("static")
+    udp_transports = []
+    if config.relay.enabled:
+        # Провайдеры, запись и прием UDP - в производителе; воркер только раздает кадры
+        relay_worker = await start_relay_worker(config.relay, local_status)
+        hub = get_broadcast_hub()
+        hub.provider_factory = relay_worker.create_provider
+        hub.recording = RecordingSettings(enabled=False)
+        timer.mark("relay")
+    else:
+        udp_transports = await start_udp_listeners()
+        # Первый клиент получает готовый экземпляр провайдера
+        ProviderFactory.prewarm(config.provider.prewarm)
+        timer.mark("prewarm")
+    timer.ready(config.server.startup_budget_ms)
+    try:
+        yield
+    finally:
+        for transport in udp_transports:
+            transport.close()
+        watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await watcher
+        if relay_worker:
+            await relay_worker.close()
+            relay_worker = None
+        get_profiler().stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(history_router)
+app.include_router(ingest_router)
+app.include_router(static_router)
+
+_metrics = get_metrics()
+ACTIVE_CONNECTIONS = _metrics.gauge("scv_active_connections", "Open WebSocket connections")
+CLIENT_FRAMES_SENT = _metrics.counter(
+    "scv_client_frames_sent_total", "Messages written to the client socket", ("client",)
+)
+CLIENT_BYTES_SENT = _metrics.counter(
+    "scv_client_bytes_sent_total", "Bytes written to the client socket", ("client",)
+)
+CLIENT_FRAMES_DROPPED = _metrics.counter(
+    "scv_client_frames_dropped_total", "Frames dropped by the client queue", ("client",)
+)
+CLIENT_QUEUE_DEPTH = _metrics.gauge(
+    "scv_client_queue_depth", "Current client queue depth, frames", ("client",)
+)
+CLIENT_LAG_MS = _metrics.gauge(
+    "scv_client_lag_ms", "Queue wait of the last sent message, ms", ("client",)
+)
+CLIENT_RENDER_MS = _metrics.gauge(
+    "scv_client_render_ms", "Client-reported viewer timings, ms", ("client", "stage")
+)
+CLIENT_DISPLAY_FPS = _metrics.gauge(
+    "scv_client_display_fps", "Client-reported display frame rate", ("client",)
+)
+
+# Поля отчета клиента о задержках отрисовки (сообщение latency_report)
+LATENCY_REPORT_FIELDS = (
+    "render_latency_ms", "transit_ms", "jitter_ms", "buffer_ms", "decode_ms", "clock_rtt_ms",
+    "display_fps", "frames", "late_frames", "underruns"
+)
+# Стадии метрики scv_client_render_ms
+RENDER_STAGES = {
+    "render_latency_ms": "latency", "transit_ms": "transit", "jitter_ms": "jitter",
+    "buffer_ms": "buffer", "decode_ms": "decode"
+}
+
+
+def collect_connection_metrics() -> None:
+    '''Метрики клиентов берутся из connection_stats в момент запроса /metrics'''
+    ACTIVE_CONNECTIONS.labels().set(len(active_connections))
+    families = (CLIENT_FRAMES_SENT, CLIENT_BYTES_SENT, CLIENT_FRAMES_DROPPED,
+                CLIENT_QUEUE_DEPTH, CLIENT_LAG_MS, CLIENT_RENDER_MS, CLIENT_DISPLAY_FPS)
+    # Отключившиеся клиенты уходят из выдачи
+    for family in families:
+        family.clear()
+    for client_id, stats in list(connection_stats.items()):
+        # Счетчики ведет ClientConnection, здесь они только копируются
+        CLIENT_FRAMES_SENT.labels(client=client_id).value = stats.get('messages_sent', 0)
+        CLIENT_BYTES_SENT.labels(client=client_id).value = stats.get('bytes_sent', 0)
+        CLIENT_FRAMES_DROPPED.labels(client=client_id).value = stats.get('messages_dropped', 0)
+        CLIENT_QUEUE_DEPTH.labels(client=client_id).set(stats.get('queue_depth', 0))
+        CLIENT_LAG_MS.labels(client=client_id).set(stats.get('lag_ms', 0.0))
+        render = stats.get('render') or {}
+        for field, stage in RENDER_STAGES.items():
+            if field in render:
+                CLIENT_RENDER_MS.labels(client=client_id, stage=stage).set(render[field])
+        if 'display_fps' in render:
+            CLIENT_DISPLAY_FPS.labels(client=client_id).set(render['display_fps'])
+
+
+_metrics.add_collector(collect_connection_metrics)
+
+def negotiate_encoding(websocket: WebSocket) -> Encoding:
+    '''Формат кадров из параметра ?encoding=; по умолчанию и при ошибке - JSON'''
+    requested = websocket.query_params.get("encoding", Encoding.JSON.value)
+    try:
+        return Encoding(requested)
+    except ValueError:
+        server_logger.warning(f"Unknown encoding requested: {requested}, falling back to JSON")
+        return Encoding.JSON
+
+
+def requested_streams(websocket: WebSocket) -> List[Subscription]:
+    '''Начальные подписки из параметра ?streams=a,b; по умолчанию - провайдер из конфигурации'''
+    names = [name for name in websocket.query_params.get("streams", "").split(",") if name]
+    if not names:
+        default = ProviderFactory.get_default_provider_name()
+        names = [default] if default else []
+    return [Subscription(name) for name in names]
+
+
+async def apply_subscriptions(hub, connection: ClientConnection,
+                              subscriptions: Dict[str, Subscription],
+                              requested: List[Subscription], errors: List[str]) -> None:
+    '''Оформляет подписки клиента; каждый поток работает в хабе в единственном экземпляре'''
+    for subscription in requested:
+        stream_id = await hub.subscribe(subscription.provider, connection, subscription)
+        if stream_id is None:
+            errors.append(f"Unknown or failed provider: {subscription.provider}")
+            continue
+        subscription.stream_id = stream_id
+        subscriptions[subscription.provider] = subscription
+
+
+def subscriptions_message(subscriptions: Dict[str, Subscription], errors: List[str]) -> str:
+    '''Подтверждение подписок: клиент сопоставляет id потока в кадрах с провайдером'''
+    return json.dumps({
+        "type": "subscribed",
+        "streams": [
+            {"stream_id": subscription.stream_id, **subscription.to_dict()}
+            for subscription in subscriptions.values()
+        ],
+        "errors": errors
+    })
+
+
+def parse_latency_report(message: Dict[str, Any]) -> Dict[str, Any]:
+    '''Числовые поля отчета клиента; пропущенные и нечисловые значения отбрасываются'''
+    report: Dict[str, Any] = {"received_at": time.time()}
+    for field in LATENCY_REPORT_FIELDS:
+        value = message.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and math.isfinite(value):
+            report[field] = round(float(value), 3)
+    if isinstance(message.get("stream_id"), int):
+        report["stream_id"] = message["stream_id"]
+    return report
+
+
+async def handle_client_message(hub, connection: ClientConnection,
+                                subscriptions: Dict[str, Subscription], data: str):
+    '''Обработка управляющих сообщений клиента'''
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return
+    if not isinstance(message, dict):
+        return
+
+    client_id = connection.client_id
+    message_type = message.get("type")
+    if message_type == "keyframe_request":
+        # Без stream_id - ключевой кадр по всем потокам клиента
+        stream_id = message.get("stream_id")
+        provider_name = hub.provider_for_stream(stream_id) if stream_id is not None else None
+        for name in ([provider_name] if provider_name else list(subscriptions)):
+            hub.request_keyframe(name, client_id)
+        connection_stats[client_id]['keyframe_requests'] = \
+            connection_stats[client_id].get('keyframe_requests', 0) + 1
+
+    elif message_type in ("subscribe", "unsubscribe"):
+        errors: List[str] = []
+        requested = []
+        streams = message.get("streams") or []
+        if not isinstance(streams, list):
+            errors.append(f"Invalid streams: {streams!r}")
+            streams = []
+        for item in streams:
+            try:
+                requested.append(Subscription.parse(item))
+            except ValueError as e:
+                errors.append(str(e))
+
+        if message_type == "subscribe":
+            await apply_subscriptions(hub, connection, subscriptions, requested, errors)
+        else:
+            for subscription in requested:
+                if subscriptions.pop(subscription.provider, None):
+                    await hub.unsubscribe(subscription.provider, client_id)
+        connection_stats[client_id]['streams'] = list(subscriptions)
+        connection.enqueue_control(subscriptions_message(subscriptions, errors))
+
+    elif message_type == "clock":
+        # Синхронизация часов клиента: время сервера в момент ответа
+        connection.enqueue_control(json.dumps({
+            "type": "clock",
+            "client_time": message.get("client_time"),
+            "server_time": time.time()
+        }))
+
+    elif message_type == "latency_report":
+        connection_stats[client_id]['render'] = parse_latency_report(message)
 
-app = FastAPI()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -22,59 +284,53 @@ async def websocket_endpoint(websocket: WebSocket):
     active_connections.add(websocket)
 
     connection_stats[client_id] = {
-        'connected_at': datetime.now(),
+        'connected_at': time.time(),
         'messages_sent': 0,
         'last_error': None
     }
 
     server_logger.info(f"New WebSocket connection: {client_id}")
 
-    # Создаем отдельный экземпляр провайдера для каждого соединения
-    provider = await ProviderFactory.create_from_config()
-    if not provider:
-        server_logger.error(f"Failed to create provider for client {client_id}")
+    # Все клиенты одного провайдера получают кадры из общего канала,
+    # каждый через собственную ограниченную очередь; по одному сокету
+    # может идти несколько потоков
+    hub = get_broadcast_hub()
+    encoding = negotiate_encoding(websocket)
+    connection_stats[client_id]['encoding'] = encoding.value
+    connection = ClientConnection.from_config(
+        client_id, websocket, connection_stats[client_id], get_config().stream, encoding
+    )
+    connection.start()
+
+    subscriptions: Dict[str, Subscription] = {}
+    errors: List[str] = []
+    await apply_subscriptions(hub, connection, subscriptions, requested_streams(websocket),
+                              errors)
+    if not subscriptions:
+        server_logger.error(f"Failed to create provider for client {client_id}: {errors}")
+        await connection.close()
         await cleanup_connection(websocket)
         return
-
-    async def send_data(data: Any):
-        """Callback функция для отправки данных через websocket"""
-        try:
-            await websocket.send_json(data)
-            connection_stats[client_id]['messages_sent'] += 1
-        except Exception as e:
-            server_logger.error(f"Error sending data to client {client_id}: {str(e)}", exc_info=True)  # добавляем exc_info=True
-            raise
+    connection_stats[client_id]['streams'] = list(subscriptions)
+    connection.enqueue_control(subscriptions_message(subscriptions, errors))
 
     try:
-        # Запускаем провайдер с функцией отправки данных
-        await provider.start(send_data)
         # Ждем пока соединение не закроется
         while True:
             try:
-                # Просто проверяем что соединение живо
                 data = await websocket.receive_text()
             except WebSocketDisconnect:
                 break
+            await handle_client_message(hub, connection, subscriptions, data)
     except Exception as e:
         server_logger.error(f"Error in WebSocket connection {client_id}: {str(e)}", exc_info=True)
     finally:
-        await provider.stop()
+        for provider_name in list(subscriptions):
+            await hub.unsubscribe(provider_name, client_id)
+        await connection.close()
         await cleanup_connection(websocket)
 
 
-app.mount("/css", StaticFiles(directory="public/css"), name="css")
-app.mount("/js", StaticFiles(directory="public/js"), name="js")
-
-@app.get("/")
-async def get_index():
-    '''Отдача главной страницы'''
-    file_path = "public/index.html"
-    server_logger.info(f"Serving index page from {os.path.abspath(file_path)}")
-    if not os.path.exists(file_path):
-        server_logger.error(f"File not found: {file_path}")
-        return {"error": "Index file not found"}
-    return FileResponse(file_path)
-
 async def cleanup_connection(websocket: WebSocket):
     '''Очистка при отключении клиента'''
     if websocket in active_connections:
@@ -82,7 +338,7 @@ async def cleanup_connection(websocket: WebSocket):
         client_id = str(id(websocket))
         if client_id in connection_stats:
             stats = connection_stats[client_id]
-            duration = (datetime.now() - stats['connected_at']).total_seconds()
+            duration = time.time() - stats['connected_at']
             server_logger.info(
                 f"Client {client_id} disconnected. "
                 f"Connection duration: {duration:.2f}s, "
@@ -90,11 +346,79 @@ async def cleanup_connection(websocket: WebSocket):
             )
             del connection_stats[client_id]
 
-@app.get("/status")
-async def get_status():
-    '''    Получение статуса сервера и соединений     '''
+def local_status() -> Dict[str, Any]:
+    '''Статус этого процесса сервера'''
     return {
         "active_connections": len(active_connections),
         "provider_status": "running" if active_connections else "stopped",
-        "connection_stats": connection_stats
+        "channels": get_broadcast_hub().status(),
+        "connection_stats": connection_stats,
+        "logging": logging_stats(),
+        "ingest": get_ingest_hub().status(),
+        "startup": get_startup_timer().status(),
+        "static": get_static_cache().status()
     }
+
+
+@app.get("/status")
+async def get_status():
+    '''    Получение статуса сервера и соединений (в режиме релея - всех воркеров)     '''
+    status = local_status()
+    return relay_worker.aggregate_status(status) if relay_worker else status
+
+
+@app.get("/metrics")
+async def get_metrics_text():
+    '''Метрики в текстовом формате Prometheus'''
+    return PlainTextResponse(get_metrics().render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/replay/{provider_name}")
+async def control_replay(provider_name: str, seek: Optional[float] = None,
+                         speed: Optional[float] = None):
+    '''Перемотка (seek, секунды записи) и скорость воспроизведения запущенного провайдера'''
+    provider = get_broadcast_hub().provider(provider_name)
+    if provider is None:
+        raise HTTPException(status_code=404, detail=f"Provider is not running: {provider_name}")
+    # В режиме релея провайдеры работают в процессе-производителе
+    if not hasattr(provider, "playback_status"):
+        raise HTTPException(status_code=400,
+                            detail=f"Provider does not support playback control: {provider_name}")
+    try:
+        if seek is not None:
+            provider.seek(seek)
+        if speed is not None:
+            provider.set_speed(speed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return provider.playback_status()
+
+
+@app.post("/metrics/profiler")
+async def toggle_profiler(enabled: bool = True, interval_ms: float = 5.0):
+    '''Включает или выключает семплирующий профилировщик цикла событий'''
+    profiler = get_profiler()
+    if enabled:
+        # Интервал приводится к пределам профилировщика (1 мс - 1 с);
+        # у запущенного профилировщика меняется на ходу
+        try:
+            profiler.start(interval=interval_ms / 1000.0)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        profiler.stop()
+    return profiler.status()
+
+
+@app.get("/metrics/profiler")
+async def get_profile(format: str = "json"):
+    '''Результат профилирования: сводка или свернутые стеки (?format=collapsed)'''
+    profiler = get_profiler()
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return profiler.status()
+
+
+# Импорт модулей сервера завершен (от старта процесса, включая интерпретатор и uvicorn)
+get_startup_timer().mark("import")
@@ -0,0 +1,72 @@
+''' Замер времени запуска процесса сервера по фазам '''
+import os
+import time
+from typing import Any, Dict, Optional
+
+from server.logger import server_logger
+
+
+def _process_started() -> Optional[float]:
+    """Время запуска процесса (Linux, /proc) с точностью до такта часов ядра"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Имя процесса в скобках может содержать пробелы
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    # Возраст процесса: время с загрузки системы минус момент старта процесса
+    return time.time() - (uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+
+
+class StartupTimer:
+    """
+    Фазы запуска: от старта процесса (или импорта модуля, если время старта
+    неизвестно) до готовности принимать соединения. Фаза длится от предыдущей
+    отметки mark() до текущей
+    """
+    def __init__(self):
+        now = time.time()
+        started = _process_started()
+        self.started = min(started, now) if started is not None else now
+        self.phases: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+        self.budget_ms: Optional[float] = None
+        self._last = self.started
+
+    def mark(self, phase: str) -> None:
+        now = time.time()
+        self.phases[phase] = round((now - self._last) * 1000.0, 1)
+        self._last = now
+
+    def ready(self, budget_ms: Optional[float] = None) -> None:
+        """Отмечает готовность и сверяет время запуска с бюджетом"""
+        self.ready_ms = round((self._last - self.started) * 1000.0, 1)
+        self.budget_ms = budget_ms
+        phases = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.phases.items())
+        if budget_ms and self.ready_ms > budget_ms:
+            server_logger.warning(
+                f"Startup took {self.ready_ms:.0f} ms, over budget {budget_ms:.0f} ms ({phases})"
+            )
+        else:
+            server_logger.info(f"Startup took {self.ready_ms:.0f} ms ({phases})")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready_ms": self.ready_ms,
+            "budget_ms": self.budget_ms,
+            "phases": self.phases
+        }
+
+
+# Глобальный замер запуска процесса
+_startup_timer: Optional[StartupTimer] = None
+
+
+def get_startup_timer() -> StartupTimer:
+    """Получает замер запуска; создается при первом импорте сервера"""
+    global _startup_timer
+    if _startup_timer is None:
+        _startup_timer = StartupTimer()
+    return _startup_timer
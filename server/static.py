@@ -0,0 +1,287 @@
+''' Статические файлы клиента из памяти: ETag, сжатые варианты и условные запросы
+
+Все файлы public/ читаются при старте сервера вместе со сжатыми вариантами
+(gzip, brotli - если установлен пакет brotli). Запрос отдается из памяти без
+обращения к диску. ETag - хеш содержимого, поэтому If-None-Match дает 304 и
+после перезапуска сервера. В index.html ссылки на файлы из /css и /js
+дополняются версией (?v=<хеш>), а в карту импорта добавляются версии всех
+модулей /js - так версию получают и модули, импортируемые из main.js:
+запросы с актуальной версией кешируются браузером как неизменяемые, без
+версии - проверяются при каждой загрузке.
+'''
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from common.metrics import get_metrics
+from server.logger import server_logger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+router = APIRouter(tags=["static"])
+
+PUBLIC_DIR = Path("public")
+INDEX = "index.html"
+# Каталоги public/, доступные по одноименному префиксу URL
+STATIC_DIRS = ("css", "js")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Сжатый вариант хранится, только если он меньше исходного хотя бы на столько байт
+MIN_SAVING = 64
+# Порядок предпочтения кодировок при равном q в Accept-Encoding
+ENCODINGS = ("br", "gzip")
+
+# Ссылки на статические файлы в index.html: href="/js/main.js", src="/css/..."
+_LINK = re.compile(r'((?:href|src)=")(/(?:%s)/[^"?#]+)(")' % "|".join(STATIC_DIRS))
+# Карта импорта страницы и первый модульный скрипт (перед ним вставляется новая карта)
+_IMPORT_MAP = re.compile(r'(<script type="importmap">)(.*?)(</script>)', re.S)
+_MODULE_SCRIPT = re.compile(r'<script type="module"')
+
+_metrics = get_metrics()
+STATIC_RESPONSES = _metrics.counter(
+    "scv_static_responses_total", "Static asset responses", ("status", "encoding")
+)
+STATIC_BYTES = _metrics.counter(
+    "scv_static_bytes_sent_total", "Static asset body bytes sent", ("encoding",)
+)
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return {
+        encoding: data for encoding, data in variants.items()
+        if len(data) + MIN_SAVING <= len(body)
+    }
+
+
+def _content_type(path: str) -> str:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+class StaticAsset:
+    """Файл в памяти: содержимое, сжатые варианты и ETag каждого варианта"""
+    def __init__(self, path: str, body: bytes):
+        self.path = path
+        self.content_type = _content_type(path)
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        self.bodies: Dict[str, bytes] = {"identity": body, **_compress(body)}
+        # У каждого варианта свой сильный ETag (RFC 9110, 8.8.3)
+        self.etags: Dict[str, str] = {
+            encoding: f'"{self.version}"' if encoding == "identity"
+            else f'"{self.version}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+    def matches(self, if_none_match: str) -> bool:
+        """If-None-Match совпадает с любым вариантом: содержимое у них одно"""
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Слабое сравнение: W/ не учитывается (RFC 9110, 13.1.2)
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+        return "*" in tags or any(tag in self.etags.values() for tag in tags)
+
+    def choose_encoding(self, accept_encoding: str) -> str:
+        """Кодировка из Accept-Encoding: наибольший q, при равном - порядок ENCODINGS"""
+        weights: Dict[str, float] = {}
+        for item in accept_encoding.split(","):
+            name, _, params = item.strip().partition(";")
+            q = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    continue
+            weights[name.strip().lower()] = q
+        best, best_q = "identity", 0.0
+        for encoding in ENCODINGS:
+            q = weights.get(encoding, weights.get("*", 0.0))
+            if encoding in self.bodies and q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def size(self) -> Dict[str, int]:
+        return {encoding: len(body) for encoding, body in self.bodies.items()}
+
+
+class StaticAssetCache:
+    """Файлы клиента в памяти; index.html ссылается на версии файлов /css и /js"""
+    def __init__(self, root: Path = PUBLIC_DIR):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+        self._mtimes: Dict[str, float] = {}
+
+    def _files(self) -> List[Tuple[str, Path]]:
+        files = [(f"/{INDEX}", self.root / INDEX)]
+        for directory in STATIC_DIRS:
+            base = self.root / directory
+            if base.is_dir():
+                files.extend(
+                    (f"/{path.relative_to(self.root).as_posix()}", path)
+                    for path in sorted(base.rglob("*")) if path.is_file()
+                )
+        return files
+
+    def _scan(self) -> Dict[str, float]:
+        mtimes = {}
+        for url, path in self._files():
+            try:
+                mtimes[url] = path.stat().st_mtime
+            except OSError:
+                continue
+        return mtimes
+
+    def load(self) -> None:
+        """Читает и сжимает все файлы (при старте и после изменений на диске)"""
+        assets: Dict[str, StaticAsset] = {}
+        mtimes: Dict[str, float] = {}
+        index = None
+        for url, path in self._files():
+            try:
+                # Время изменения - до чтения: правка во время чтения заметна при следующей проверке
+                mtimes[url] = path.stat().st_mtime
+                body = path.read_bytes()
+            except OSError:
+                if url == f"/{INDEX}":
+                    server_logger.error(f"File not found: {path}")
+                continue
+            if url == f"/{INDEX}":
+                index = body
+                continue
+            assets[url] = StaticAsset(url, body)
+        if index is not None:
+            # Версии подставляются после чтения файлов, на которые ссылается страница
+            assets[f"/{INDEX}"] = StaticAsset(f"/{INDEX}", self._versioned(index, assets))
+        self.assets = assets
+        self._mtimes = mtimes
+        total = sum(len(asset.bodies["identity"]) for asset in assets.values())
+        server_logger.info(f"Static assets loaded: {len(assets)} files, {total} bytes"
+                           f"{'' if brotli else ' (brotli not installed, gzip only)'}")
+
+    @staticmethod
+    def _versioned(html: bytes, assets: Dict[str, StaticAsset]) -> bytes:
+        def replace(match: re.Match) -> str:
+            asset = assets.get(match.group(2))
+            if asset is None:
+                return match.group(0)
+            return f"{match.group(1)}{match.group(2)}?v={asset.version}{match.group(3)}"
+        page = _LINK.sub(replace, html.decode("utf-8"))
+
+        # Импорты модулей разрешаются в адреса без версии; карта импорта
+        # заменяет их версионными (ключи-пути сравниваются с разрешенным адресом)
+        modules = {
+            url: f"{url}?v={asset.version}" for url, asset in assets.items()
+            if url.startswith("/js/") and url.endswith(".js")
+        }
+        if not modules:
+            return page.encode("utf-8")
+        match = _IMPORT_MAP.search(page)
+        if match is None:
+            script = f'<script type="importmap">{json.dumps({"imports": modules})}</script>\n'
+            module = _MODULE_SCRIPT.search(page)
+            position = module.start() if module else len(page)
+            return (page[:position] + script + page[position:]).encode("utf-8")
+        try:
+            import_map = json.loads(match.group(2))
+        except ValueError as e:
+            server_logger.error(f"Invalid import map in {INDEX}: {e}")
+            return page.encode("utf-8")
+        # Явно заданные в странице адреса не переопределяются
+        import_map["imports"] = {**modules, **import_map.get("imports", {})}
+        body = json.dumps(import_map, indent=4)
+        return (page[:match.start(2)] + body + page[match.end(2):]).encode("utf-8")
+
+    def reload_if_changed(self) -> bool:
+        """Перечитывает файлы, если изменился их список или время изменения"""
+        if self._scan() == self._mtimes:
+            return False
+        self.load()
+        server_logger.info("Static assets reloaded")
+        return True
+
+    def get(self, url: str) -> Optional[StaticAsset]:
+        return self.assets.get(url)
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            url: {"version": asset.version, "size": asset.size()}
+            for url, asset in self.assets.items()
+        }
+
+
+# Глобальный кеш статических файлов
+_static_cache: Optional[StaticAssetCache] = None
+
+
+def get_static_cache() -> StaticAssetCache:
+    """Получает кеш статических файлов; файлы читаются при первом обращении"""
+    global _static_cache
+    if _static_cache is None:
+        _static_cache = StaticAssetCache()
+        _static_cache.load()
+    return _static_cache
+
+
+def asset_response(request: Request, asset: StaticAsset, cache_control: str) -> Response:
+    """Ответ из памяти с учетом If-None-Match и Accept-Encoding"""
+    encoding = asset.choose_encoding(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": asset.etags[encoding],
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding"
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and asset.matches(if_none_match):
+        STATIC_RESPONSES.labels(status="304", encoding=encoding).inc()
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    body = asset.bodies[encoding]
+    STATIC_RESPONSES.labels(status="200", encoding=encoding).inc()
+    STATIC_BYTES.labels(encoding=encoding).inc(len(body))
+    return Response(body, media_type=asset.content_type, headers=headers)
+
+
+@router.api_route("/", methods=["GET", "HEAD"])
+async def get_index(request: Request):
+    '''Отдача главной страницы'''
+    asset = get_static_cache().get(f"/{INDEX}")
+    if asset is None:
+        return JSONResponse({"error": "Index file not found"}, status_code=404)
+    # Страница всегда проверяется: в ней версии остальных файлов
+    return asset_response(request, asset, REVALIDATE)
+
+
+def _asset(request: Request, url: str) -> Response:
+    asset = get_static_cache().get(url)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    versioned = request.query_params.get("v") == asset.version
+    return asset_response(request, asset, IMMUTABLE if versioned else REVALIDATE)
+
+
+@router.api_route("/css/{path:path}", methods=["GET", "HEAD"])
+async def get_css(request: Request, path: str):
+    '''Стили; с актуальной версией (?v=) - неизменяемые'''
+    return _asset(request, f"/css/{path}")
+
+
+@router.api_route("/js/{path:path}", methods=["GET", "HEAD"])
+async def get_js(request: Request, path: str):
+    '''Модули клиента; с актуальной версией (?v=) - неизменяемые'''
+    return _asset(request, f"/js/{path}")
@@ -0,0 +1,196 @@
+''' Подписки клиентов на потоки провайдеров '''
+import math
+from enum import Enum
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from common.frame_codec import FrameData, PoseFrame
+
+# Поля пластины, которые клиент может запросить (plate_id передается всегда)
+FRAME_FIELDS = ("position", "orientation", "dimensions", "imu")
+# Наибольшая частота подписки, кадров в секунду (выше - все кадры провайдера)
+MAX_RATE = 1000.0
+
+
+class SamplingMode(str, Enum):
+    """Как прореженный поток получает значение из пропущенных кадров"""
+    LATEST = "latest"    # последний кадр интервала
+    AVERAGE = "average"  # среднее по всем кадрам интервала
+
+
+class Subscription:
+    """
+    Параметры подписки клиента на поток провайдера: частота, способ прореживания,
+    набор полей и уровень детализации (подмножество пластин). Подписчики
+    с одинаковыми параметрами получают одни и те же закодированные кадры,
+    поэтому key используется для группировки внутри канала.
+    """
+    def __init__(
+        self,
+        provider: str,
+        rate: Optional[float] = None,
+        fields: Optional[Sequence[str]] = None,
+        sampling: SamplingMode = SamplingMode.LATEST,
+        plates: Optional[Sequence[int]] = None,
+        lod: int = 1
+    ):
+        if not provider or not isinstance(provider, str):
+            raise ValueError(f"Invalid provider name: {provider!r}")
+        if rate is not None:
+            rate = float(rate)
+            # json.loads пропускает NaN, Infinity и 1e999
+            if not math.isfinite(rate) or not 0 < rate <= MAX_RATE:
+                raise ValueError(
+                    f"Subscription rate must be in (0, {MAX_RATE:g}], got {rate}"
+                )
+        if fields is not None:
+            unknown = set(fields) - set(FRAME_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown fields: {sorted(unknown)}")
+            # Порядок полей не важен для группировки
+            fields = tuple(field for field in FRAME_FIELDS if field in fields)
+        if plates is not None:
+            plates = tuple(sorted({int(plate_id) for plate_id in plates}))
+        lod = int(lod)
+        if lod < 1:
+            raise ValueError(f"Level of detail must be >= 1, got {lod}")
+
+        self.provider = provider
+        self.rate = rate
+        self.fields: Optional[Tuple[str, ...]] = fields
+        self.sampling = SamplingMode(sampling)
+        self.plates: Optional[Tuple[int, ...]] = plates
+        self.lod = lod
+        # Назначается хабом при подписке
+        self.stream_id: Optional[int] = None
+
+    @property
+    def key(self) -> tuple:
+        return (self.rate, self.fields, self.sampling, self.plates, self.lod)
+
+    @classmethod
+    def parse(cls, item: Union[str, Dict[str, Any]]) -> 'Subscription':
+        """
+        Подписка из сообщения клиента: имя провайдера или объект
+        {"provider", "rate", "fields", "sampling", "plates", "lod"}
+        """
+        if isinstance(item, str):
+            return cls(item)
+        if not isinstance(item, dict):
+            raise ValueError(f"Invalid subscription: {item!r}")
+        try:
+            return cls(
+                item.get("provider"),
+                item.get("rate"),
+                item.get("fields"),
+                item.get("sampling", SamplingMode.LATEST),
+                item.get("plates"),
+                item.get("lod", 1)
+            )
+        except TypeError as e:
+            raise ValueError(f"Invalid subscription {item!r}: {e}") from e
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "rate": self.rate,
+            "fields": list(self.fields) if self.fields is not None else list(FRAME_FIELDS),
+            "sampling": self.sampling.value,
+            "plates": list(self.plates) if self.plates is not None else None,
+            "lod": self.lod
+        }
+
+
+class FrameSampler:
+    """
+    Готовит кадр для группы подписчиков из общего потока канала:
+    выбирает подмножество пластин (plates, затем каждая lod-я) и в режиме
+    average усредняет позы по всем кадрам, пропущенным прореживанием.
+    Углы усредняются как направления (через синус и косинус), чтобы
+    переход через ±π не искажал среднее.
+    """
+    def __init__(self, subscription: Subscription):
+        self.sampling = subscription.sampling
+        self.plates = subscription.plates
+        self.lod = subscription.lod
+
+        self._plate_ids: Optional[np.ndarray] = None
+        self._index: Optional[np.ndarray] = None
+        self._count = 0
+        self._window_frame: Optional[PoseFrame] = None
+        self._position_sum: Optional[np.ndarray] = None
+        self._sin_sum: Optional[np.ndarray] = None
+        self._cos_sum: Optional[np.ndarray] = None
+
+    @property
+    def passthrough(self) -> bool:
+        """Кадр уходит без изменений (без выборки пластин и усреднения)"""
+        return (self.sampling == SamplingMode.LATEST and self.plates is None
+                and self.lod == 1)
+
+    def _selection(self, frame: PoseFrame) -> Optional[np.ndarray]:
+        """Индексы выбранных пластин; пересчитываются при смене состава"""
+        if self.plates is None and self.lod == 1:
+            return None
+        if self._plate_ids is None or not np.array_equal(self._plate_ids, frame.plate_ids):
+            self._plate_ids = np.array(frame.plate_ids, copy=True)
+            index = np.arange(len(frame))
+            if self.plates is not None:
+                index = index[np.isin(frame.plate_ids, self.plates)]
+            self._index = index[::self.lod]
+        return self._index
+
+    def _select(self, data: FrameData) -> PoseFrame:
+        frame = data if isinstance(data, PoseFrame) else PoseFrame.from_dict(data)
+        index = self._selection(frame)
+        if index is None:
+            return frame
+        imu = frame.imu
+        if imu is not None:
+            imu = imu[index] if len(imu) == len(frame) else None
+        return PoseFrame(
+            frame.plate_ids[index],
+            frame.positions[index],
+            frame.orientations[index],
+            frame.dimensions[index] if frame.dimensions is not None else None,
+            imu
+        )
+
+    def add(self, data: FrameData) -> None:
+        """Учитывает кадр канала в окне усреднения"""
+        if self.sampling != SamplingMode.AVERAGE:
+            return
+        frame = self._select(data)
+        if self._count == 0 or self._position_sum.shape != frame.positions.shape:
+            # Новое окно или сменился состав пластин - начинаем заново
+            self._position_sum = np.zeros(frame.positions.shape)
+            self._sin_sum = np.zeros(frame.orientations.shape)
+            self._cos_sum = np.zeros(frame.orientations.shape)
+            self._count = 0
+        self._position_sum += frame.positions
+        self._sin_sum += np.sin(frame.orientations)
+        self._cos_sum += np.cos(frame.orientations)
+        self._count += 1
+        self._window_frame = frame
+
+    def take(self, data: FrameData) -> FrameData:
+        """
+        Кадр для отправки группе; в режиме average закрывает окно усреднения.
+        data - последний кадр канала, он уже учтен через add()
+        """
+        if self.passthrough:
+            return data
+        if self.sampling != SamplingMode.AVERAGE or self._count == 0:
+            return self._select(data)
+        frame = self._window_frame
+        averaged = PoseFrame(
+            frame.plate_ids,
+            self._position_sum / self._count,
+            np.arctan2(self._sin_sum, self._cos_sum),
+            frame.dimensions,
+            frame.imu
+        )
+        self._count = 0
+        self._window_frame = None
+        return averaged
@@ -0,0 +1,64 @@
+''' Запуск ASGI-приложения сервера под WSGI-хостингом (Passenger) '''
+import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+from a2wsgi import ASGIMiddleware
+
+from server.logger import server_logger
+
+# Мост a2wsgi выполняет HTTP-запросы в собственном цикле событий, но не вызывает
+# lifespan приложения. Цикл событий здесь создается явно: в нем выполняются
+# lifespan (конфигурация, журналы, наблюдатель настроек) и все запросы.
+# WebSocket через WSGI невозможен - для /ws нужен ASGI-сервер (python main.py --production).
+
+STARTUP_TIMEOUT = 30.0
+
+
+async def _lifespan(app: Callable, started: Future, stopping: asyncio.Event) -> None:
+    """Минимальный драйвер протокола ASGI lifespan"""
+    startup_sent = False
+
+    async def receive():
+        nonlocal startup_sent
+        if not startup_sent:
+            startup_sent = True
+            return {"type": "lifespan.startup"}
+        await stopping.wait()
+        return {"type": "lifespan.shutdown"}
+
+    async def send(message):
+        if message["type"] == "lifespan.startup.complete":
+            started.set_result(True)
+        elif message["type"] == "lifespan.startup.failed":
+            started.set_exception(RuntimeError(message.get("message", "startup failed")))
+
+    try:
+        await app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send)
+    finally:
+        if not started.done():
+            started.set_exception(RuntimeError("ASGI lifespan exited during startup"))
+
+
+def make_wsgi_application(app: Callable) -> ASGIMiddleware:
+    """WSGI-приложение поверх ASGI-приложения с выполненным lifespan"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="asgi-loop", daemon=True).start()
+
+    started: Future = Future()
+    stopping = asyncio.Event()
+    lifespan = asyncio.run_coroutine_threadsafe(_lifespan(app, started, stopping), loop)
+    started.result(timeout=STARTUP_TIMEOUT)
+
+    def shutdown() -> None:
+        loop.call_soon_threadsafe(stopping.set)
+        try:
+            lifespan.result(timeout=5)
+        except Exception as e:
+            server_logger.error(f"ASGI lifespan shutdown failed: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+    atexit.register(shutdown)
+    return ASGIMiddleware(app, loop=loop)
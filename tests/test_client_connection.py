@@ -0,0 +1,53 @@
+import asyncio
+
+from server.client_connection import ClientConnection, OverflowPolicy
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+def make_connection(websocket):
+    return ClientConnection("client", websocket, {'messages_sent': 0}, queue_size=1,
+                            overflow_policy=OverflowPolicy.DISCONNECT, max_overflows=3)
+
+
+def test_overflows_separated_by_sends_do_not_disconnect():
+    async def scenario():
+        websocket = FakeWebSocket()
+        connection = make_connection(websocket)
+        connection.start()
+        for _ in range(10):
+            connection.enqueue("frame")
+            connection.enqueue("frame")
+            # Задача записи отправляет кадр из очереди
+            await asyncio.sleep(0)
+        assert not connection.closed
+        assert connection.stats['overflows'] == 10
+        await connection.close()
+
+    asyncio.run(scenario())
+
+
+def test_consecutive_overflows_disconnect():
+    async def scenario():
+        websocket = FakeWebSocket()
+        connection = make_connection(websocket)
+        for _ in range(4):
+            connection.enqueue("frame")
+        assert connection.closed
+        await connection._disconnect_task
+        assert websocket.close_code == 1013
+
+    asyncio.run(scenario())
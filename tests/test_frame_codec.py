@@ -0,0 +1,183 @@
+import numpy as np
+import pytest
+
+from common.frame_codec import (
+    DELTA_LIMIT, FRAME_HEADER, FRAME_TYPE_DELTA, FRAME_TYPE_KEYFRAME,
+    DeltaDecoder, DeltaEncoder, PoseFrame
+)
+from common.relay import RELAY_IMU_DTYPE, decode_relay_frame, encode_relay_frame
+
+POSITION_QUANTUM = 0.1
+ANGLE_QUANTUM = 1e-4
+
+
+def make_frame(positions, orientations, dimensions=None, imu=None):
+    positions = np.asarray(positions, dtype=np.float64)
+    return PoseFrame(np.arange(1, len(positions) + 1, dtype=np.int64), positions,
+                     np.asarray(orientations, dtype=np.float64), dimensions, imu)
+
+
+def frame_type(payload):
+    return FRAME_HEADER.unpack_from(payload, 0)[1]
+
+
+def walk(count, steps, seed=0):
+    """Плавное движение пластин: приращения укладываются в int16"""
+    rng = np.random.default_rng(seed)
+    positions = np.cumsum(rng.normal(0.0, 5.0, (steps, count, 3)), axis=0)
+    orientations = np.cumsum(rng.normal(0.0, 0.01, (steps, count, 3)), axis=0)
+    return positions, orientations
+
+
+def test_delta_round_trip_error_bounded_by_quantum():
+    dimensions = np.array([[3.0, 50.0, 100.0], [4.0, 60.0, 120.0]])
+    encoder = DeltaEncoder(keyframe_interval=10, position_quantum=POSITION_QUANTUM,
+                           angle_quantum=ANGLE_QUANTUM)
+    decoder = DeltaDecoder()
+    positions, orientations = walk(2, 35)
+
+    types = []
+    for seq in range(35):
+        frame = make_frame(positions[seq], orientations[seq], dimensions)
+        metadata, payload = encoder.encode(frame, seq, seq / 100)
+        if metadata is not None:
+            decoder.set_metadata(metadata)
+        types.append(frame_type(payload))
+
+        decoded = decoder.decode(payload)
+        assert decoded is not None
+        assert decoded.plate_ids.tolist() == [1, 2]
+        np.testing.assert_array_equal(decoded.dimensions, dimensions)
+        assert np.abs(decoded.positions - positions[seq]).max() <= POSITION_QUANTUM / 2 + 1e-9
+        assert np.abs(decoded.orientations - orientations[seq]).max() <= ANGLE_QUANTUM / 2 + 1e-12
+
+    # Ключевой кадр раз в keyframe_interval + 1 кадров, между ними - приращения
+    assert [i for i, t in enumerate(types) if t == FRAME_TYPE_KEYFRAME] == [0, 11, 22, 33]
+    assert types.count(FRAME_TYPE_DELTA) == 31
+
+
+def test_delta_overflow_forces_keyframe():
+    encoder = DeltaEncoder(keyframe_interval=100)
+    decoder = DeltaDecoder()
+    metadata, payload = encoder.encode(make_frame([[0.0, 0.0, 0.0]], [[0.0, 0.0, 0.0]]), 0, 0.0)
+    decoder.set_metadata(metadata)
+    decoder.decode(payload)
+
+    # Ровно DELTA_LIMIT квантов еще передается приращением
+    edge = DELTA_LIMIT * encoder.position_quantum
+    _, payload = encoder.encode(make_frame([[edge, 0.0, 0.0]], [[0.0, 0.0, 0.0]]), 1, 0.01)
+    assert frame_type(payload) == FRAME_TYPE_DELTA
+    assert decoder.decode(payload).positions[0, 0] == pytest.approx(edge)
+
+    # Скачок больше int16 не помещается в приращение
+    jump = edge + 1000.0
+    _, payload = encoder.encode(make_frame([[edge, -jump, 0.0]], [[0.0, 0.0, 4.0]]), 2, 0.02)
+    assert frame_type(payload) == FRAME_TYPE_KEYFRAME
+    decoded = decoder.decode(payload)
+    assert decoded.positions[0].tolist() == pytest.approx([edge, -jump, 0.0])
+    assert decoded.orientations[0, 2] == pytest.approx(4.0)
+
+
+def test_delta_seq_gap_waits_for_keyframe():
+    encoder = DeltaEncoder(keyframe_interval=100)
+    decoder = DeltaDecoder()
+    positions, orientations = walk(3, 6, seed=1)
+    payloads = []
+    for seq in range(5):
+        metadata, payload = encoder.encode(make_frame(positions[seq], orientations[seq]),
+                                           seq, 0.0)
+        if metadata is not None:
+            decoder.set_metadata(metadata)
+        payloads.append(payload)
+
+    assert decoder.decode(payloads[0]) is not None
+    assert decoder.decode(payloads[1]) is not None
+    # Кадр 2 потерян: приращения 3 и 4 не применяются, даже идущие подряд
+    assert decoder.decode(payloads[3]) is None
+    assert decoder.decode(payloads[4]) is None
+
+    # Сервер по запросу клиента отправляет ключевой кадр
+    encoder.request_keyframe()
+    _, payload = encoder.encode(make_frame(positions[5], orientations[5]), 5, 0.0)
+    assert frame_type(payload) == FRAME_TYPE_KEYFRAME
+    decoded = decoder.decode(payload)
+    assert np.abs(decoded.positions - positions[5]).max() <= POSITION_QUANTUM / 2 + 1e-9
+
+
+def test_delta_seq_wraps_around():
+    encoder = DeltaEncoder()
+    decoder = DeltaDecoder()
+    positions, orientations = walk(1, 3, seed=2)
+    for step, seq in enumerate([0xFFFFFFFE, 0xFFFFFFFF, 0x100000000]):
+        metadata, payload = encoder.encode(make_frame(positions[step], orientations[step]),
+                                           seq, 0.0)
+        if metadata is not None:
+            decoder.set_metadata(metadata)
+        assert frame_type(payload) == (FRAME_TYPE_KEYFRAME if step == 0 else FRAME_TYPE_DELTA)
+        assert decoder.decode(payload) is not None
+    assert decoder.last_seq == 0
+
+
+def test_delta_new_metadata_resets_state():
+    encoder = DeltaEncoder()
+    decoder = DeltaDecoder()
+    metadata, payload = encoder.encode(make_frame([[1.0, 2.0, 3.0]], [[0.0, 0.0, 0.0]]), 0, 0.0)
+    decoder.set_metadata(metadata)
+    decoder.decode(payload)
+
+    # Состав пластин изменился: новое metadata и ключевой кадр
+    frame = make_frame([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], [[0.0, 0.0, 0.0]] * 2)
+    metadata, payload = encoder.encode(frame, 1, 0.0)
+    assert metadata is not None
+    assert frame_type(payload) == FRAME_TYPE_KEYFRAME
+    # Кадр нового состава без metadata не разбирается
+    assert decoder.decode(payload) is None
+    decoder.set_metadata(metadata)
+    np.testing.assert_allclose(decoder.decode(payload).positions, [[1, 2, 3], [4, 5, 6]])
+
+
+def test_relay_frame_round_trip():
+    imu = np.zeros(2, dtype=RELAY_IMU_DTYPE)
+    imu['plate_id'] = [1, 2]
+    imu['accel'] = [[0.1, 0.2, 9.8], [0.0, 0.0, 9.81]]
+    imu['gyro'] = [[0.01, 0.02, 0.03], [0.0, 0.0, 0.0]]
+    imu['mag'] = [[20.0, 0.0, 40.0], [21.0, 1.0, 41.0]]
+    frame = make_frame([[1.5, -2.25, 3.125], [1e6, 0.0, -1e-6]],
+                       [[0.1, 0.2, 0.3], [-3.0, 1.5, 0.0]],
+                       np.array([[3.0, 50.0, 100.0], [4.0, 60.0, 120.0]]), imu)
+
+    decoded, timestamp = decode_relay_frame(encode_relay_frame(frame, 1234.5678))
+    assert timestamp == 1234.5678
+    # Релей передает значения без потерь
+    np.testing.assert_array_equal(decoded.plate_ids, frame.plate_ids)
+    np.testing.assert_array_equal(decoded.positions, frame.positions)
+    np.testing.assert_array_equal(decoded.orientations, frame.orientations)
+    np.testing.assert_array_equal(decoded.dimensions, frame.dimensions)
+    for field in RELAY_IMU_DTYPE.names:
+        np.testing.assert_array_equal(decoded.imu[field], imu[field])
+
+
+def test_relay_frame_round_trip_without_optional_channels():
+    frame = make_frame([[1.0, 2.0, 3.0]], [[0.0, 0.5, 1.0]])
+    decoded, _ = decode_relay_frame(encode_relay_frame(frame, 0.0))
+    assert decoded.dimensions is None and decoded.imu is None
+    np.testing.assert_array_equal(decoded.positions, frame.positions)
+
+    # Словарь провайдера кодируется так же, как PoseFrame
+    decoded, _ = decode_relay_frame(encode_relay_frame(frame.to_dict(), 0.0))
+    np.testing.assert_array_equal(decoded.orientations, frame.orientations)
+    assert decoded.dimensions is None
+
+    empty, _ = decode_relay_frame(encode_relay_frame(make_frame(np.zeros((0, 3)),
+                                                                np.zeros((0, 3))), 0.0))
+    assert len(empty) == 0
+
+
+def test_relay_frame_rejects_damaged_payload():
+    payload = encode_relay_frame(make_frame([[1.0, 2.0, 3.0]], [[0.0, 0.0, 0.0]]), 0.0)
+    with pytest.raises(ValueError, match="too short"):
+        decode_relay_frame(payload[:5])
+    with pytest.raises(ValueError, match="size mismatch"):
+        decode_relay_frame(payload[:-1])
+    with pytest.raises(ValueError, match="size mismatch"):
+        decode_relay_frame(payload + b'\0')
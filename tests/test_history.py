@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.frame_codec import PoseFrame
+from common.frame_log import FrameLogWriter
+from server import history
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    for name in ("a", "b", "c"):
+        writer = FrameLogWriter(tmp_path / f"{name}{history.LOG_EXTENSION}", np.arange(2))
+        for i in range(100):
+            frame = PoseFrame(np.arange(2), np.full((2, 3), float(i)), np.zeros((2, 3)))
+            writer.append(frame, float(i))
+        writer.close()
+    monkeypatch.setattr(history, "_recordings_dir", lambda: tmp_path)
+    monkeypatch.setattr(history, "MAX_OPEN_READERS", 2)
+    app = FastAPI()
+    app.include_router(history.router)
+    yield TestClient(app)
+    while history._readers:
+        history._readers.popitem()[1].close()
+
+
+def test_sessions_keep_bounded_number_of_readers_open(client):
+    sessions = client.get("/history/sessions").json()
+    assert [session["session"] for session in sessions] == ["a", "b", "c"]
+    assert all(session["frames"] == 100 for session in sessions)
+    assert len(history._readers) == 2
+
+
+def test_history_of_evicted_session_is_reopened(client):
+    client.get("/history/sessions")
+    response = client.get("/history/sessions/a/plates/1", params={"method": "raw"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["frames_in_range"] == 100
+    assert lines[1]["t"][:3] == [0.0, 1.0, 2.0]
+    assert len(history._readers) == 2
+
+
+def test_session_name_is_not_a_path(client):
+    assert client.get("/history/sessions/..%2Fa/plates/1").status_code == 404
+    assert client.get("/history/sessions/missing/plates/1").status_code == 404
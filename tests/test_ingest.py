@@ -0,0 +1,77 @@
+import asyncio
+import resource
+import time
+
+import numpy as np
+
+from common.ingest import (IMU_SAMPLE_DTYPE, KIND_IMU, KIND_POSE, POSE_SAMPLE_DTYPE,
+                           IngestSource, encode_ingest_packet, get_ingest_hub)
+from providers.ingest_provider.provider import IngestProvider
+
+
+def pose_samples(plate_ids, seq=0, timestamp=1.0):
+    samples = np.zeros(len(plate_ids), dtype=POSE_SAMPLE_DTYPE)
+    samples['plate_id'] = plate_ids
+    samples['seq'] = seq
+    samples['timestamp'] = timestamp
+    return samples
+
+
+def test_huge_plate_id_is_rejected_without_allocation():
+    source = IngestSource("test", capacity=16, plate_count=4)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for plate_id in (50_000_000, 0xFFFFFFFF):
+        packet = encode_ingest_packet(KIND_POSE, pose_samples([plate_id]))
+        assert source.ingest(packet, received=10.0) == 0
+    assert time.perf_counter() - started < 0.1
+    # ru_maxrss - в килобайтах
+    assert resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before < 10 * 1024
+    assert source.rejected == 2
+    assert len(source.sequences[KIND_POSE].last_seq) == 0
+
+
+def test_known_plates_are_kept_next_to_rejected_ones():
+    source = IngestSource("test", capacity=16, plate_count=4)
+    packet = encode_ingest_packet(KIND_POSE, pose_samples([0, 3, 4, 0xFFFFFFFF]))
+    assert source.ingest(packet, received=10.0) == 2
+    assert source.rejected == 2
+    assert source.status()["rejected"] == 2
+    assert len(source.sequences[KIND_POSE].last_seq) == 4
+
+
+def imu_samples(plate_ids, seq, timestamp, gyro):
+    samples = np.zeros(len(plate_ids), dtype=IMU_SAMPLE_DTYPE)
+    samples['plate_id'] = plate_ids
+    samples['seq'] = seq
+    samples['timestamp'] = timestamp
+    samples['accel'] = (0.0, 9.8, 0.0)
+    samples['gyro'] = gyro
+    samples['mag'] = (1.0, 0.0, 0.0)
+    return samples
+
+
+def test_fusion_integrates_every_imu_sample():
+    provider = IngestProvider({
+        'name': 'fusion_ingest_test',
+        'data_rate': {'mode': 'source', 'max_rate': 100},
+        'ingest': {'plate_count': 2},
+        'fusion': {'enabled': True, 'gain': 0.0}
+    })
+    provider._running = True
+    source = get_ingest_hub().source('fusion_ingest_test')
+    plates = [0, 1]
+
+    source.ingest(encode_ingest_packet(KIND_IMU, imu_samples(plates, 0, 0.0, 0.0)), 10.0)
+    frame = asyncio.run(provider.generate_data(0.01))
+    np.testing.assert_allclose(frame.orientations, 0.0, atol=1e-9)
+
+    # 1 кГц на пластину, 0.5 рад/с вокруг вертикали, 10 тиков по 100 отсчетов
+    seq = 1
+    for _ in range(10):
+        for _ in range(100):
+            samples = imu_samples(plates, seq, seq / 1000.0, (0.0, 0.5, 0.0))
+            source.ingest(encode_ingest_packet(KIND_IMU, samples), 10.0 + seq / 1000.0)
+            seq += 1
+        frame = asyncio.run(provider.generate_data(0.01))
+    np.testing.assert_allclose(np.abs(frame.orientations[:, 1]), 0.5, atol=1e-3)
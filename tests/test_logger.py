@@ -0,0 +1,65 @@
+import logging
+import threading
+
+from server import logger
+from server.config import LoggingSettings
+
+
+def test_rotation_counts_encoded_bytes(tmp_path):
+    log = logger.RotatingLogFile(str(tmp_path / "log.txt"), max_bytes=100,
+                                 backup_count=1, compress=False)
+    # 40 символов кириллицы - 80 байт UTF-8
+    log.write("ж" * 40)
+    log.write("ж" * 40)
+    log.close()
+    assert (tmp_path / "log.txt.1").stat().st_size == 80
+    assert (tmp_path / "log.txt").stat().st_size == 80
+
+
+def test_replaced_sinks_are_closed_by_writer_thread(tmp_path):
+    pipeline = logger.LogPipeline()
+    closed = threading.Event()
+    threads = []
+
+    class Output:
+        def write(self, text):
+            pass
+
+        def flush(self):
+            pass
+
+    class Sink(logger._Sink):
+        def close(self):
+            threads.append(threading.current_thread().name)
+            closed.set()
+
+    pipeline.set_sinks("test", [Sink(Output(), logging.Formatter())])
+    pipeline.set_sinks("test", [])
+    assert closed.wait(5)
+    pipeline.stop()
+    assert threads == ["log-writer"]
+
+
+def test_reconfigure_keeps_unchanged_files_open(tmp_path):
+    settings = LoggingSettings(file=str(tmp_path / "server.log"),
+                               data_file=str(tmp_path / "data.log"))
+    try:
+        logger.configure_logging(settings)
+        sinks = {name: list(sinks) for name, sinks in logger._pipeline._sinks.items()}
+        logger.configure_logging(settings.model_copy(update={"level": "DEBUG"}))
+        assert logger._pipeline._sinks["server"] == sinks["server"]
+        assert logger._pipeline._sinks["data"] == sinks["data"]
+
+        logger.configure_logging(settings.model_copy(update={"max_bytes": 1024}))
+        assert logger._pipeline._sinks["data"][0] is not sinks["data"][0]
+    finally:
+        logger.configure_logging(LoggingSettings(data_file=None))
+
+
+def test_immutable_arguments_are_formatted_by_writer_thread():
+    record = logging.LogRecord("server", logging.INFO, "", 0, "client %s: %d", ("a", 1), None)
+    prepared = logger._pipeline.handler.prepare(record)
+    assert prepared.args == ("a", 1)
+    record = logging.LogRecord("server", logging.INFO, "", 0, "items %s", ([1],), None)
+    prepared = logger._pipeline.handler.prepare(record)
+    assert prepared.msg == "items [1]" and prepared.args is None
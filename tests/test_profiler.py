@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from server.profiler import MAX_INTERVAL, MIN_INTERVAL, SamplingProfiler
+from server.server import app
+
+
+def test_interval_is_clamped():
+    assert SamplingProfiler(1e-9).interval == MIN_INTERVAL
+    assert SamplingProfiler(3600.0).interval == MAX_INTERVAL
+    assert SamplingProfiler(0.01).interval == 0.01
+
+
+@pytest.mark.parametrize("interval", [0.0, -1.0, float("nan"), float("inf")])
+def test_invalid_interval_is_rejected(interval):
+    with pytest.raises(ValueError):
+        SamplingProfiler(interval)
+
+
+def test_interval_of_running_profiler_is_updated():
+    profiler = SamplingProfiler(0.01)
+    profiler.start()
+    try:
+        profiler.start(interval=0.002)
+        assert profiler.running and profiler.interval == 0.002
+    finally:
+        profiler.stop()
+
+
+def test_endpoint_rejects_invalid_interval():
+    with TestClient(app) as client:
+        for interval in ("0", "-5", "nan", "inf"):
+            response = client.post("/metrics/profiler", params={"interval_ms": interval})
+            assert response.status_code == 400
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+
+from common.base_provider import DataProviderBase
+from common.provider_manager import ProviderManager
+from server.broadcast_hub import BroadcastHub
+from server.client_connection import Encoding
+from server.config import RecordingSettings
+
+PROVIDER_SOURCE = '''
+from common.base_provider import DataProviderBase
+
+
+class PluginProvider(DataProviderBase):
+    async def generate_data(self, dt):
+        return None
+'''
+
+
+def test_manifests_are_scanned_from_scan_path_and_reloaded(tmp_path):
+    plugin = tmp_path / "plugins_scan" / "plugin"
+    plugin.mkdir(parents=True)
+    (plugin / "provider.py").write_text(PROVIDER_SOURCE)
+    manifest = plugin / "manifest.json"
+    manifest.write_text(json.dumps({"name": "plugin", "data_rate": {"mode": "source"}}))
+
+    manager = ProviderManager(str(tmp_path / "plugins_scan"))
+    assert manager.get_provider("plugin").__name__ == "PluginProvider"
+    assert manager.reload_manifests() == []
+
+    manifest.write_text(json.dumps({"name": "plugin", "data_rate": {"mode": "fixed"}}))
+    stat = manifest.stat()
+    os.utime(manifest, (stat.st_atime, stat.st_mtime + 1))
+    assert manager.reload_manifests() == ["plugin"]
+    assert manager.get_manifest("plugin")["data_rate"]["mode"] == "fixed"
+
+
+class IdleProvider(DataProviderBase):
+    async def generate_data(self, dt):
+        return None
+
+    async def start(self, send_callback):
+        self._running = True
+        while self._running:
+            await asyncio.sleep(0.01)
+
+    async def stop(self):
+        self._running = False
+
+
+class Connection:
+    client_id = "client"
+    encoding = Encoding.JSON
+
+
+def test_restart_channel_keeps_subscribers():
+    created = []
+
+    async def factory(name):
+        created.append(IdleProvider({"name": name}))
+        return created[-1]
+
+    async def scenario():
+        hub = BroadcastHub(keyframe_interval=100, recording=RecordingSettings(enabled=False),
+                           provider_factory=factory)
+        assert not await hub.restart_channel("idle")
+        await hub.subscribe("idle", Connection())
+        assert await hub.restart_channel("idle")
+        channel = hub._channels["idle"]
+        assert channel.provider is created[1]
+        assert not created[0]._running
+        assert channel.running and "client" in channel.subscribers
+        await hub.unsubscribe("idle", "client")
+
+    asyncio.run(scenario())
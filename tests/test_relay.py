@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from common import relay as relay_module
+from common.base_provider import DataProviderBase
+from common.relay import RelayBroker, RelayServer, UnixSocketRelay, frames_topic
+from server import relay as server_relay
+from server.config import RecordingSettings
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_worker_relay_reconnects_and_resubscribes(tmp_path, monkeypatch):
+    monkeypatch.setattr(relay_module, "RECONNECT_DELAY", 0.01)
+    path = str(tmp_path / "relay.sock")
+
+    async def scenario():
+        server = RelayServer(RelayBroker(), path)
+        await server.start()
+        relay = UnixSocketRelay(path)
+        await relay.connect()
+        subscription = await relay.subscribe("topic")
+        await wait_for(lambda: server.broker.demand("topic") == 1)
+
+        # Производитель перезапускается
+        await server.close()
+        await wait_for(lambda: not relay.connected)
+        with pytest.raises(ConnectionError):
+            await relay.publish("topic", b"lost")
+        server = RelayServer(RelayBroker(), path)
+        await server.start()
+
+        await wait_for(lambda: server.broker.demand("topic") == 1)
+        assert relay.connected and relay.reconnects == 1
+        server.broker.publish("topic", b"frame")
+        assert await asyncio.wait_for(subscription.get(), 5) == ("topic", b"frame")
+        await relay.close()
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+class SlowStopProvider(DataProviderBase):
+    async def generate_data(self, dt):
+        return None
+
+    async def start(self, send_callback):
+        await asyncio.Event().wait()
+
+    async def stop(self):
+        await asyncio.sleep(0.05)
+
+
+def test_returning_demand_waits_for_previous_provider(monkeypatch):
+    created = []
+
+    async def create_provider(name):
+        created.append(SlowStopProvider({"name": name}))
+        return created[-1]
+
+    monkeypatch.setattr(server_relay.ProviderFactory, "create_provider", create_provider)
+
+    async def scenario():
+        broker = RelayBroker()
+        publisher = server_relay.FramePublisher(broker, RecordingSettings(enabled=False))
+        topic = frames_topic("p")
+        publisher._on_demand(topic, 1)
+        await wait_for(lambda: "p" in publisher._providers)
+        publisher._on_demand(topic, 0)
+        publisher._on_demand(topic, 1)
+        await wait_for(lambda: len(created) == 2 and publisher._providers.get("p") is created[1])
+        await asyncio.sleep(0.1)
+        assert publisher._providers.get("p") is created[1]
+        await publisher.close()
+        assert not publisher._providers and not publisher._stopping
+
+    asyncio.run(scenario())
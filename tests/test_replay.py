@@ -0,0 +1,61 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from common.frame_codec import PoseFrame
+from common.frame_log import FrameLogWriter
+from providers.replay_provider import provider as replay
+from server.broadcast_hub import BroadcastChannel, get_broadcast_hub
+from server.server import app
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = tmp_path / f"session{replay.LOG_EXTENSION}"
+    writer = FrameLogWriter(path, np.arange(2))
+    for i in range(10):
+        frame = PoseFrame(np.arange(2), np.full((2, 3), float(i)), np.zeros((2, 3)))
+        writer.append(frame, 100.0 + i)
+    writer.close()
+    return path
+
+
+def make_provider(recording, loop=False):
+    return replay.ReplayProvider({
+        'name': 'replay_provider',
+        'data_rate': {'mode': 'fixed', 'rate': 100},
+        'replay': {'source': str(recording), 'loop': loop}
+    })
+
+
+def test_end_of_recording_refresh_is_throttled(recording, monkeypatch):
+    provider = make_provider(recording)
+    calls = []
+    monkeypatch.setattr(provider.reader, "refresh", lambda: calls.append(1))
+    provider.seek(109.0)
+    for _ in range(100):
+        frame = asyncio.run(provider.generate_data(0.01))
+    assert frame.positions[0, 0] == 9.0
+    assert len(calls) <= 1
+
+
+def test_replay_endpoint_seeks_and_sets_speed(recording):
+    provider = make_provider(recording)
+    hub = get_broadcast_hub()
+    hub._channels["replay_provider"] = BroadcastChannel("replay_provider", provider)
+    try:
+        with TestClient(app) as client:
+            response = client.post("/replay/replay_provider", params={"seek": 105, "speed": 2})
+            assert response.status_code == 200
+            assert response.json()["position"] == 105.0
+            assert response.json()["speed"] == 2.0
+            frame = asyncio.run(provider.generate_data(0.5))
+            assert frame.positions[0, 0] == 6.0
+
+            assert client.post("/replay/replay_provider",
+                               params={"speed": "nan"}).status_code == 400
+            assert client.post("/replay/unknown", params={"seek": 1}).status_code == 404
+    finally:
+        hub._channels.pop("replay_provider", None)
@@ -0,0 +1,33 @@
+import json
+import re
+
+from server.static import StaticAssetCache
+
+
+def load(tmp_path, index):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "main.js").write_text("import { a } from './a.js';\n")
+    (tmp_path / "js" / "a.js").write_text("export const a = 1;\n")
+    (tmp_path / "index.html").write_text(index)
+    cache = StaticAssetCache(tmp_path)
+    cache.load()
+    page = cache.get("/index.html").bodies["identity"].decode()
+    import_map = re.search(r'<script type="importmap">(.*?)</script>', page, re.S)
+    return cache, page, json.loads(import_map.group(1))["imports"]
+
+
+def test_import_map_versions_imported_modules(tmp_path):
+    cache, page, imports = load(tmp_path, (
+        '<script type="importmap">{"imports": {"three": "https://example.com/three.js"}}'
+        '</script><script type="module" src="/js/main.js"></script>'
+    ))
+    version = cache.get("/js/a.js").version
+    assert imports["/js/a.js"] == f"/js/a.js?v={version}"
+    assert imports["three"] == "https://example.com/three.js"
+    assert f'src="/js/main.js?v={cache.get("/js/main.js").version}"' in page
+
+
+def test_import_map_is_added_before_first_module(tmp_path):
+    _, page, imports = load(tmp_path, '<script type="module" src="/js/main.js"></script>')
+    assert "/js/a.js" in imports
+    assert page.index("importmap") < page.index('type="module"')
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from server.broadcast_hub import BroadcastChannel
+from server.subscription import MAX_RATE, Subscription
+
+
+@pytest.mark.parametrize("rate", [float("nan"), float("inf"), float("-inf"), 0, -1,
+                                  MAX_RATE * 2])
+def test_invalid_rate_is_rejected(rate):
+    with pytest.raises(ValueError):
+        Subscription("provider", rate=rate)
+
+
+def test_rate_from_json_is_rejected():
+    # json.loads пропускает NaN, Infinity и 1e999
+    for rate in ("NaN", "Infinity", "1e999"):
+        with pytest.raises(ValueError):
+            Subscription.parse({"provider": "provider", "rate": float(rate)})
+
+
+def test_invalid_field_types_raise_value_error():
+    for item in ({"provider": "p", "fields": 5}, {"provider": "p", "plates": 5},
+                 {"provider": "p", "rate": [1]}, {"provider": "p", "lod": None}):
+        with pytest.raises(ValueError):
+            Subscription.parse(item)
+
+
+class FakeGroup:
+    def __init__(self, stream_id, fail=False):
+        self.stream_id = stream_id
+        self.fail = fail
+        self.errors = 0
+        self.offered = 0
+
+    def offer(self, data, timestamp):
+        if self.fail:
+            raise OverflowError("cannot convert float infinity to integer")
+        self.offered += 1
+
+
+def test_failing_group_does_not_stop_other_groups():
+    channel = BroadcastChannel("provider", provider=None)
+    bad, good = FakeGroup(1, fail=True), FakeGroup(2)
+    channel.groups = {"bad": bad, "good": good}
+    channel.subscribers = {"client": object()}
+    frame = {"version": "1.0", "plates": []}
+    for _ in range(3):
+        asyncio.run(channel._broadcast(frame))
+    assert good.offered == 3
+    assert bad.errors == 3